@@ -0,0 +1,46 @@
+"""
+Measures sequential (append-only) inserts under different table fill factors.
+
+Usage (from the backend directory):
+    python benchmarks/append_inserts.py [row_count]
+
+Defaults to 100,000 rows. For each fill factor the script reports insert cost,
+file size, leaf count and the pages read by a full scan. A fill factor of 0.5
+splits like the old midpoint split did.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+FILL_FACTORS = [0.5, 0.9, 1.0]
+ROW = b'{"name": "benchmark", "value": 12345}'
+
+def run(row_count: int, fill_factor: float):
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path, fill_factor=fill_factor)
+        start = time.perf_counter()
+        for rowid in range(1, row_count + 1):
+            table.insert(rowid, ROW)
+        table.close()
+        insert = time.perf_counter() - start
+        size = os.path.getsize(table.filename)
+
+        table = Table("bench", db_path=db_path)
+        reads_before = table.pager.cache_hits + table.pager.cache_misses
+        leaves = set(page_number for _, _, page_number in table.scan())
+        page_reads = table.pager.cache_hits + table.pager.cache_misses - reads_before
+        table.close()
+    print(f"fill_factor {fill_factor:.1f}: {row_count:,} rows  insert {insert / row_count * 1e6:7.2f}us/row  "
+          f"file {size / 2**20:7.2f} MiB  {len(leaves):,} leaves  {page_reads:,} pages read per scan")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for fill_factor in FILL_FACTORS:
+        run(row_count, fill_factor)
@@ -0,0 +1,67 @@
+"""
+Measures how B-Tree scan and point-lookup cost grow with table size.
+
+Usage (from the backend directory):
+    python benchmarks/btree_scaling.py [row_count ...]
+
+Defaults to 1,000,000 and 10,000,000 rows. For each size a table is built in a
+temporary directory with sequential rowids, then the script reports the tree
+depth, full-scan time per row and the average time and page reads of random
+point lookups. Lookup cost should track the depth, which grows logarithmically.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+DEFAULT_SIZES = [1_000_000, 10_000_000]
+LOOKUPS = 10_000
+ROW = b'{"name": "benchmark", "value": 12345}'
+
+def tree_depth(table: Table) -> int:
+    depth = 1
+    view = table.load_page_view(table.root_page_num)
+    while not view.is_leaf:
+        view = table.load_page_view(view.child_at(0))
+        depth += 1
+    return depth
+
+def run(row_count: int):
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path)
+        start = time.perf_counter()
+        for rowid in range(1, row_count + 1):
+            table.insert(rowid, ROW)
+        table.pager.commit()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = sum(1 for _ in table.scan_page(table.root_page_num))
+        scan = time.perf_counter() - start
+        assert scanned == row_count
+
+        keys = [random.randint(1, row_count) for _ in range(LOOKUPS)]
+        misses_before = table.pager.cache_misses + table.pager.cache_hits
+        start = time.perf_counter()
+        for key in keys:
+            table.find(key)
+        lookup = time.perf_counter() - start
+        page_reads = table.pager.cache_misses + table.pager.cache_hits - misses_before
+
+        print(f"{row_count:>12,} rows  depth {tree_depth(table)}  "
+              f"build {build:8.1f}s  scan {scan / row_count * 1e6:6.2f}us/row  "
+              f"lookup {lookup / LOOKUPS * 1e6:7.1f}us  {page_reads / LOOKUPS:.1f} pages/lookup  "
+              f"file {os.path.getsize(table.filename) / 2**20:8.1f} MiB")
+        table.close()
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        run(size)
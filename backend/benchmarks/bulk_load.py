@@ -0,0 +1,43 @@
+"""
+Compares building a table row by row with Table.insert against Table.bulk_load.
+
+Usage (from the backend directory):
+    python benchmarks/bulk_load.py [row_count] [insert_row_count]
+
+Defaults to bulk loading 1,000,000 rows and inserting 100,000 (row-at-a-time
+inserts are far slower, so they are timed on a smaller table and reported per row).
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+ROW = b'{"name": "benchmark", "value": 12345}'
+
+def build(row_count: int, bulk: bool):
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path)
+        start = time.perf_counter()
+        if bulk:
+            table.bulk_load((rowid, ROW) for rowid in range(1, row_count + 1))
+        else:
+            for rowid in range(1, row_count + 1):
+                table.insert(rowid, ROW)
+        table.close()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(table.filename)
+    label = "bulk_load" if bulk else "insert"
+    print(f"{label:>10}: {row_count:>12,} rows  {elapsed:8.2f}s  {elapsed / row_count * 1e6:7.2f}us/row  "
+          f"file {size / 2**20:8.1f} MiB")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    bulk_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    insert_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    build(insert_rows, bulk=False)
+    build(bulk_rows, bulk=True)
@@ -0,0 +1,92 @@
+"""
+Compares scanning a few columns of a wide table stored as rows with the same
+table created USING COLUMNAR.
+
+Usage (from the backend directory):
+    python benchmarks/columnar.py [row_count] [column_count]
+
+Defaults to 20,000 rows of a 40 column table, half INT and half TEXT columns.
+Each query runs through the whole pipeline (tokenizer, parser, codegen, VM).
+The row engine reads every page of the table however few columns a query
+names; the columnar engine reads only the page chains of those columns.
+Reports the time of each query, the time the storage layer alone takes to
+read the queried columns (the VM's per-row work is the same for both engines),
+and the size of each table's file.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.code_generator import generate
+from compiler.parser import Parser
+from compiler.parser.statements import parse_statement
+from compiler.tokenizer import Tokenizer
+from core.session import close_all_sessions
+from core.virtual_machine import VirtualMachine
+from meta.catalog import Catalog
+from storage_engine.row_codec import get_codec
+
+TOKENIZER = Tokenizer()
+
+def run(db_path: str, sql: str):
+    vm = VirtualMachine(generate(parse_statement(Parser(TOKENIZER.tokenize(sql)))), db_path=db_path)
+    vm.run()
+    return vm.output
+
+def timed(db_path: str, sql: str) -> float:
+    close_all_sessions()  # Each query opens the table and reads its pages afresh
+    start = time.perf_counter()
+    run(db_path, sql)
+    return time.perf_counter() - start
+
+def storage_scan(db_path: str, table: str, columns) -> float:
+    catalog = Catalog(db_path)
+    tbl = catalog.open_table(table)
+    start = time.perf_counter()
+    if table.startswith("columnar"):
+        rows = sum(1 for _ in tbl.scan_rows(columns))
+    else:
+        codec = get_codec(catalog.get_schema(table))
+        rows = sum(1 for _, value, _ in tbl.scan() if codec.decode_columns(value, columns))
+    elapsed = time.perf_counter() - start
+    assert rows
+    tbl.close()
+    catalog.close()
+    return elapsed
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    column_count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    columns = [f"c{i}" for i in range(column_count)]
+    definition = ", ".join(f"{column} {'INT' if i % 2 else 'TEXT'}" for i, column in enumerate(columns))
+    queries = [
+        ("one column", "SELECT c1 FROM {table};", ("c1",)),
+        ("two, WHERE", f"SELECT c0 FROM {{table}} WHERE c1 = {row_count // 2};", ("c0", "c1")),
+        ("all columns", "SELECT * FROM {table};", tuple(columns)),
+    ]
+    with tempfile.TemporaryDirectory() as db_path:
+        run(db_path, f"CREATE TABLE rows_wide ({definition});")
+        run(db_path, f"CREATE TABLE columnar_wide ({definition}) USING COLUMNAR;")
+        for table in ("rows_wide", "columnar_wide"):
+            for start in range(0, row_count, 1000):
+                rows = ", ".join("(" + ", ".join(str(rowid) if i % 2 else f"'{column}_{rowid}'"
+                                                 for i, column in enumerate(columns)) + ")"
+                                 for rowid in range(start, min(start + 1000, row_count)))
+                run(db_path, f"INSERT INTO {table} VALUES {rows};")
+        close_all_sessions()
+        sizes = [os.path.getsize(os.path.join(db_path, f"{table}.tbl")) for table in ("rows_wide", "columnar_wide")]
+        print(f"{row_count:,} rows of {column_count} columns: row file {sizes[0] / 1e6:.1f} MB, "
+              f"columnar file {sizes[1] / 1e6:.1f} MB")
+        for label, sql, scanned in queries:
+            row_engine = timed(db_path, sql.format(table="rows_wide"))
+            columnar = timed(db_path, sql.format(table="columnar_wide"))
+            row_scan = storage_scan(db_path, "rows_wide", scanned)
+            columnar_scan = storage_scan(db_path, "columnar_wide", scanned)
+            print(f"{label:>12}: query row {row_engine:6.3f}s  columnar {columnar:6.3f}s  ({row_engine / columnar:4.1f}x)   "
+                  f"storage row {row_scan:6.3f}s  columnar {columnar_scan:6.3f}s  ({row_scan / columnar_scan:4.1f}x)")
+        close_all_sessions()
@@ -0,0 +1,52 @@
+"""
+Counts the pages a DELETE reads and writes, and times it.
+
+Usage (from the backend directory):
+    python benchmarks/delete.py [row_count] [delete_percent]
+
+Defaults to 100,000 rows loaded in key order and 90% of them deleted, once in
+random order and once from the front. Reads are Pager.read_page calls (cache
+hits included), writes are Pager.write_page calls; a delete that needs no
+rebalancing reads one page per level and writes only its leaf.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+ROW = b'{"name": "benchmark", "value": 12345}'
+
+def run(row_count: int, keys, label: str):
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path)
+        table.bulk_load((rowid, ROW) for rowid in range(1, row_count + 1))
+        stats = table.pager.cache_stats()
+        reads_before = stats["hits"] + stats["misses"]
+        writes_before = stats["writes"]
+        freed_before = table.pager.header.freelist_count
+        start = time.perf_counter()
+        for key in keys:
+            table.delete(key)
+        elapsed = time.perf_counter() - start
+        stats = table.pager.cache_stats()
+        reads = stats["hits"] + stats["misses"] - reads_before
+        writes = stats["writes"] - writes_before
+        freed = table.pager.header.freelist_count - freed_before
+        table.close()
+    print(f"{label:>7}: {elapsed / len(keys) * 1e6:7.2f}us/delete  {reads / len(keys):5.2f} pages read  "
+          f"{writes / len(keys):5.2f} pages written per delete  {freed:,} pages freed")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    delete_percent = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    delete_count = row_count * delete_percent // 100
+    print(f"{row_count:,} rows, {delete_count:,} deleted")
+    run(row_count, random.sample(range(1, row_count + 1), delete_count), "random")
+    run(row_count, range(1, delete_count + 1), "front")
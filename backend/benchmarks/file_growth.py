@@ -0,0 +1,39 @@
+"""
+Times growing a table file page by page with different extent sizes.
+
+Usage (from the backend directory):
+    python benchmarks/file_growth.py [page_count]
+
+Defaults to 50,000 pages (about 200 MiB). Every page is allocated, written and,
+with a small cache, soon evicted to the file, so the run is dominated by file
+growth and page writes. extent_pages=1 reserves space for every new page, the
+cost the extents avoid.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.pager import Pager, DEFAULT_PAGE_SIZE
+
+def grow(page_count: int, extent_pages: int):
+    with tempfile.TemporaryDirectory() as db_path:
+        pager = Pager(os.path.join(db_path, "bench.tbl"), cache_size=64, extent_pages=extent_pages)
+        data = bytes(range(256)) * (DEFAULT_PAGE_SIZE // 256)
+        start = time.perf_counter()
+        for _ in range(page_count):
+            pager.write_page(pager.allocate_page(), data)
+        pager.close()
+        elapsed = time.perf_counter() - start
+    print(f"extent_pages={extent_pages:<6}: {elapsed:6.2f}s  {elapsed / page_count * 1e6:6.2f}us/page  "
+          f"{page_count * DEFAULT_PAGE_SIZE / elapsed / 2**20:7.1f} MiB/s")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"{page_count:,} pages")
+    for extent_pages in (1, 64, 1024):
+        grow(page_count, extent_pages)
@@ -0,0 +1,62 @@
+"""
+Compares inserting a batch row by row with Table.insert against one
+Table.insert_many call.
+
+Usage (from the backend directory):
+    python benchmarks/insert_many.py [batch_size] [existing_rows]
+
+Defaults to batches of 100,000 rows, in random and in ascending key order,
+going into a table that already holds 100,000 rows. Reports rows per second
+and the page writes each way needs.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+ROW = b'{"name": "benchmark", "value": 12345}'
+
+def run(db_path: str, name: str, existing, batch, many: bool) -> tuple:
+    table = Table(name, db_path=db_path)
+    table.bulk_load((key, ROW) for key in existing)
+    table.pager.commit()
+    writes = table.pager.cache_stats()["writes"]
+    start = time.perf_counter()
+    if many:
+        table.insert_many((key, ROW) for key in batch)
+    else:
+        for key in batch:
+            table.insert(key, ROW)
+    table.pager.commit()
+    elapsed = time.perf_counter() - start
+    writes = table.pager.cache_stats()["writes"] - writes
+    assert sum(1 for _ in table.scan()) == len(existing) + len(batch)
+    table.close()
+    return elapsed, writes
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    existing_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    # Existing rows take the even keys, so random batches land all over the tree
+    existing = range(2, 2 * existing_rows + 1, 2)
+    odd = list(range(1, 2 * existing_rows + 1, 2))
+    random.shuffle(odd)
+    batches = {
+        "random": odd[:batch_size],
+        "ascending": range(2 * existing_rows + 1, 2 * existing_rows + 1 + batch_size),
+    }
+    print(f"batches of {batch_size:,} rows into a table of {existing_rows:,}")
+    with tempfile.TemporaryDirectory() as db_path:
+        for order, batch in batches.items():
+            single, single_writes = run(db_path, f"single_{order}", existing, batch, many=False)
+            many, many_writes = run(db_path, f"many_{order}", existing, batch, many=True)
+            print(f"{order:>9}: insert {batch_size / single:>10,.0f} rows/s {single_writes:>8,} page writes   "
+                  f"insert_many {batch_size / many:>10,.0f} rows/s {many_writes:>8,} page writes   "
+                  f"{single / many:5.1f}x")
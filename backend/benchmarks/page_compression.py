@@ -0,0 +1,71 @@
+"""
+Compares an uncompressed table file with a zlib page-compressed one.
+
+Usage (from the backend directory):
+    python benchmarks/page_compression.py [row_count] [lookup_count]
+
+Defaults to 200,000 rows and 20,000 random lookups. Both tables get the same
+JSON rows through Table.bulk_load. Each is then reopened with a fresh Pager and
+scanned, so every page is read from the file once: the file size is the I/O a
+cold scan has to do, and the extra scan time of the compressed table is the CPU
+spent decompressing. Which one wins depends on how fast the disk is.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.row_codec import encode_row
+from storage_engine.table import Table
+
+NAMES = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi"]
+
+def make_rows(row_count: int):
+    for rowid in range(1, row_count + 1):
+        yield rowid, encode_row({
+            "id": rowid,
+            "name": NAMES[rowid % len(NAMES)],
+            "email": f"{NAMES[rowid % len(NAMES)]}.{rowid}@example.com",
+            "age": 20 + rowid % 50,
+        })
+
+def run(row_count: int, lookup_count: int, compression):
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path, compression=compression)
+        start = time.perf_counter()
+        table.bulk_load(make_rows(row_count))
+        table.close()
+        build = time.perf_counter() - start
+        size = os.path.getsize(table.filename)
+
+        table = Table("bench", db_path=db_path)
+        start = time.perf_counter()
+        scanned = sum(1 for _ in table.scan())
+        scan = time.perf_counter() - start
+        table.close()
+        assert scanned == row_count
+
+        table = Table("bench", db_path=db_path)
+        keys = [random.randint(1, row_count) for _ in range(lookup_count)]
+        start = time.perf_counter()
+        for key in keys:
+            table.find(key)
+        lookups = time.perf_counter() - start
+        table.close()
+    label = compression or "none"
+    print(f"{label:>6}: file {size / 2**20:7.2f} MiB  build {build:6.2f}s  cold scan {scan:6.2f}s "
+          f"({size / scan / 2**20:7.1f} MiB/s of file)  lookups {lookups / lookup_count * 1e6:7.2f}us")
+    return size
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lookup_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    print(f"{row_count:,} rows, {lookup_count:,} random lookups")
+    plain = run(row_count, lookup_count, None)
+    compressed = run(row_count, lookup_count, "zlib")
+    print(f"compression ratio {plain / compressed:.2f}x")
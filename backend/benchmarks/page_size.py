@@ -0,0 +1,73 @@
+"""
+Compares table files built with different page sizes.
+
+Usage (from the backend directory):
+    python benchmarks/page_size.py [row_count] [lookup_count]
+
+Defaults to 200,000 rows and 20,000 random lookups. For each page size a table
+is filled with shuffled inserts, then reopened with a fresh Pager for a full
+scan and for point lookups. Larger pages make the tree shallower and scans
+cheaper per row; smaller pages waste less when only one row of a page is read.
+The cache holds the same number of bytes for every page size.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.pager import DEFAULT_CACHE_SIZE, DEFAULT_PAGE_SIZE
+from storage_engine.table import Table
+
+ROW = b'{"name": "benchmark", "value": 12345, "padding": "' + b"x" * 60 + b'"}'
+PAGE_SIZES = (1024, 4096, 16384, 65536)
+
+def tree_depth(table: Table) -> int:
+    depth = 1
+    view = table.load_page_view(table.root_page_num)
+    while not view.is_leaf:
+        view = table.load_page_view(view.child_at(0))
+        depth += 1
+    return depth
+
+def run(row_count: int, lookup_count: int, page_size: int):
+    cache_size = DEFAULT_CACHE_SIZE * DEFAULT_PAGE_SIZE // page_size
+    rowids = list(range(1, row_count + 1))
+    random.shuffle(rowids)
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path, page_size=page_size, cache_size=cache_size)
+        start = time.perf_counter()
+        for rowid in rowids:
+            table.insert(rowid, ROW)
+        table.close()
+        inserts = time.perf_counter() - start
+        pages = table.pager.num_pages
+
+        table = Table("bench", db_path=db_path, cache_size=cache_size)
+        depth = tree_depth(table)
+        start = time.perf_counter()
+        scanned = sum(1 for _ in table.scan())
+        scan = time.perf_counter() - start
+        table.close()
+        assert scanned == row_count
+
+        table = Table("bench", db_path=db_path, cache_size=cache_size)
+        keys = random.sample(rowids, min(lookup_count, row_count))
+        start = time.perf_counter()
+        for key in keys:
+            table.find(key)
+        lookups = time.perf_counter() - start
+        table.close()
+    print(f"{page_size:>6}B pages: {pages:>7,} pages, depth {depth}  inserts {row_count / inserts:9,.0f}/s  "
+          f"scan {row_count / scan:10,.0f} rows/s  lookups {lookups / len(keys) * 1e6:7.2f}us")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lookup_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    print(f"{row_count:,} rows, {lookup_count:,} random lookups")
+    for page_size in PAGE_SIZES:
+        run(row_count, lookup_count, page_size)
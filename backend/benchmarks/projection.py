@@ -0,0 +1,60 @@
+"""
+Shows how the cost of a scan follows the number of columns a query uses.
+
+Usage (from the backend directory):
+    python benchmarks/projection.py [row_count] [column_count]
+
+Defaults to 20,000 rows of a 40 column table. Each query runs through the
+whole pipeline (tokenizer, parser, codegen, VM); OPEN_TABLE decodes only the
+columns the SELECT and WHERE clauses name, so a two-column query on the wide
+table should cost a fraction of SELECT *.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.code_generator import generate
+from compiler.parser import Parser
+from compiler.parser.statements import parse_statement
+from compiler.tokenizer import Tokenizer
+from core.session import close_all_sessions
+from core.virtual_machine import VirtualMachine
+
+TOKENIZER = Tokenizer()
+
+def run(db_path: str, sql: str):
+    vm = VirtualMachine(generate(parse_statement(Parser(TOKENIZER.tokenize(sql)))), db_path=db_path)
+    vm.run()
+    return vm.output
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    column_count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    columns = [f"c{i}" for i in range(column_count)]
+    with tempfile.TemporaryDirectory() as db_path:
+        run(db_path, f"CREATE TABLE wide ({', '.join(f'{column} TEXT' for column in columns)});")
+        for start in range(0, row_count, 1000):
+            rows = ", ".join("(" + ", ".join(f"'{column}_{rowid}'" for column in columns) + ")"
+                             for rowid in range(start, min(start + 1000, row_count)))
+            run(db_path, f"INSERT INTO wide VALUES {rows};")
+        queries = [
+            ("all columns", "SELECT * FROM wide;"),
+            ("all, WHERE", f"SELECT * FROM wide WHERE c1 = 'c1_{row_count // 2}';"),
+            ("one column", f"SELECT {columns[-1]} FROM wide;"),
+            ("two, WHERE", f"SELECT c0 FROM wide WHERE c1 = 'c1_{row_count // 2}';"),
+        ]
+        print(f"{row_count:,} rows of {column_count} columns")
+        baseline = None
+        for label, sql in queries:
+            run(db_path, sql)  # Warm the page cache
+            start = time.perf_counter()
+            run(db_path, sql)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{label:>12}: {elapsed:6.3f}s  ({baseline / elapsed:4.1f}x)")
+        close_all_sessions()
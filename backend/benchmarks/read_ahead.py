@@ -0,0 +1,69 @@
+"""
+Times cold full scans with and without background read-ahead.
+
+Usage (from the backend directory):
+    python benchmarks/read_ahead.py [row_count] [read_ahead]
+
+Defaults to 300,000 rows and a 32-leaf read-ahead window. Two tables are built:
+one with bulk_load, whose leaves sit in key order in the file, and one from
+shuffled inserts, whose leaves are scattered. Before every scan the file is
+dropped from the OS page cache with posix_fadvise(DONTNEED) (Linux), so the
+scan has to go to the disk.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+ROW = b'{"name": "benchmark", "value": 12345, "padding": "' + b"x" * 60 + b'"}'
+
+def drop_os_cache(filename: str):
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    with open(filename, "rb") as f:
+        os.fsync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return True
+
+def cold_scan(db_path: str, read_ahead: int):
+    cold = drop_os_cache(os.path.join(db_path, "bench.tbl"))
+    table = Table("bench", db_path=db_path, read_ahead=read_ahead)
+    start = time.perf_counter()
+    rows = sum(1 for _ in table.scan())
+    elapsed = time.perf_counter() - start
+    hits = table.pager.cache_stats()["read_ahead_hits"]
+    table.close()
+    return rows, elapsed, hits, cold
+
+def run(row_count: int, read_ahead: int, layout: str):
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path)
+        if layout == "sequential":
+            table.bulk_load((rowid, ROW) for rowid in range(1, row_count + 1))
+        else:
+            rowids = list(range(1, row_count + 1))
+            random.shuffle(rowids)
+            for rowid in rowids:
+                table.insert(rowid, ROW)
+        table.close()
+        size = os.path.getsize(table.filename)
+        for window in (0, read_ahead):
+            rows, elapsed, hits, cold = cold_scan(db_path, window)
+            assert rows == row_count
+            print(f"{layout:>10} leaves, read_ahead={window:<3}: {elapsed:6.2f}s  "
+                  f"{size / elapsed / 2**20:7.1f} MiB/s  read-ahead hits {hits:>7,}"
+                  f"{'' if cold else '  (OS cache not dropped)'}")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    read_ahead = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    print(f"{row_count:,} rows")
+    run(row_count, read_ahead, "sequential")
+    run(row_count, read_ahead, "scattered")
@@ -0,0 +1,62 @@
+"""
+Compares the JSON row encoding with the binary record format of row_codec.
+
+Usage (from the backend directory):
+    python benchmarks/row_codec.py [row_count]
+
+Defaults to 100,000 rows of two shapes: typed rows (ints, a float and text,
+as the API may write them) and rows of the quoted strings the SQL shell's
+tokenizer produces. Reports the average encoded size and the encode and decode
+time per row of each format.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.row_codec import encode_row, decode_row, get_codec
+
+NAMES = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi"]
+SCHEMA = [["id", "INT"], ["name", "TEXT"], ["email", "VARCHAR"], ["age", "INT"], ["score", "DOUBLE"],
+          ["joined", "DATE"]]
+
+def typed_rows(row_count: int) -> list:
+    return [{"id": rowid, "name": NAMES[rowid % len(NAMES)],
+             "email": f"{NAMES[rowid % len(NAMES)]}.{rowid}@example.com", "age": 20 + rowid % 50,
+             "score": rowid / 7, "joined": f"2024-{1 + rowid % 12:02d}-{1 + rowid % 28:02d}"}
+            for rowid in range(1, row_count + 1)]
+
+def shell_rows(row_count: int) -> list:
+    return [{name: value if isinstance(value, str) and name != "id" and name != "age" else str(value)
+             for name, value in row.items()} | {"name": f"'{row['name']}'", "email": f"'{row['email']}'",
+                                                 "joined": f"'{row['joined']}'"}
+            for row in typed_rows(row_count)]
+
+def measure(rows: list, schema) -> tuple:
+    start = time.perf_counter()
+    encoded = [encode_row(row, schema) for row in rows]
+    encode = time.perf_counter() - start
+    if schema is None:
+        start = time.perf_counter()
+        decoded = [decode_row(blob) for blob in encoded]
+    else:
+        # As a scan does: look the codec up once
+        codec = get_codec(schema)
+        start = time.perf_counter()
+        decoded = [codec.decode(blob) for blob in encoded]
+    decode = time.perf_counter() - start
+    assert decoded == rows
+    return sum(map(len, encoded)) / len(rows), encode / len(rows), decode / len(rows)
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{row_count:,} rows of {len(SCHEMA)} columns")
+    for shape, rows in (("typed", typed_rows(row_count)), ("shell", shell_rows(row_count))):
+        json_size, json_encode, json_decode = measure(rows, None)
+        size, encode, decode = measure(rows, SCHEMA)
+        print(f"{shape:>6}  JSON {json_size:6.1f} B/row  encode {json_encode * 1e6:5.2f} us  decode {json_decode * 1e6:5.2f} us")
+        print(f"{'':>6}  binary {size:4.1f} B/row  encode {encode * 1e6:5.2f} us  decode {decode * 1e6:5.2f} us  "
+              f"({json_size / size:.1f}x smaller, encode {json_encode / encode:.1f}x, decode {json_decode / decode:.1f}x)")
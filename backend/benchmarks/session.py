@@ -0,0 +1,65 @@
+"""
+Times tiny statements with and without a long-lived DatabaseSession.
+
+Usage (from the backend directory):
+    python benchmarks/session.py [statement_count] [row_count]
+
+Defaults to 2,000 SELECTs and single-row UPDATEs against a table of 10 rows.
+"fresh" gives every statement its own session, which opens the catalog and
+the table and closes them again, as every statement did before sessions;
+"shared" runs them all through one session that keeps its handles open.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.code_generator import generate
+from compiler.parser import Parser
+from compiler.parser.statements import parse_statement
+from compiler.tokenizer import Tokenizer
+from core.session import DatabaseSession
+from core.virtual_machine import VirtualMachine
+
+def compile_sql(sql: str):
+    return generate(parse_statement(Parser(Tokenizer().tokenize(sql))))
+
+def run(db_path: str, code, shared: DatabaseSession = None):
+    session = shared or DatabaseSession(db_path)
+    vm = VirtualMachine(code, db_path=db_path, session=session)
+    vm.run()
+    if shared is None:
+        session.close()
+    return vm.output
+
+def bench(label: str, db_path: str, statements, shared: DatabaseSession = None):
+    start = time.perf_counter()
+    for code in statements:
+        run(db_path, code, shared)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {elapsed:6.2f}s  {elapsed / len(statements) * 1e6:9.1f}us/statement")
+    return elapsed
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    statement_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    row_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as db_path:
+        setup = DatabaseSession(db_path)
+        run(db_path, compile_sql("CREATE TABLE users (id INT, name TEXT);"), setup)
+        for i in range(row_count):
+            run(db_path, compile_sql(f"INSERT INTO users VALUES ({i}, 'user{i}');"), setup)
+        setup.close()
+        select = compile_sql("SELECT name FROM users WHERE name = 'user7';")
+        update = compile_sql("UPDATE users SET name = 'user7' WHERE name = 'user7';")
+        print(f"{statement_count:,} statements on a {row_count:,}-row table")
+        for kind, code in (("SELECT", select), ("UPDATE", update)):
+            print(kind)
+            fresh = bench("fresh", db_path, [code] * statement_count)
+            session = DatabaseSession(db_path)
+            shared = bench("shared", db_path, [code] * statement_count, session)
+            session.close()
+            print(f"{'':>7}  {fresh / shared:.1f}x faster with a shared session")
@@ -0,0 +1,61 @@
+"""
+Shows what Table.vacuum gives back after a delete-heavy workload.
+
+Usage (from the backend directory):
+    python benchmarks/vacuum.py [row_count] [delete_percent]
+
+Defaults to 200,000 rows inserted in random order, then 75% of them deleted at
+random. The table's size and full-scan time are reported before and after the
+VACUUM, next to a table freshly bulk loaded with the surviving rows.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+ROW = b'{"name": "benchmark", "value": 12345}'
+
+def scan_time(table: Table) -> float:
+    start = time.perf_counter()
+    for _ in table.scan():
+        pass
+    return time.perf_counter() - start
+
+def report(label: str, table: Table):
+    # Pages in use rather than the file size, which includes the unused part of the last extent
+    print(f"{label:>14}: {table.pager.num_pages:>8,} pages  {table.pager.num_pages * table.pager.page_size / 2**20:7.1f} MiB  "
+          f"scan {scan_time(table):6.3f}s")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    delete_percent = int(sys.argv[2]) if len(sys.argv) > 2 else 75
+    rowids = list(range(1, row_count + 1))
+    random.shuffle(rowids)
+    deleted = set(rowids[:row_count * delete_percent // 100])
+    print(f"{row_count:,} rows, {len(deleted):,} deleted")
+    with tempfile.TemporaryDirectory() as db_path:
+        table = Table("bench", db_path=db_path)
+        for rowid in rowids:
+            table.insert(rowid, ROW)
+        for rowid in deleted:
+            table.delete(rowid)
+        report("before VACUUM", table)
+        start = time.perf_counter()
+        result = table.vacuum()
+        elapsed = time.perf_counter() - start
+        report("after VACUUM", table)
+        print(f"{'':>14}  VACUUM took {elapsed:.2f}s, reclaimed {result['pages_before'] - result['pages_after']:,} "
+              f"pages, {(result['bytes_before'] - result['bytes_after']) / 2**20:.1f} MiB")
+        table.close()
+
+        fresh = Table("fresh", db_path=db_path)
+        fresh.bulk_load((rowid, ROW) for rowid in range(1, row_count + 1) if rowid not in deleted)
+        report("fresh load", fresh)
+        fresh.close()
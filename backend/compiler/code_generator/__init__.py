@@ -4,6 +4,8 @@ from compiler.code_generator.insert_codegen import InsertCodeGenerator
 from compiler.code_generator.update_codegen import UpdateCodeGenerator
 from compiler.code_generator.delete_codegen import DeleteCodeGenerator
 from compiler.code_generator.drop_codegen import DropCodeGenerator
+from compiler.code_generator.transaction_codegen import TransactionCodeGenerator
+from compiler.code_generator.vacuum_codegen import VacuumCodeGenerator
 
 from utils.logger import get_logger
 
@@ -44,6 +46,16 @@ def generate(ast):
         result = DropCodeGenerator(ast).generate()
         logger.debug(f"Generated code for DROP: {result}")
         return result
+    elif stmt_type in ("BEGIN", "COMMIT", "ROLLBACK"):
+        logger.debug("Dispatching to TransactionCodeGenerator")
+        result = TransactionCodeGenerator(ast).generate()
+        logger.debug(f"Generated code for {stmt_type}: {result}")
+        return result
+    elif stmt_type == "VACUUM":
+        logger.debug("Dispatching to VacuumCodeGenerator")
+        result = VacuumCodeGenerator(ast).generate()
+        logger.debug(f"Generated code for VACUUM: {result}")
+        return result
     else:
         logger.error(f"Unsupported statement type: {stmt_type}")
         raise NotImplementedError(f"Code generation for {stmt_type} statements is not implemented yet.")
\ No newline at end of file
@@ -19,6 +19,26 @@ class BaseCodeGenerator(ABC):
         logger.debug("Generated new label: %s", label)
         return label
         
+    @staticmethod
+    def where_columns(where) -> list:
+        if not where:
+            return []
+        conditions = where if isinstance(where, list) else [where]
+        return [cond["column"] for cond in conditions]
+
+    @staticmethod
+    def projection(*column_lists) -> list:
+        """
+        The columns a statement reads, for OPEN_TABLE to decode: the given
+        lists merged without duplicates, or None when one of them is ["*"].
+        """
+        columns = []
+        for column_list in column_lists:
+            if "*" in column_list:
+                return None
+            columns += [column for column in column_list if column not in columns]
+        return columns
+
     @abstractmethod  # This method must be implemented by subclasses
     def generate(self):
         """
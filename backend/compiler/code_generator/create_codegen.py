@@ -9,8 +9,9 @@ class CreateCodeGenerator(BaseCodeGenerator):
         logger.info("Generating CREATE TABLE code")
         table = self.ast["table"]
         columns = self.ast["columns"]
+        engine = self.ast.get("engine")
         
         logger.debug(f"Generating CREATE TABLE code for table: {table} with columns: {columns}")
         return [
-            (Opcode.CREATE_TABLE, table, columns)
+            (Opcode.CREATE_TABLE, table, columns, engine)
         ]
\ No newline at end of file
@@ -15,7 +15,7 @@ class DeleteCodeGenerator(BaseCodeGenerator):
         skip_label = self.new_label()
         
         code = [
-            (Opcode.OPEN_TABLE, table),
+            (Opcode.OPEN_TABLE, table, self.projection(self.where_columns(where))),
             (Opcode.SCAN_START,),
             (Opcode.LABEL, loop_label),
             (Opcode.SCAN_NEXT,),
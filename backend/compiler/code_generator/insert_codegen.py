@@ -8,14 +8,21 @@ class InsertCodeGenerator(BaseCodeGenerator):
     def generate(self):
         
         table = self.ast["table"]
-        values = self.ast["values"]
+        rows = self.ast.get("rows") or [self.ast["values"]]
         
         code = []
-        code.append((Opcode.OPEN_TABLE, table))
+        # Inserts only need the table open, not its existing rows
+        code.append((Opcode.OPEN_TABLE, table, [], False))
         
-        for value in values:
-            code.append((Opcode.LOAD_CONST, value))
+        for values in rows:
+            for value in values:
+                code.append((Opcode.LOAD_CONST, value))
             
-        code.append((Opcode.INSERT_ROW, table))
+        # The row width lets the VM check it against the table's columns
+        if len(rows) == 1:
+            code.append((Opcode.INSERT_ROW, table, len(rows[0])))
+        else:
+            # Several rows go into the table as one batch
+            code.append((Opcode.INSERT_ROWS, table, len(rows), len(rows[0])))
         
         return code
\ No newline at end of file
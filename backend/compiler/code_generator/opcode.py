@@ -10,7 +10,13 @@ class Opcode(Enum):
     CREATE_TABLE = auto()
     DROP_TABLE = auto()
     OPEN_TABLE = auto()
+    VACUUM = auto()             # Rebuild a table (or all tables) into compact files
     
+    # Transactions
+    BEGIN_TRANSACTION = auto()
+    COMMIT_TRANSACTION = auto()
+    ROLLBACK_TRANSACTION = auto()
+
     # Scanning
     SCAN_START = auto()
     SCAN_NEXT = auto()
@@ -20,6 +26,7 @@ class Opcode(Enum):
     LOAD_CONST = auto()         # Push a constant onto the stack
     LOAD_COLUMN = auto()        # Load a column from the current row
     INSERT_ROW = auto()        # Insert a new row into the table
+    INSERT_ROWS = auto()        # Insert the given number of rows into the table as one batch
     UPDATE_ROW = auto()        
     DELETE_ROW = auto()       # Delete the current row from the table
     UPDATE_COLUMN = auto()      # Update a column in the current row
@@ -16,7 +16,7 @@ class SelectCodeGenerator(BaseCodeGenerator):
         skip_label = self.new_label("skip") if where else None
 
         code = [
-            (Opcode.OPEN_TABLE, table),
+            (Opcode.OPEN_TABLE, table, self.projection(columns, self.where_columns(where))),
             (Opcode.SCAN_START,),
             (Opcode.LABEL, loop_label),
             (Opcode.SCAN_NEXT,),
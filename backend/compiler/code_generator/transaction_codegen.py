@@ -0,0 +1,18 @@
+from compiler.code_generator.base_codegen import BaseCodeGenerator
+from compiler.code_generator.opcode import Opcode
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class TransactionCodeGenerator(BaseCodeGenerator):
+    def generate(self):
+        stmt_type = self.ast["type"].upper()
+        logger.info(f"Generating {stmt_type} code")
+        opcode = {
+            "BEGIN": Opcode.BEGIN_TRANSACTION,
+            "COMMIT": Opcode.COMMIT_TRANSACTION,
+            "ROLLBACK": Opcode.ROLLBACK_TRANSACTION,
+        }[stmt_type]
+        return [
+            (opcode,)
+        ]
\ No newline at end of file
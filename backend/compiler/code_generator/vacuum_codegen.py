@@ -0,0 +1,15 @@
+from compiler.code_generator.base_codegen import BaseCodeGenerator
+from compiler.code_generator.opcode import Opcode
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class VacuumCodeGenerator(BaseCodeGenerator):
+    def generate(self):
+        logger.info("Generating VACUUM code")
+        table = self.ast.get("table")
+
+        logger.debug(f"Generating VACUUM code for table: {table or '(all tables)'}")
+        return [
+            (Opcode.VACUUM, table)
+        ]
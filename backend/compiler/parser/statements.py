@@ -5,7 +5,8 @@ logger = get_logger(__name__)
 def parse_statement(parser):
     """
     Dispatches to the appropriate parser function based on the first keyword
-    of the SQL input. Supports SELECT, INSERT, DELETE, CREATE, and UPDATE statements.
+    of the SQL input. Supports SELECT, INSERT, DELETE, CREATE, UPDATE, DROP, VACUUM
+    and the transaction statements BEGIN, COMMIT and ROLLBACK.
 
     Args:
         parser: The parser object responsible for managing tokens.
@@ -33,6 +34,10 @@ def parse_statement(parser):
         return parse_update_statement(parser)
     if kw == "DROP":
         return parse_drop_statement(parser)
+    if kw in ("BEGIN", "COMMIT", "ROLLBACK"):
+        return parse_transaction_statement(parser)
+    if kw == "VACUUM":
+        return parse_vacuum_statement(parser)
     raise SyntaxError(f"Unknown statement: {kw}")
 
 def parse_select_statement(parser):
@@ -72,7 +77,8 @@ def parse_select_statement(parser):
 
 def parse_insert_statement(parser):
     """
-    Parses an INSERT INTO statement with optional column list.
+    Parses an INSERT INTO statement with optional column list and one or
+    more parenthesized rows of values.
 
     Args:
         parser: The parser object.
@@ -106,20 +112,30 @@ def parse_insert_statement(parser):
         parser.expect("RPAREN")
         
     parser.expect("KEYWORD","VALUES")
-    parser.expect("LPAREN")
-    vals=[]
+    rows=[]
     while True:
-        tok=parser.current_token()
-        if not tok or tok[0] not in ("STRING","NUMBER"):
-            logger.error("Expected value in INSERT")
-            raise SyntaxError("Expected value in INSERT")
-        vals.append(tok[1]); parser.advance()
+        parser.expect("LPAREN")
+        vals=[]
+        while True:
+            tok=parser.current_token()
+            if not tok or tok[0] not in ("STRING","NUMBER"):
+                logger.error("Expected value in INSERT")
+                raise SyntaxError("Expected value in INSERT")
+            vals.append(tok[1]); parser.advance()
+            if parser.match("COMMA"): continue
+            break
+        parser.expect("RPAREN")
+        width=len(cols) if cols is not None else len(rows[0]) if rows else len(vals)
+        if len(vals)!=width:
+            logger.error(f"INSERT row {len(rows)+1} has {len(vals)} values, expected {width}")
+            raise SyntaxError(f"INSERT row {len(rows)+1} has {len(vals)} values, expected {width}")
+        rows.append(vals)
+        # VALUES (...), (...) inserts several rows
         if parser.match("COMMA"): continue
         break
-    parser.expect("RPAREN")
     parser.expect("SEMICOLON")
-    logger.info(f"Parsed INSERT into {table} with columns {cols} and values {vals}")
-    return {"type":"INSERT","table":table,"columns":cols,"values":vals}
+    logger.info(f"Parsed INSERT into {table} with columns {cols} and {len(rows)} rows of values, first {rows[0]}")
+    return {"type":"INSERT","table":table,"columns":cols,"values":rows[0],"rows":rows}
 
 def parse_delete_statement(parser):
     """
@@ -191,9 +207,18 @@ def parse_create_statement(parser):
         if not parser.match("COMMA"):
             break
     parser.expect("RPAREN")
+    engine=None
+    if parser.match("KEYWORD","USING"):
+        tok=parser.current_token()
+        if not tok or tok[0]!="IDENTIFIER" or tok[1].upper() not in ("ROW","COLUMNAR"):
+            logger.error("Expected ROW or COLUMNAR after USING in CREATE")
+            raise SyntaxError("Expected ROW or COLUMNAR after USING")
+        if tok[1].upper()=="COLUMNAR":
+            engine="COLUMNAR"
+        parser.advance()
     parser.expect("SEMICOLON")
-    logger.info(f"Parsed CREATE TABLE {table} with columns {cols}")
-    return {"type":"CREATE","table":table,"columns":cols}
+    logger.info(f"Parsed CREATE TABLE {table} with columns {cols} using {engine or 'ROW'} storage")
+    return {"type":"CREATE","table":table,"columns":cols,"engine":engine}
 
 def parse_update_statement(parser):
     """
@@ -254,4 +279,39 @@ def parse_drop_statement(parser):
     return {
         "type": "DROP",
         "table": table_name
-    }
\ No newline at end of file
+    }
+
+def parse_transaction_statement(parser):
+    """
+    Parses BEGIN, COMMIT or ROLLBACK, each optionally followed by TRANSACTION.
+    Example SQL: BEGIN TRANSACTION;
+    """
+    kw = parser.current_token()[1]
+    logger.info(f"Parsing {kw} statement")
+
+    parser.expect("KEYWORD", kw)
+    parser.match("KEYWORD", "TRANSACTION")
+    parser.expect("SEMICOLON")
+
+    logger.info(f"Parsed {kw}")
+    return {"type": kw}
+
+def parse_vacuum_statement(parser):
+    """
+    Parses VACUUM with an optional table name; without one every table is rebuilt.
+    Example SQL: VACUUM users;
+    """
+    logger.info("Parsing VACUUM statement")
+
+    parser.expect("KEYWORD", "VACUUM")
+    table_name = None
+    tok = parser.current_token()
+    if tok and tok[0] == "IDENTIFIER":
+        table_name = parser.expect("IDENTIFIER")[1]
+    parser.expect("SEMICOLON")
+
+    logger.info(f"Parsed VACUUM {table_name or '(all tables)'}")
+    return {
+        "type": "VACUUM",
+        "table": table_name
+    }
@@ -1,5 +1,5 @@
 TOKEN_PATTERN = [
-    ("KEYWORD", r"\b(SELECT|FROM|INSERT|TRUNCATE|INTO|VALUES|CREATE|TABLE|WHERE|AND|OR|UPDATE|SET|DELETE|JOIN|ORDER|BY|GROUP|DROP)\b"),
+    ("KEYWORD", r"\b(SELECT|FROM|INSERT|TRUNCATE|INTO|VALUES|CREATE|TABLE|WHERE|AND|OR|UPDATE|SET|DELETE|JOIN|ORDER|BY|GROUP|DROP|BEGIN|COMMIT|ROLLBACK|TRANSACTION|VACUUM|USING)\b"),
     ("IDENTIFIER", r"[a-zA-Z_][a-zA-Z0-9_]*"),
     ("NUMBER", r"\b\d+(\.\d+)?\b"),
     ("STRING", r"'[^']*'"),
@@ -0,0 +1,192 @@
+"""
+Long-lived database sessions shared by the statements of the shell and the API.
+
+Building a Catalog opens and scans the catalog table twice, and every statement
+used to build one and reopen the tables it touched. A DatabaseSession keeps the
+catalog and the Table handles of one database open across statements instead.
+get_session() returns the session of a database directory, creating it on first
+use; close_idle_sessions() and close_all_sessions() give the files back.
+"""
+import threading
+import time
+from core.transaction import Transaction
+from meta.catalog import Catalog
+from storage_engine.table import Table
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 300  # Seconds without a statement before an idle session closes its files
+
+_sessions = {}  # db_path -> DatabaseSession
+_sessions_lock = threading.Lock()
+_idle_closer = None  # (thread, stop event) started by start_idle_closer()
+
+class DatabaseSession:
+    """
+    The catalog and open Table handles of one database.
+
+    Statements run under the session's lock and borrow its handles. Outside a
+    transaction end_statement() commits every pager, so a finished statement is
+    in the files; they are fsynced when the session closes, or by every commit
+    in WAL mode. BEGIN starts a Transaction that every table opened until
+    COMMIT/ROLLBACK is enlisted in.
+
+    Statements that remove or replace table files (DROP TABLE, VACUUM) release
+    the affected handles first. close() releases everything; a closed session
+    reopens the catalog the next time it is used.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.catalog = None
+        self.tables = {}  # table_name -> Table
+        self.transaction = None
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+        self.statements = 0
+
+    def get_catalog(self) -> Catalog:
+        if self.catalog is None:
+            self.catalog = Catalog(db_path=self.db_path)
+            logger.info(f"Session on '{self.db_path}' opened the catalog")
+        return self.catalog
+
+    def open_table(self, table_name) -> Table:
+        tbl = self.tables.get(table_name)
+        if tbl is None:
+            tbl = self.get_catalog().open_table(table_name)
+            self.tables[table_name] = tbl
+            logger.debug(f"Session on '{self.db_path}' opened table '{table_name}'")
+        if self.transaction is not None:
+            self.transaction.enlist(tbl)
+        return tbl
+
+    def release_table(self, table_name):
+        tbl = self.tables.pop(table_name, None)
+        if tbl is not None:
+            tbl.close()
+
+    def release_tables(self):
+        for tbl in self.tables.values():
+            tbl.close()
+        self.tables = {}
+
+    def begin(self):
+        if self.transaction is not None:
+            raise RuntimeError("Cannot start a transaction within a transaction")
+        self.transaction = Transaction(self.db_path, self.get_catalog())
+
+    def commit(self):
+        if self.transaction is None:
+            raise RuntimeError("No transaction is active")
+        transaction, self.transaction = self.transaction, None
+        transaction.commit()
+
+    def rollback(self):
+        if self.transaction is None:
+            raise RuntimeError("No transaction is active")
+        transaction, self.transaction = self.transaction, None
+        transaction.rollback()
+
+    def end_statement(self):
+        self.last_used = time.monotonic()
+        self.statements += 1
+        if self.transaction is None:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the dirty pages of every open handle back to its file.
+        """
+        for tbl in self.tables.values():
+            if tbl.owns_pager:
+                tbl.pager.commit()
+        if self.catalog is not None and self.catalog.pager is not None:
+            self.catalog.pager.commit()
+
+    @property
+    def is_open(self) -> bool:
+        return self.catalog is not None or bool(self.tables)
+
+    def close(self):
+        with self.lock:
+            if self.transaction is not None:
+                logger.warning(f"Closing session on '{self.db_path}' with an open transaction, rolling it back")
+                self.rollback()
+            self.release_tables()
+            if self.catalog is not None:
+                self.catalog.close()
+                self.catalog = None
+            logger.info(f"Session on '{self.db_path}' closed after {self.statements} statements")
+
+def get_session(db_path) -> DatabaseSession:
+    with _sessions_lock:
+        session = _sessions.get(db_path)
+        if session is None:
+            session = _sessions[db_path] = DatabaseSession(db_path)
+        return session
+
+def close_session(db_path):
+    """
+    Closes and forgets the session of a database, e.g. before it is deleted.
+    """
+    with _sessions_lock:
+        session = _sessions.pop(db_path, None)
+    if session is not None:
+        session.close()
+
+def close_idle_sessions(idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> int:
+    """
+    Closes the files of sessions unused for idle_timeout seconds. Sessions in a
+    transaction or running a statement are left alone. Returns how many were closed.
+    """
+    now = time.monotonic()
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    closed = 0
+    for session in sessions:
+        if not session.lock.acquire(blocking=False):
+            continue
+        try:
+            if session.is_open and session.transaction is None and now - session.last_used >= idle_timeout:
+                session.close()
+                closed += 1
+        finally:
+            session.lock.release()
+    return closed
+
+def close_all_sessions():
+    stop_idle_closer()
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+def start_idle_closer(idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+    """
+    Starts a daemon thread that runs close_idle_sessions every so often.
+    """
+    global _idle_closer
+    if _idle_closer is not None:
+        return
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(max(1.0, idle_timeout / 4)):
+            closed = close_idle_sessions(idle_timeout)
+            if closed:
+                logger.info(f"Closed {closed} idle database sessions")
+
+    thread = threading.Thread(target=run, name="idle session closer", daemon=True)
+    thread.start()
+    _idle_closer = (thread, stop)
+
+def stop_idle_closer():
+    global _idle_closer
+    if _idle_closer is None:
+        return
+    thread, stop = _idle_closer
+    _idle_closer = None
+    stop.set()
+    thread.join()
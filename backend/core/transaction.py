@@ -0,0 +1,50 @@
+from storage_engine.table import Table
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class Transaction:
+    """
+    The tables written between BEGIN and COMMIT/ROLLBACK in a DatabaseSession.
+
+    Every table the session opens while the transaction is active is enlisted:
+    its pager goes into transaction mode, so the pages a statement writes stay
+    in memory until COMMIT writes them back in one batch, or ROLLBACK drops
+    them. In a single-file database the catalog's pager is the one every table
+    uses. The table handles stay open in the session afterwards.
+    """
+    def __init__(self, db_path, catalog):
+        self.db_path = db_path
+        self.catalog = catalog
+        self.tables = {}  # table_name -> Table
+        if self.catalog.pager is not None:
+            self.catalog.pager.begin()
+
+    def enlist(self, tbl: Table):
+        if tbl.table_name in self.tables:
+            return
+        if tbl.owns_pager:
+            tbl.pager.begin()
+        self.tables[tbl.table_name] = tbl
+        logger.debug(f"Transaction on '{self.db_path}' enlisted table '{tbl.table_name}'")
+
+    def commit(self):
+        for tbl in self.tables.values():
+            if tbl.owns_pager:
+                tbl.pager.commit()
+        if self.catalog.pager is not None:
+            self.catalog.pager.commit()
+        logger.info(f"COMMIT: {len(self.tables)} tables written back in '{self.db_path}'")
+        self.tables = {}
+
+    def rollback(self):
+        for tbl in self.tables.values():
+            if tbl.owns_pager:
+                tbl.pager.rollback()
+            # Both may come from pages the rollback dropped
+            tbl.rightmost_leaf = None
+            tbl.last_key = None
+        if self.catalog.pager is not None:
+            self.catalog.pager.rollback()
+        logger.info(f"ROLLBACK: changes to {len(self.tables)} tables discarded in '{self.db_path}'")
+        self.tables = {}
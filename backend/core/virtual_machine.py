@@ -1,14 +1,15 @@
 from compiler.code_generator.opcode import Opcode
-from storage_engine.table import Table
 from utils.logger import get_logger
-from storage_engine.row_codec import encode_row, decode_row
-from meta.catalog import Catalog
+from storage_engine.row_codec import encode_row, get_codec
+from storage_engine.columnar import ColumnarTable
+from core.session import DatabaseSession, get_session
+import logging
 import os
 
 logger = get_logger(__name__)
 
 class VirtualMachine:
-    def __init__(self, code, db_path=None):
+    def __init__(self, code, db_path=None, session: DatabaseSession = None):
         self.code = code
         self.labels = {}
         self.instruction_pointer = 0
@@ -17,12 +18,15 @@ class VirtualMachine:
         self.row_cursor = -1
         self.current_row = None
         self.row_metadata = {}  # Maps rowid to (page_num, cell_num)
+        self.projection = None  # Columns OPEN_TABLE decoded, None for all of them
 
         self.registers = []
         self.output = []
         self.current_table = None
         self.db_path = db_path or os.getcwd()
-        self.catalog = Catalog(db_path=self.db_path)  # <-- Pass db_path
+        # The catalog and table handles outlive the statement, see core/session.py
+        self.session = session or get_session(self.db_path)
+        self.catalog = None  # The session's, taken in run()
         
         self.table_schemas = {}  # table_name -> schema
 
@@ -30,30 +34,41 @@ class VirtualMachine:
 
     def _index_labels(self):
         self.labels = {}
+        # The op_* method of every instruction, looked up once rather than each time it runs
+        self.handlers = []
         for idx, instruction in enumerate(self.code):
-            if instruction[0].name == "LABEL":
+            name = instruction[0].name
+            if name == "LABEL":
                 self.labels[instruction[1]] = idx
+            self.handlers.append(getattr(self, f"op_{name.lower()}", None))
+
+    @property
+    def transaction(self):
+        return self.session.transaction
 
     def run(self):
         self.instruction_pointer = 0
         self._jumped = False
-        try:
-            while self.instruction_pointer < len(self.code):
-                instr = self.code[self.instruction_pointer]
-                op = instr[0]
-                args = instr[1:]
-                method = getattr(self, f"op_{op.name.lower()}", None)
-                if method:
-                    logger.debug(f"IP={self.instruction_pointer}: Executing {op.name} {args}")
-                    method(*args)
-                    if hasattr(self, '_jumped') and self._jumped:
-                        self._jumped = False
-                        continue
-                self.instruction_pointer += 1
-        finally:
-            if self.current_table:
-                self.current_table.close()
+        debug = logger.isEnabledFor(logging.DEBUG)
+        with self.session.lock:
+            self.catalog = self.session.get_catalog()
+            try:
+                while self.instruction_pointer < len(self.code):
+                    instr = self.code[self.instruction_pointer]
+                    method = self.handlers[self.instruction_pointer]
+                    if method:
+                        args = instr[1:]
+                        if debug:
+                            logger.debug(f"IP={self.instruction_pointer}: Executing {instr[0].name} {args}")
+                        method(*args)
+                        if hasattr(self, '_jumped') and self._jumped:
+                            self._jumped = False
+                            continue
+                    self.instruction_pointer += 1
+            finally:
+                # The table stays open in the session; outside a transaction its pages are written back
                 self.current_table = None
+                self.session.end_statement()
 
     def op_label(self, label_name):
         """
@@ -81,6 +96,18 @@ class VirtualMachine:
         self.instruction_pointer = self.labels[label]
         logger.debug(f"JUMP: Jump to {label}")
     
+    def op_begin_transaction(self):
+        self.session.begin()
+        logger.info(f"BEGIN_TRANSACTION: Transaction started on '{self.db_path}'")
+
+    def op_commit_transaction(self):
+        self.session.commit()
+        logger.info(f"COMMIT_TRANSACTION: Transaction committed on '{self.db_path}'")
+
+    def op_rollback_transaction(self):
+        self.session.rollback()
+        logger.info(f"ROLLBACK_TRANSACTION: Transaction rolled back on '{self.db_path}'")
+
     def op_scan_end(self):
         """
         Marks end of table scan. No-op in memory model.
@@ -92,7 +119,12 @@ class VirtualMachine:
         self.registers.append(value)
         logger.debug(f"LOAD_CONST: Pushed {value}")
 
-    def op_open_table(self, table_name):
+    def op_open_table(self, table_name, columns=None, scan=True):
+        """
+        Opens a table and reads its rows, decoding only the given columns
+        (every column if None) plus the rowid. A columnar table reads only the
+        chains of those columns. With scan False no row is read.
+        """
         logger.debug(f"OPEN_TABLE: Opening table '{table_name}'")
         schema = self.table_schemas.get(table_name)
         if schema is None:
@@ -103,13 +135,23 @@ class VirtualMachine:
             else:
                 raise RuntimeError(f"No schema found for table '{table_name}'")
         logger.info(f"OPEN_TABLE: Using schema for '{table_name}': {schema}")
-        tbl = Table(table_name, db_path=self.db_path)
+        tbl = self.session.open_table(table_name)
         tbl.schema = schema
         self.current_table = tbl
         self.rows = []
         self.row_metadata = {}
-        for key, value, page_num in tbl.scan_page(tbl.root_page_num):
-            row = decode_row(value)
+        self.projection = None if columns is None else tuple(columns)
+        if not scan:
+            return
+        if isinstance(tbl, ColumnarTable):
+            for key, row in tbl.scan_rows(self.projection):
+                row["rowid"] = key
+                self.rows.append(row)
+                self.row_metadata[key] = (None, None)
+            return
+        codec = get_codec(schema)
+        for key, value, page_num in tbl.scan():
+            row = codec.decode(value) if columns is None else codec.decode_columns(value, self.projection)
             row["rowid"] = key
             self.rows.append(row)
             self.row_metadata[key] = (page_num, None)  # Track correct page_num
@@ -207,8 +249,7 @@ class VirtualMachine:
         self.output.append(result)
         logger.info(f"EMIT_ROW: {result}")
 
-    def op_insert_row(self, table):
-        logger.debug(f"INSERT_ROW: Inserting into table '{table}'")
+    def _insert_schema(self, table) -> list:
         # Use already-open self.current_table
         if not self.current_table or self.current_table.table_name != table:
             raise Exception(f"Table '{table}' is not open. Call OPEN_TABLE first.")
@@ -217,28 +258,63 @@ class VirtualMachine:
         if not schema_info:
             raise Exception(f"Table '{table}' does not exist in catalog.")
         if isinstance(schema_info, dict) and "columns" in schema_info:
-            columns = [col[0] for col in schema_info["columns"]]
-        else:
-            columns = [col[0] for col in schema_info]
-        logger.debug(f"Register stack: {self.registers} (expecting {len(columns)} values)")
-        if len(self.registers) < len(columns):
-            raise Exception(f"Not enough values on stack for insert into '{table}'")
+            return schema_info["columns"]
+        return schema_info
+
+    def _check_width(self, table, columns, width):
+        # Row width as parsed; None for code generated without it
+        if width is not None and width != len(columns):
+            raise RuntimeError(f"Table '{table}' has {len(columns)} columns but {width} values were supplied")
+
+    def _pop_row(self, columns) -> dict:
         # Extract values from stack in reverse order
         values = []
         for col in reversed(columns):
             values.append(self.registers.pop())
             logger.debug(f"Popped value for column '{col}': {values[-1]}")
-        row = dict(zip(columns, values[::-1]))
-        encoded = encode_row(row)
-        # Determine a new row ID
-        existing_page = self.current_table.load_root_page()
-        max_id = max([key for key,_ in existing_page.cells], default=0)
-        new_row_id = max_id + 1
-        self.current_table.insert(new_row_id, encoded)
+        return dict(zip(columns, values[::-1]))
+
+    def op_insert_row(self, table, width=None):
+        logger.debug(f"INSERT_ROW: Inserting into table '{table}'")
+        schema = self._insert_schema(table)
+        columns = [col[0] for col in schema]
+        self._check_width(table, columns, width)
+        logger.debug(f"Register stack: {self.registers} (expecting {len(columns)} values)")
+        if len(self.registers) < len(columns):
+            raise Exception(f"Not enough values on stack for insert into '{table}'")
+        row = self._pop_row(columns)
+        # One past the largest rowid, cached by the table after its first descent
+        new_row_id = self.current_table.next_rowid()
+        if isinstance(self.current_table, ColumnarTable):
+            self.current_table.insert(new_row_id, row)
+        else:
+            self.current_table.insert(new_row_id, encode_row(row, schema))
         logger.info(f"INSERT_ROW: Inserted row with ID {new_row_id} into table '{table}'")
         row["rowid"] = new_row_id
         self.rows.append(row)
 
+    def op_insert_rows(self, table, count, width=None):
+        logger.debug(f"INSERT_ROWS: Inserting {count} rows into table '{table}'")
+        schema = self._insert_schema(table)
+        columns = [col[0] for col in schema]
+        self._check_width(table, columns, width)
+        if len(self.registers) < len(columns) * count:
+            raise Exception(f"Not enough values on stack for insert of {count} rows into '{table}'")
+        rows = [self._pop_row(columns) for _ in range(count)]
+        rows.reverse()
+        first_row_id = self.current_table.next_rowid()
+        if isinstance(self.current_table, ColumnarTable):
+            # Appended to the end of each column chain
+            self.current_table.insert_many(enumerate(rows, first_row_id))
+        else:
+            # One batch, so each leaf and parent page the rows land in is rewritten once
+            self.current_table.insert_many((rowid, encode_row(row, schema))
+                                           for rowid, row in enumerate(rows, first_row_id))
+        for new_row_id, row in enumerate(rows, first_row_id):
+            row["rowid"] = new_row_id
+        logger.info(f"INSERT_ROWS: Inserted rows with IDs {first_row_id}-{first_row_id + count - 1} into table '{table}'")
+        self.rows.extend(rows)
+
     def op_update_column(self, column_name):
         if self.current_row is None:
             raise RuntimeError("No current row to update.")
@@ -250,11 +326,13 @@ class VirtualMachine:
         if self.current_row is None:
             raise RuntimeError("No current row to commit update.")
         rowid = self.current_row["rowid"]
-        page_num, _ = self.row_metadata[rowid]
-        page = self.current_table.load_page(page_num)
-        new_value = encode_row(self.current_row)
-        page.update_leaf_cell(rowid, new_value)
-        self.current_table.save_page(page_num, page)
+        row = self.current_row
+        if self.projection is not None:
+            # Only some columns were decoded; the row is rewritten whole
+            row = get_codec(self.current_table.schema).decode(self.current_table.find(rowid)) | row
+        new_value = encode_row(row, self.current_table.schema)
+        # Table.update finds the leaf itself and handles overflow chains and rows that outgrow their page
+        self.current_table.update(rowid, new_value)
         self.rows[self.row_cursor] = self.current_row.copy()
         logger.info(f"UPDATE_ROW: Row {self.row_cursor} updated and persisted: {self.current_row}")
 
@@ -271,28 +349,62 @@ class VirtualMachine:
         self.row_cursor -= 1
         self.current_row = None
 
-    def op_create_table(self, table_name, columns):
-        logger.info(f"CREATE_TABLE: Defined table '{table_name}' with columns: {columns}")
+    def op_create_table(self, table_name, columns, engine=None):
+        logger.info(f"CREATE_TABLE: Defined table '{table_name}' with columns: {columns}, engine: {engine or 'ROW'}")
+        if self.transaction is not None:
+            raise RuntimeError("CREATE TABLE is not supported inside a transaction")
+        if table_name in self.catalog.table_schemas:
+            raise RuntimeError(f"Table '{table_name}' already exists")
         self.table_schemas[table_name] =  columns
-        # Allocate a new table file and root page
-        tbl = Table(table_name, db_path=self.db_path)
+        # Allocate a new table file (or a root page in a single-file database)
+        tbl = self.catalog.open_table(table_name, columns, engine)
         tbl.close()
-        self.catalog.create_table(table_name, columns, root_page = tbl.root_page_num)
+        self.catalog.create_table(table_name, columns, root_page = tbl.root_page_num, engine=engine)
         logger.info(f"CREATE_TABLE: Table '{table_name}' created with root page {tbl.root_page_num}")
 
     def op_drop_table(self, table_name):
         logger.info(f"DROP_TABLE: Dropping table '{table_name}'")
+        if self.transaction is not None:
+            raise RuntimeError("DROP TABLE is not supported inside a transaction")
         tbl_filename = os.path.join(self.db_path, f"{table_name}.tbl")
-        if os.path.exists(tbl_filename):
+        self.session.release_table(table_name)
+        tbl = None
+        if self.catalog.pager is not None and table_name in self.catalog.root_pages:
+            # Opened while the catalog still knows its root page
+            tbl = self.catalog.open_table(table_name)
+        # The catalog entry goes first, so a failure leaves the table's storage in place
+        self.catalog.drop_table(table_name)
+        logger.debug(f"DROP_TABLE: Removed '{table_name}' from catalog")
+        if table_name in self.table_schemas:
+            del self.table_schemas[table_name]
+            logger.debug(f"DROP_TABLE: Removed schema for '{table_name}' from memory")
+        if self.catalog.pager is not None:
+            if tbl is not None:
+                tbl.free_pages()
+                logger.debug(f"DROP_TABLE: Freed pages of '{table_name}' in single-file database")
+        elif os.path.exists(tbl_filename):
             os.remove(tbl_filename)
             logger.debug(f"DROP_TABLE: Removed file '{tbl_filename}'")
         else:
             logger.warning(f"DROP_TABLE: File '{tbl_filename}' does not exist, skipping removal.")
-        if table_name in self.table_schemas:
-            del self.table_schemas[table_name]
-            logger.debug(f"DROP_TABLE: Removed schema for '{table_name}' from memory")
-        self.catalog.drop_table(table_name)
-        logger.debug(f"DROP_TABLE: Removed '{table_name}' from catalog")
+
+    def op_vacuum(self, table_name):
+        logger.info(f"VACUUM: Rebuilding {table_name or 'all tables'} in '{self.db_path}'")
+        if self.transaction is not None:
+            raise RuntimeError("VACUUM is not supported inside a transaction")
+        # The rebuilt files replace the ones the session's handles have open
+        self.session.release_tables()
+        for report in self.catalog.vacuum(table_name):
+            # One output row per rebuilt file
+            result = {
+                "table": report["table"],
+                "pages_before": report["pages_before"],
+                "pages_after": report["pages_after"],
+                "pages_reclaimed": report["pages_before"] - report["pages_after"],
+                "bytes_reclaimed": report["bytes_before"] - report["bytes_after"],
+            }
+            self.output.append(result)
+            logger.info(f"VACUUM: {result}")
         
     def op_logical_and(self):
         left = self.registers.pop()
@@ -9,6 +9,9 @@ from compiler.parser.statements import parse_statement
 from compiler.parser import Parser
 from compiler.code_generator import generate
 from core.virtual_machine import VirtualMachine
+from core.session import get_session, close_session, close_all_sessions, start_idle_closer
+from meta.catalog import SINGLE_FILE_NAME
+from storage_engine.pager import Pager, check_page_size
 
 from utils.errors import TokenizationError
 from utils.logger import get_logger
@@ -105,14 +108,22 @@ def ensure_databases_root():
     os.makedirs(DATABASES_ROOT, exist_ok=True)
 
 # --- Internal Database Management Functions ---
-def create_database(name: str):
+def create_database(name: str, single_file: bool = False, compressed: bool = False, page_size: int = None):
     ensure_databases_root()
     db_path = get_db_path(name)
     if os.path.exists(db_path):
         print_colored(f"Database '{name}' already exists.", color=YELLOW, bold=True)
         raise typer.Exit(1)
+    if page_size is not None:
+        check_page_size(page_size)
     os.makedirs(db_path)
-    open(os.path.join(db_path, "__catalog.tbl"), "wb").close()
+    # A single-file database keeps the catalog and every table in database.db
+    catalog_file = os.path.join(db_path, SINGLE_FILE_NAME if single_file else "__catalog.tbl")
+    if compressed or page_size:
+        # The codec and page size are recorded in the new file's header; the catalog applies them to new tables
+        Pager(catalog_file, compression="zlib" if compressed else None, page_size=page_size).close()
+    else:
+        open(catalog_file, "wb").close()
     print_colored(f"Database '{name}' created.", color=GREEN, bold=True)
 
 def delete_database(name: str):
@@ -120,6 +131,7 @@ def delete_database(name: str):
     if not os.path.exists(db_path):
         print_colored(f"Database '{name}' does not exist.", color=RED, bold=True)
         raise typer.Exit(1)
+    close_session(db_path)
     shutil.rmtree(db_path)
     global current_db
     if current_db == name:
@@ -147,16 +159,30 @@ def show_all_tables():
     if not db_path:
         print_colored("No active database selected. Use 'use-db <name>' to continue.", color=RED, bold=True)
         raise typer.Exit(1)
-    tbls = [f for f in os.listdir(db_path) if f.endswith('.tbl') and f != "__catalog.tbl"]
+    session = get_session(db_path)
+    with session.lock:
+        tbls = session.get_catalog().list_tables()
     print_colored("\nTables:", color=YELLOW, bold=True)
     for t in tbls:
-        print_colored(t[:-4], color=CYAN)
+        print_colored(t, color=CYAN)
 
 # --- Database Management Commands ---
+def validate_page_size(page_size: int):
+    # Reported by typer as a bad --page-size instead of a traceback
+    if page_size is not None:
+        try:
+            check_page_size(page_size)
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+    return page_size
+
 @app.command()
-def create_db(name: str):
+def create_db(name: str, single_file: bool = typer.Option(False, "--single-file", help="Store all tables in one file."),
+              compressed: bool = typer.Option(False, "--compressed", help="Compress pages on disk with zlib."),
+              page_size: int = typer.Option(None, "--page-size", callback=validate_page_size,
+                                             help="Page size in bytes, a power of two from 1024 to 65536.")):
     """Create a new database."""
-    create_database(name)
+    create_database(name, single_file=single_file, compressed=compressed, page_size=page_size)
 
 @app.command()
 def delete_db(name: str):
@@ -209,8 +235,8 @@ def process_sql(sql, tokenizer, logger):
             args_str = ", ".join(map(str, args))
             print(f"{opcode.name}({args_str})")
 
-        # Pass db_path to VirtualMachine
-        vm = VirtualMachine(codegen, db_path=db_path)
+        # The database's session keeps the catalog and tables open between statements
+        vm = VirtualMachine(codegen, db_path=db_path, session=get_session(db_path))
         vm.run()
         if vm.output:
             print_colored("\nVM Output:", color=GREEN, bold=True)
@@ -246,6 +272,14 @@ def process_sql(sql, tokenizer, logger):
             print_colored("\nTable created successfully.", color=GREEN, bold=True)
         elif parse_tree.get("type") == "DROP":
             print_colored("\nTable dropped successfully.", color=GREEN, bold=True)
+        elif parse_tree.get("type") == "BEGIN":
+            print_colored("\nTransaction started.", color=GREEN, bold=True)
+        elif parse_tree.get("type") == "COMMIT":
+            print_colored("\nTransaction committed.", color=GREEN, bold=True)
+        elif parse_tree.get("type") == "ROLLBACK":
+            print_colored("\nTransaction rolled back.", color=GREEN, bold=True)
+        elif parse_tree.get("type") == "VACUUM":
+            print_colored("\nVacuum completed.", color=GREEN, bold=True)
     except TokenizationError as e:
         logger.error(f"Tokenization error: {e}")
         print_colored(f"Tokenization error: {e}", color=RED, bold=True)
@@ -275,6 +309,8 @@ def show_sql_help():
         "SELECT ...",
         "UPDATE ...",
         "DELETE FROM ...",
+        "BEGIN / COMMIT / ROLLBACK",
+        "VACUUM [table]",
         # Add more supported SQL statements as you implement them
     ]
     print_colored("\nSupported SQL statements:", color=YELLOW, bold=True)
@@ -290,10 +326,19 @@ def handle_meta_command(cmd: str):
     args = tokens[1:]
     try:
         if command in {'.create-db', '.createdb'}:
-            if len(args) != 1:
-                print_colored("Usage: .create-db <name>", color=YELLOW, bold=True)
+            single_file = "--single-file" in args
+            compressed = "--compressed" in args
+            page_size = None
+            if "--page-size" in args:
+                index = args.index("--page-size")
+                page_size = int(args[index + 1]) if index + 1 < len(args) and args[index + 1].isdigit() else 0
+                del args[index:index + 2]
+            args = [arg for arg in args if arg not in {"--single-file", "--compressed"}]
+            if len(args) != 1 or page_size == 0:
+                print_colored("Usage: .create-db <name> [--single-file] [--compressed] [--page-size <bytes>]",
+                              color=YELLOW, bold=True)
             else:
-                create_database(args[0])
+                create_database(args[0], single_file=single_file, compressed=compressed, page_size=page_size)
         elif command in {'.delete-db', '.deletedb'}:
             if len(args) != 1:
                 print_colored("Usage: .delete-db <name>", color=YELLOW, bold=True)
@@ -325,7 +370,7 @@ def handle_meta_command(cmd: str):
 
 def show_meta_commands():
     meta_cmds = [
-        ".create-db <name>   - Create a new database",
+        ".create-db <name>   - Create a new database (add --single-file for one-file storage, --compressed for zlib pages, --page-size <bytes> for 1-64 KiB pages)",
         ".delete-db <name>   - Delete a database",
         ".list-dbs           - List all databases",
         ".use-db <name>      - Select a database for this session",
@@ -349,6 +394,13 @@ def main(commands: bool = typer.Option(False, "--commands", help="Show supported
     splash_screen()
     show_meta_commands()
     ensure_databases_root()
+    start_idle_closer()
+    try:
+        run_shell(logger, tokenizer)
+    finally:
+        close_all_sessions()
+
+def run_shell(logger, tokenizer):
     while True:
         try:
             if use_rich:
@@ -382,32 +434,11 @@ def interactive_shell():
     splash_screen()
     show_meta_commands()
     ensure_databases_root()
-    while True:
-        try:
-            if use_rich:
-                sql = Prompt.ask(f"[bold green]{get_prompt()}[/bold green]")
-            else:
-                sql = input(f"{GREEN}{get_prompt()}{RESET} ")
-            sql = sql.strip()
-            if sql.lower() in {".exit", ".quit"}:
-                print_colored("Goodbye!", color=CYAN, bold=True)
-                break
-            if sql.lower() == ".help":
-                show_meta_commands()
-                continue
-            if sql.lower() == ".commands":
-                show_meta_commands()
-                continue
-            if sql.startswith(".") and sql.lower() not in {".exit", ".quit", ".help", ".commands"}:
-                handle_meta_command(sql)
-                continue
-            if not sql:
-                continue
-            process_sql(sql, tokenizer, logger)
-        except (KeyboardInterrupt, EOFError):
-            print()
-            print_colored("Goodbye!", color=CYAN, bold=True)
-            break
+    start_idle_closer()
+    try:
+        run_shell(logger, tokenizer)
+    finally:
+        close_all_sessions()
 
 @app.callback(invoke_without_command=True)
 def default_callback(ctx: typer.Context):
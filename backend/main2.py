@@ -16,6 +16,9 @@ from compiler.parser.statements import parse_statement
 from compiler.parser import Parser
 from compiler.code_generator import generate
 from core.virtual_machine import VirtualMachine
+from core.session import get_session, close_session, close_all_sessions, start_idle_closer
+from meta.catalog import SINGLE_FILE_NAME
+from storage_engine.pager import Pager, check_page_size
 from utils.errors import TokenizationError
 from utils.logger import get_logger
 
@@ -74,19 +77,30 @@ def get_db_path(db_name):
 def ensure_databases_root():
     os.makedirs(DATABASES_ROOT, exist_ok=True)
 
-def create_database_internal(name: str):
+def create_database_internal(name: str, single_file: bool = False, compressed: bool = False,
+                             page_size: Optional[int] = None):
     ensure_databases_root()
     db_path = get_db_path(name)
     if os.path.exists(db_path):
         return False, f"Database '{name}' already exists."
+    if page_size is not None:
+        try:
+            check_page_size(page_size)
+        except ValueError as e:
+            return False, str(e)
     os.makedirs(db_path)
-    open(os.path.join(db_path, "__catalog.tbl"), "wb").close()
+    catalog_file = os.path.join(db_path, SINGLE_FILE_NAME if single_file else "__catalog.tbl")
+    if compressed or page_size:
+        Pager(catalog_file, compression="zlib" if compressed else None, page_size=page_size).close()
+    else:
+        open(catalog_file, "wb").close()
     return True, f"Database '{name}' created."
 
 def delete_database_internal(name: str):
     db_path = get_db_path(name)
     if not os.path.exists(db_path):
         return False, f"Database '{name}' does not exist."
+    close_session(db_path)
     shutil.rmtree(db_path)
     return True, f"Database '{name}' deleted."
 
@@ -99,8 +113,9 @@ def list_tables_internal(db_name: str):
     db_path = get_db_path(db_name)
     if not os.path.exists(db_path):
         return []
-    tbls = [f[:-4] for f in os.listdir(db_path) if f.endswith('.tbl') and f != "__catalog.tbl"]
-    return tbls
+    session = get_session(db_path)
+    with session.lock:
+        return session.get_catalog().list_tables()
 
 def process_sql_internal(sql: str, db_name: str):
     """Process SQL query and return structured response"""
@@ -128,7 +143,8 @@ def process_sql_internal(sql: str, db_name: str):
             opcode_list.append(f"{opcode.name}({args_str})")
         
         # Virtual machine execution
-        vm = VirtualMachine(codegen, db_path=db_path)
+        # The database's session keeps the catalog and tables open between requests
+        vm = VirtualMachine(codegen, db_path=db_path, session=get_session(db_path))
         vm.run()
         
         # Format result
@@ -147,6 +163,14 @@ def process_sql_internal(sql: str, db_name: str):
             message = "Update operation completed successfully."
         elif parse_tree.get("type") == "DELETE":
             message = "Delete operation completed successfully."
+        elif parse_tree.get("type") == "BEGIN":
+            message = "Transaction started."
+        elif parse_tree.get("type") == "COMMIT":
+            message = "Transaction committed."
+        elif parse_tree.get("type") == "ROLLBACK":
+            message = "Transaction rolled back."
+        elif parse_tree.get("type") == "VACUUM":
+            message = "Vacuum completed."
         
         return {
             "success": True,
@@ -263,10 +287,12 @@ async def list_tables(database_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/demo/databases")
-async def create_database(database_name: str):
+async def create_database(database_name: str, single_file: bool = False, compressed: bool = False,
+                          page_size: Optional[int] = None):
     """Create a new database"""
     try:
-        success, message = create_database_internal(database_name)
+        success, message = create_database_internal(database_name, single_file=single_file, compressed=compressed,
+                                                    page_size=page_size)
         if success:
             return {"success": True, "message": message}
         else:
@@ -303,6 +329,11 @@ async def startup_event():
     # Create default database if it doesn't exist
     if not os.path.exists(get_db_path("main")):
         create_database_internal("main")
+    start_idle_closer()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    close_all_sessions()
 
 # Run the server
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 import json
 import os
 from storage_engine.table import Table
+from storage_engine.columnar import ColumnarTable
+from storage_engine.os_interface import replace_file
+from storage_engine.pager import Pager
 from storage_engine.row_codec import encode_row, decode_row
 from utils.logger import get_logger
 
@@ -10,87 +13,210 @@ CATALOG_TABLE = "__catalog"
 CATALOG_SCHEMA = [
     ("table_name", "TEXT"),
     ("root_page", "INT"),
-    ("columns", "TEXT"),  # JSON-encoded list of (name, type)
+    ("columns", "TEXT"),  # JSON-encoded list of (name, type), or {"engine", "columns"} for columnar tables
 ]
+COLUMNAR = "COLUMNAR"  # Storage engine of CREATE TABLE ... USING COLUMNAR, see storage_engine/columnar.py
+SINGLE_FILE_NAME = "database.db"  # Present in databases that keep every table in one file
+
+def is_single_file_database(db_path) -> bool:
+    return os.path.exists(os.path.join(db_path, SINGLE_FILE_NAME))
 
 class Catalog:
+    """
+    Table schemas and root pages of one database.
+
+    A database is either a directory of <table>.tbl files plus __catalog.tbl, or,
+    when database.db exists, a single file holding every table's B-Tree. In the
+    single-file layout the catalog keeps that file's Pager open until close(), the
+    catalog tree is rooted at the file header's root page, and every other table
+    is opened at the root page recorded in its catalog row.
+
+    A database created with page compression or a non-default page size has a
+    catalog file in that format; new table files of that database are created
+    the same way.
+
+    Tables are B-Trees of rows unless created USING COLUMNAR; open_table()
+    returns a ColumnarTable for those.
+    """
     def __init__(self, db_path=None):
         self.db_path = db_path or os.getcwd()
-        self.table_schemas = {}  # table_name -> {columns: [(name, type)], root_page: int}
+        self.table_schemas = {}  # table_name -> [(name, type)]
+        self.root_pages = {}  # table_name -> root page number
+        self.engines = {}  # table_name -> COLUMNAR, for tables not stored as rows
+        self.pager = None
+        self.compression = None  # Page codec of the catalog file, used for new table files
+        self.page_size = None  # Page size of the catalog file, likewise
+        if is_single_file_database(self.db_path):
+            self.pager = Pager(os.path.join(self.db_path, SINGLE_FILE_NAME))
         self._ensure_catalog_table()
         self.load()
 
+    def _open_catalog_table(self) -> Table:
+        if self.pager is None:
+            return Table(CATALOG_TABLE, db_path=self.db_path)
+        return Table(CATALOG_TABLE, pager=self.pager, root_page_num=self.pager.read_root_page_number())
+
+    def open_table(self, table_name, columns=None, engine=None) -> Table:
+        """
+        Opens a table in whichever layout this database uses. In the single-file
+        layout an unknown table gets a freshly allocated root page. The columns
+        and engine of a table not in the catalog yet may be given.
+        """
+        if (engine or self.engines.get(table_name)) == COLUMNAR:
+            schema = columns or self.table_schemas[table_name]
+            if self.pager is None:
+                return ColumnarTable(table_name, schema, db_path=self.db_path, compression=self.compression,
+                                     page_size=self.page_size)
+            return ColumnarTable(table_name, schema, db_path=self.db_path, pager=self.pager,
+                                 root_page_num=self.root_pages.get(table_name))
+        if self.pager is None:
+            return Table(table_name, db_path=self.db_path, compression=self.compression, page_size=self.page_size)
+        return Table(table_name, db_path=self.db_path, pager=self.pager,
+                     root_page_num=self.root_pages.get(table_name))
+
     def _ensure_catalog_table(self):
         # Create catalog table if it doesn't exist
-        tbl = Table(CATALOG_TABLE, db_path=self.db_path)
-        if tbl.root_page_num == 1 and not any(True for _ in tbl.scan_page(tbl.root_page_num)):
+        tbl = self._open_catalog_table()
+        self.compression = tbl.pager.compression
+        self.page_size = tbl.pager.page_size
+        if tbl.root_page_num == 1 and not any(True for _ in tbl.scan()):
             # Insert the catalog's own schema as the first row
             row = {
                 "table_name": CATALOG_TABLE,
                 "root_page": 1,
                 "columns": json.dumps(CATALOG_SCHEMA),
             }
-            tbl.insert(1, encode_row(row))
+            tbl.insert(1, encode_row(row, CATALOG_SCHEMA))
             tbl.save_root_page(tbl.load_root_page())
             logger.info("Bootstrapped __catalog table.")
         tbl.close()
 
     def load(self):
         self.table_schemas = {}
-        tbl = Table(CATALOG_TABLE, db_path=self.db_path)
-        for _, value, *_ in tbl.scan_page(tbl.root_page_num):
+        self.root_pages = {}
+        self.engines = {}
+        tbl = self._open_catalog_table()
+        for _, value, *_ in tbl.scan():
+            value = bytes(value)
             if not value or value.strip() == b'':
                 continue
             try:
-                row = decode_row(value)
+                row = decode_row(value, CATALOG_SCHEMA)
             except ValueError as e:
                 logger.error(f"Failed to decode row in catalog: {e}")
                 continue
-            self.table_schemas[row["table_name"]] = json.loads(row["columns"])
+            columns = json.loads(row["columns"])
+            if isinstance(columns, dict):
+                self.engines[row["table_name"]] = columns["engine"]
+                columns = columns["columns"]
+            self.table_schemas[row["table_name"]] = columns
+            self.root_pages[row["table_name"]] = row["root_page"]
         tbl.close()
         logger.info(f"Loaded schema for all tables from catalog.")
 
-    def create_table(self, table_name, columns, root_page):
+    def create_table(self, table_name, columns, root_page, engine=None):
         if root_page == 0:
             raise ValueError(f"Refusing to write catalog entry for table '{table_name}' with root_page 0")
-        tbl = Table(CATALOG_TABLE, db_path=self.db_path)
-        # Find next available key
-        max_id = 0
-        for key, *_ in tbl.scan_page(tbl.root_page_num):
-            max_id = max(max_id, key)
+        if engine not in (None, COLUMNAR):
+            raise ValueError(f"Unknown storage engine '{engine}' for table '{table_name}'")
+        tbl = self._open_catalog_table()
         row = {
             "table_name": table_name,
             "root_page": root_page,
-            "columns": json.dumps(columns),
+            "columns": json.dumps(columns if engine is None else {"engine": engine, "columns": columns}),
         }
-        tbl.insert(max_id + 1, encode_row(row))
+        tbl.insert(tbl.next_rowid(), encode_row(row, CATALOG_SCHEMA))
         tbl.save_root_page(tbl.load_root_page())
         tbl.close()
         self.load()
         logger.info(f"Added table '{table_name}' to catalog.")
         
     def drop_table(self, table_name):
-        tbl = Table(CATALOG_TABLE, db_path=self.db_path)
-        rows = []
-        for key, value, *_ in tbl.scan_page(tbl.root_page_num):
+        tbl = self._open_catalog_table()
+        keys = []
+        for key, value, *_ in tbl.scan():
+            value = bytes(value)
             if not value or value.strip() == b'':
                 continue
             try:
-                row = decode_row(value)
+                row = decode_row(value, CATALOG_SCHEMA)
             except ValueError as e:
                 logger.error(f"Failed to decode row in catalog: {e}")
                 continue
-            if row.get("table_name") != table_name:
-                rows.append((key, value))
-        # Clear the catalog table
-        root_page = tbl.load_root_page()
-        root_page.cells = []
-        tbl.save_root_page(root_page)
-        # Re-insert only the rows for tables not being dropped
-        for idx, (key, value) in enumerate(rows, 1):
-            tbl.insert(idx, value)
+            if row.get("table_name") == table_name:
+                keys.append(key)
+        # Deleted once the scan is over, as deletes may merge the pages it reads
+        for key in keys:
+            tbl.delete(key)
         tbl.close()
         self.load()
 
     def get_schema(self, table_name):
         return self.table_schemas.get(table_name, None)
+
+    def list_tables(self):
+        return [name for name in self.table_schemas if name != CATALOG_TABLE]
+
+    def vacuum(self, table_name=None) -> list:
+        """
+        Rebuilds tables into densely packed files and returns one report per file
+        rebuilt (see Table.vacuum). Without a table name every table is rebuilt,
+        the catalog included. A single-file database is always rebuilt as a whole,
+        since that is the only way to give its free pages back.
+        """
+        if table_name is not None and table_name not in self.table_schemas:
+            raise RuntimeError(f"No schema found for table '{table_name}'")
+        if self.pager is not None:
+            return [dict(table=SINGLE_FILE_NAME, **self._vacuum_single_file())]
+        reports = []
+        for name in [table_name] if table_name else [CATALOG_TABLE] + self.list_tables():
+            tbl = self._open_catalog_table() if name == CATALOG_TABLE else self.open_table(name)
+            try:
+                reports.append(dict(table=name, **tbl.vacuum()))
+            finally:
+                tbl.close()
+        return reports
+
+    def _vacuum_single_file(self) -> dict:
+        filename = os.path.join(self.db_path, SINGLE_FILE_NAME)
+        temp_filename = filename + ".vacuum"
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)  # Left behind by an interrupted VACUUM
+        target = Pager(temp_filename, cache_size=self.pager.cache_size, compression=self.pager.compression,
+                       page_size=self.pager.page_size)
+        # Allocated first, so the new catalog is rooted at page 1 like the header says
+        new_catalog = Table(CATALOG_TABLE, pager=target, root_page_num=None)
+        catalog = self._open_catalog_table()
+        entries = [(key, bytes(value)) for key, value, _ in catalog.scan()]
+        rows = []
+        for key, value in entries:
+            if not value.strip():
+                continue
+            row = decode_row(value, CATALOG_SCHEMA)
+            if row["table_name"] != CATALOG_TABLE:
+                if row["table_name"] in self.engines:
+                    new_table = ColumnarTable(row["table_name"], self.table_schemas[row["table_name"]],
+                                              pager=target, root_page_num=None)
+                else:
+                    new_table = Table(row["table_name"], pager=target, root_page_num=None)
+                self.open_table(row["table_name"]).copy_to(new_table)
+                row["root_page"] = new_table.root_page_num
+            rows.append((key, encode_row(row, CATALOG_SCHEMA)))
+        new_catalog.bulk_load(rows)
+        pages_before, pages_after = self.pager.num_pages, target.num_pages
+        target.close()
+        self.pager.close()
+        bytes_before = os.path.getsize(filename)
+        bytes_after = os.path.getsize(temp_filename)
+        replace_file(temp_filename, filename)
+        self.pager = Pager(filename)
+        self.load()
+        logger.info(f"Vacuumed single-file database '{self.db_path}': {pages_before} -> {pages_after} pages")
+        return {"pages_before": pages_before, "pages_after": pages_after,
+                "bytes_before": bytes_before, "bytes_after": bytes_after}
+
+    def close(self):
+        if self.pager is not None:
+            self.pager.close()
+            self.pager = None
+            logger.info(f"Closed single-file database in '{self.db_path}'")
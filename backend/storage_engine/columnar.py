@@ -0,0 +1,347 @@
+"""
+Column-oriented table storage for CREATE TABLE ... USING COLUMNAR.
+
+A ColumnarTable keeps every column, and the rowids, in a chain of its own
+segment pages, so a scan that needs two columns of a wide table reads only those
+two chains. The n-th value of every chain belongs to the n-th rowid.
+
+The root page (COLUMN_META_PAGE) holds the row count, the largest rowid and the
+first and last page of each chain. A segment page (SEGMENT_PAGE) starts with
+its encoding, value count and the next page of its chain; the encoding is
+picked per page from the values it holds:
+
+    SEGMENT_INT64   fixed-width 8 byte ints
+    SEGMENT_DOUBLE  fixed-width 8 byte floats
+    SEGMENT_TEXT    length-prefixed UTF-8
+    SEGMENT_VALUES  length-prefixed single-value records (see row_codec), for
+                    pages mixing types or holding NULLs
+
+Length-prefixed values that would take more than a quarter of a page are moved
+to an overflow chain. Rows can only be appended, with rowids past the largest
+one; UPDATE and DELETE are not supported.
+"""
+import os
+import struct
+from storage_engine.pager import Pager, DEFAULT_CACHE_SIZE
+from storage_engine.row_codec import RowCodec
+from storage_engine.varint import encode_varint, decode_varint, varint_size
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+COLUMN_META_PAGE = 0x43
+SEGMENT_PAGE = 0x53
+META_HEADER = struct.Struct(">BQqH")  # page type, row count, largest rowid, chain count
+CHAIN_ENTRY = struct.Struct(">II")  # first page, last page
+SEGMENT_HEADER = struct.Struct(">BBHI")  # page type, encoding, value count, next page
+OVERFLOW_ENTRY = struct.Struct(">I")  # first page of the overflow chain of a length-prefixed value
+
+SEGMENT_INT64 = 1
+SEGMENT_DOUBLE = 2
+SEGMENT_TEXT = 3
+SEGMENT_VALUES = 4
+
+_FIXED_CODES = {SEGMENT_INT64: "q", SEGMENT_DOUBLE: "d"}
+_VALUE_CODEC = RowCodec([("value", None)])
+
+def _value_encoding(value) -> int:
+    kind = type(value)
+    if kind is int and -0x8000000000000000 <= value < 0x8000000000000000:
+        return SEGMENT_INT64
+    if kind is float:
+        return SEGMENT_DOUBLE
+    if kind is str:
+        return SEGMENT_TEXT
+    return SEGMENT_VALUES
+
+class ColumnarTable:
+    """
+    A table stored column by column, rooted at a COLUMN_META_PAGE.
+
+    Like Table it either owns <table>.tbl, whose header names the root page, or
+    lives in a shared pager at root_page_num (a fresh root page is allocated
+    when it is None). Chain 0 holds the rowids, chain i + 1 the schema's i-th
+    column.
+    """
+    def __init__(self, table_name: str, schema, db_path=None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 pager: Pager = None, root_page_num: int = None, compression: str = None, page_size: int = None):
+        self.table_name = table_name
+        self.schema = schema
+        self.columns = [name for name, _ in schema]
+        self.db_path = db_path or os.getcwd()
+        self.owns_pager = pager is None
+        if self.owns_pager:
+            self.filename = os.path.join(self.db_path, f"{table_name}.tbl")
+            logger.info(f"Initializing ColumnarTable for '{self.table_name}', file: {self.filename}")
+            self.pager = Pager(self.filename, cache_size=cache_size, compression=compression, page_size=page_size)
+            root_page_num = self.pager.read_root_page_number()
+            if root_page_num == 0:
+                root_page_num = self.pager.allocate_page()
+                self.pager.write_root_page_number(root_page_num)
+        else:
+            self.pager = pager
+            self.filename = pager.filename
+        fresh = root_page_num is None
+        if fresh:
+            # May be a freed page still holding a dropped table's data
+            root_page_num = self.pager.allocate_page()
+        self.root_page_num = root_page_num
+        if not fresh:
+            data = self.pager.read_page(self.root_page_num)
+            if data[0] != COLUMN_META_PAGE:
+                if any(data):
+                    # Never overwrite the root of another kind of table
+                    logger.error(f"Page {self.root_page_num} of '{self.filename}' is not the root of a columnar table")
+                    raise ValueError(f"Table '{self.table_name}' already exists and is not a columnar table")
+                fresh = True
+        if fresh:
+            logger.info(f"Root page {self.root_page_num} is empty, initializing columnar table '{self.table_name}'")
+            self._write_meta(0, 0, [(0, 0)] * (len(self.columns) + 1))
+        self.capacity = self.pager.page_size - SEGMENT_HEADER.size
+        # Length-prefixed values above this many bytes go to an overflow chain
+        self.overflow_threshold = self.capacity // 4
+
+    def _read_meta(self):
+        data = self.pager.read_page(self.root_page_num)
+        page_type, row_count, last_rowid, chain_count = META_HEADER.unpack_from(data)
+        if page_type != COLUMN_META_PAGE:
+            raise ValueError(f"Page {self.root_page_num} is not the root of a columnar table")
+        if chain_count != len(self.columns) + 1:
+            raise ValueError(f"Columnar table '{self.table_name}' has {chain_count - 1} column chains, "
+                             f"its schema {len(self.columns)} columns")
+        chains = [CHAIN_ENTRY.unpack_from(data, META_HEADER.size + i * CHAIN_ENTRY.size) for i in range(chain_count)]
+        return row_count, last_rowid, chains
+
+    def _write_meta(self, row_count: int, last_rowid: int, chains):
+        size = META_HEADER.size + len(chains) * CHAIN_ENTRY.size
+        if size > self.pager.page_size:
+            raise ValueError(f"Columnar table '{self.table_name}' has too many columns for a "
+                             f"{self.pager.page_size} byte page")
+        buf = bytearray(self.pager.page_size)
+        META_HEADER.pack_into(buf, 0, COLUMN_META_PAGE, row_count, last_rowid, len(chains))
+        for i, chain in enumerate(chains):
+            CHAIN_ENTRY.pack_into(buf, META_HEADER.size + i * CHAIN_ENTRY.size, *chain)
+        self.pager.write_page(self.root_page_num, bytes(buf))
+
+    @property
+    def row_count(self) -> int:
+        return self._read_meta()[0]
+
+    def max_key(self):
+        row_count, last_rowid, _ = self._read_meta()
+        return last_rowid if row_count else None
+
+    def next_rowid(self) -> int:
+        last_key = self.max_key()
+        return 1 if last_key is None else last_key + 1
+
+    def insert(self, key, row: dict):
+        self.insert_many([(key, row)])
+
+    def insert_many(self, rows) -> int:
+        """
+        Appends (rowid, row dict) pairs with ascending rowids past the largest
+        one. The last page of each chain is rewritten once for the whole batch
+        and filled pages are chained after it. Returns the row count.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        row_count, last_rowid, chains = self._read_meta()
+        previous = last_rowid if row_count else None
+        for rowid, _ in rows:
+            if previous is not None and rowid <= previous:
+                raise ValueError(f"Columnar table '{self.table_name}' only supports appends: "
+                                 f"rowid {rowid} after {previous}")
+            previous = rowid
+        chains[0] = self._append(chains[0], [rowid for rowid, _ in rows])
+        for i, name in enumerate(self.columns, 1):
+            chains[i] = self._append(chains[i], [row.get(name) for _, row in rows])
+        self._write_meta(row_count + len(rows), previous, chains)
+        logger.info(f"Appended {len(rows)} rows to columnar table '{self.table_name}'")
+        return len(rows)
+
+    def _append(self, chain, values):
+        # Rewrites the chain's last page with the new values added, chaining new pages as it fills up
+        first_page, last_page = chain
+        if last_page:
+            data = self.pager.read_page(last_page)
+            values = self._read_segment(data) + values
+            self._free_overflow(data)  # Rewritten below
+        else:
+            first_page = last_page = self.pager.allocate_page()
+        page_number = last_page
+        segments = self._pack(values)
+        for i, (encoding, start, end) in enumerate(segments):
+            next_page = self.pager.allocate_page() if i + 1 < len(segments) else 0
+            self.pager.write_page(page_number, self._encode_segment(encoding, values[start:end], next_page))
+            last_page = page_number
+            page_number = next_page
+        return first_page, last_page
+
+    def _value_size(self, encoding: int, value) -> int:
+        if encoding in _FIXED_CODES:
+            return 8
+        size = len(self._value_bytes(encoding, value))
+        if size > self.overflow_threshold:
+            return varint_size(size << 1 | 1) + OVERFLOW_ENTRY.size
+        return varint_size(size << 1) + size
+
+    @staticmethod
+    def _value_bytes(encoding: int, value) -> bytes:
+        if encoding == SEGMENT_TEXT:
+            return value.encode("utf-8")
+        return _VALUE_CODEC.encode({"value": value}) or _json_value(value)
+
+    def _pack(self, values):
+        """
+        Splits values into runs that each fit a segment page, returning
+        (encoding, start, end) per page.
+        """
+        segments = []
+        start = 0
+        encoding = None
+        size = 0
+        for i, value in enumerate(values):
+            value_encoding = _value_encoding(value)
+            new_encoding = value_encoding if encoding in (None, value_encoding) else SEGMENT_VALUES
+            new_size = size
+            if new_encoding != encoding and encoding is not None:
+                # The run so far changes encoding as well
+                new_size = sum(self._value_size(new_encoding, v) for v in values[start:i])
+            new_size += self._value_size(new_encoding, value)
+            if i > start and new_size > self.capacity:
+                segments.append((encoding, start, i))
+                start = i
+                encoding = value_encoding
+                size = self._value_size(value_encoding, value)
+            else:
+                encoding = new_encoding
+                size = new_size
+        segments.append((encoding or SEGMENT_INT64, start, len(values)))
+        return segments
+
+    def _encode_segment(self, encoding: int, values, next_page: int) -> bytes:
+        parts = [SEGMENT_HEADER.pack(SEGMENT_PAGE, encoding, len(values), next_page)]
+        if encoding in _FIXED_CODES:
+            parts.append(struct.pack(f">{len(values)}{_FIXED_CODES[encoding]}", *values))
+        else:
+            for value in values:
+                data = self._value_bytes(encoding, value)
+                if len(data) > self.overflow_threshold:
+                    parts.append(encode_varint(len(data) << 1 | 1))
+                    parts.append(OVERFLOW_ENTRY.pack(self.pager.write_overflow(data)))
+                else:
+                    parts.append(encode_varint(len(data) << 1))
+                    parts.append(data)
+        data = b"".join(parts)
+        return data + bytes(self.pager.page_size - len(data))
+
+    def _segment_entries(self, data):
+        # Yields (value bytes or None, overflow first page or 0, length) of a length-prefixed segment
+        count = SEGMENT_HEADER.unpack_from(data)[2]
+        offset = SEGMENT_HEADER.size
+        for _ in range(count):
+            length, offset = decode_varint(data, offset)
+            if length & 1:
+                first_page = OVERFLOW_ENTRY.unpack_from(data, offset)[0]
+                offset += OVERFLOW_ENTRY.size
+                yield None, first_page, length >> 1
+            else:
+                end = offset + (length >> 1)
+                yield data[offset:end], 0, length >> 1
+                offset = end
+
+    def _free_overflow(self, data):
+        if SEGMENT_HEADER.unpack_from(data)[1] not in _FIXED_CODES:
+            for _, first_page, _ in self._segment_entries(data):
+                if first_page:
+                    self.pager.free_overflow(first_page)
+
+    def _read_segment(self, data) -> list:
+        page_type, encoding, count, _ = SEGMENT_HEADER.unpack_from(data)
+        if page_type != SEGMENT_PAGE:
+            raise ValueError(f"Not a segment page of columnar table '{self.table_name}'")
+        if encoding in _FIXED_CODES:
+            return list(struct.unpack_from(f">{count}{_FIXED_CODES[encoding]}", data, SEGMENT_HEADER.size))
+        values = []
+        for value, first_page, length in self._segment_entries(data):
+            if first_page:
+                value = self.pager.read_overflow(first_page, length)
+            if encoding == SEGMENT_TEXT:
+                values.append(str(value, "utf-8"))
+            else:
+                values.append(_VALUE_CODEC.decode(value)["value"])
+        return values
+
+    def scan_chain(self, index: int):
+        """
+        Yields the values of chain index (0 for the rowids) in rowid order.
+        """
+        page_number = self._read_meta()[2][index][0]
+        while page_number:
+            data = self.pager.read_page(page_number)
+            yield from self._read_segment(data)
+            page_number = SEGMENT_HEADER.unpack_from(data)[3]
+
+    def scan_rows(self, columns=None):
+        """
+        Yields (rowid, row dict) in rowid order, reading only the chains of the
+        given columns (every column if None). Names outside the schema are left out.
+        """
+        if columns is None:
+            columns = self.columns
+        names = [name for name in self.columns if name in columns]
+        chains = [self.scan_chain(self.columns.index(name) + 1) for name in names]
+        for rowid, *values in zip(self.scan_chain(0), *chains):
+            yield rowid, dict(zip(names, values))
+
+    def find(self, key):
+        raise RuntimeError(f"Columnar table '{self.table_name}' only supports appends and full scans")
+
+    def update(self, key, value):
+        raise RuntimeError(f"Columnar table '{self.table_name}' does not support UPDATE")
+
+    def delete(self, key):
+        raise RuntimeError(f"Columnar table '{self.table_name}' does not support DELETE")
+
+    def copy_to(self, target: 'ColumnarTable') -> int:
+        """
+        Appends every row to another, empty, columnar table. Returns the row count.
+        """
+        return target.insert_many(self.scan_rows())
+
+    def vacuum(self) -> dict:
+        """
+        Appends keep every page of a chain full but the last, and the pages they
+        free (overflow chains of a rewritten last page) are reused by the next
+        append, so the table is not rebuilt; reports its size as Table.vacuum does.
+        """
+        pages = self.pager.num_pages
+        size = os.path.getsize(self.filename)
+        return {"pages_before": pages, "pages_after": pages, "bytes_before": size, "bytes_after": size}
+
+    def free_pages(self):
+        """
+        Returns every page of the table, root included, to the pager's freelist.
+        """
+        for first_page, _ in self._read_meta()[2]:
+            page_number = first_page
+            while page_number:
+                data = self.pager.read_page(page_number)
+                self._free_overflow(data)
+                next_page = SEGMENT_HEADER.unpack_from(data)[3]
+                self.pager.free_page(page_number)
+                page_number = next_page
+        self.pager.free_page(self.root_page_num)
+        logger.info(f"Freed all pages of columnar table '{self.table_name}'")
+
+    def close(self):
+        logger.info(f"Closing columnar table '{self.table_name}'")
+        if self.owns_pager:
+            self.pager.close()
+
+def _json_value(value) -> bytes:
+    # Values without a serial type, such as ints beyond 64 bits, are stored as JSON records
+    from storage_engine.row_codec import encode_row
+    return encode_row({"value": value})
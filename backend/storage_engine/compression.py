@@ -0,0 +1,233 @@
+"""
+Per-page compression for table files.
+
+A compressed file keeps the usual 100-byte FileHeader, but its logical pages are
+no longer stored at fixed offsets. Each page is compressed on its way to disk
+and written to a variable-size physical slot; a page map records where every
+logical page lives. The map is itself zlib-compressed and stored in a slot of its
+own, located through the file header.
+
+Page map entry (12 bytes, one per logical page, page 1 first):
+Byte_range   Meaning
+0 to 7       Physical offset of the slot
+8 to 11      Stored length; 0 if the page was never written, the page size if it
+             is stored uncompressed because compression did not shrink it
+
+Slots are SLOT_ALIGNMENT-aligned. Slots the map on disk points to are never
+overwritten: a changed page goes to a new slot, and its old slot, like the old
+map's, is only reused once the header points at the new map. An interrupted
+commit therefore leaves the previous map and every page it points to intact.
+Only a slot written since the map was last saved is rewritten in place. Free
+space is not recorded on disk: it is whatever the map does not use, recomputed
+when the file is opened.
+
+Codecs are pluggable: register_codec() adds a class with a unique codec_id and
+name, compress() and decompress(). The codec id is stored in the file header.
+"""
+import bisect
+import struct
+import zlib
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SLOT_ALIGNMENT = 256
+MAP_ENTRY = struct.Struct(">QI")  # physical offset, stored length
+
+class ZlibCodec:
+    codec_id = 1
+    name = "zlib"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data) -> bytes:
+        return zlib.decompress(data)
+
+_codecs_by_name = {}
+_codecs_by_id = {}
+
+def register_codec(codec_class):
+    if codec_class.codec_id in _codecs_by_id or not 0 < codec_class.codec_id < 256:
+        raise ValueError(f"Invalid or duplicate codec id {codec_class.codec_id}")
+    _codecs_by_name[codec_class.name] = codec_class
+    _codecs_by_id[codec_class.codec_id] = codec_class
+    logger.debug(f"Registered page codec '{codec_class.name}' with id {codec_class.codec_id}")
+
+register_codec(ZlibCodec)
+
+def get_codec(name: str):
+    codec_class = _codecs_by_name.get(name)
+    if codec_class is None:
+        logger.error(f"Unknown page codec '{name}'")
+        raise ValueError(f"Unknown page codec '{name}', available: {sorted(_codecs_by_name)}")
+    return codec_class()
+
+def get_codec_by_id(codec_id: int):
+    codec_class = _codecs_by_id.get(codec_id)
+    if codec_class is None:
+        logger.error(f"File uses unknown page codec id {codec_id}")
+        raise ValueError(f"Unknown page codec id {codec_id}")
+    return codec_class()
+
+def _slot_size(length: int) -> int:
+    return (length + SLOT_ALIGNMENT - 1) // SLOT_ALIGNMENT * SLOT_ALIGNMENT
+
+class CompressedPageStore:
+    """
+    Physical storage of compressed logical pages in one file.
+    """
+    def __init__(self, file, codec, page_size: int, data_start: int):
+        self.file = file
+        self.codec = codec
+        self.page_size = page_size
+        self.data_start = _slot_size(data_start)
+        self.entries = []  # page_number - 1 -> (offset, stored length)
+        self.free_extents = []  # Sorted, non-adjacent [offset, size] gaps below self.end
+        self.end = self.data_start  # First byte after the last slot in use
+        self.map_extent = None  # (offset, size) of the slot holding the persisted map
+        self.map_dirty = False
+        self.unsaved = set()  # Offsets of page slots written since the map was saved, not in the map on disk
+        self.retired = []  # (offset, size) of slots the map on disk still uses, freed by release_retired()
+
+    @property
+    def page_count(self) -> int:
+        return len(self.entries)
+
+    def stored_bytes(self) -> int:
+        return sum(length for _, length in self.entries)
+
+    def load(self, map_offset: int, map_length: int):
+        """
+        Reads the page map and rebuilds the free space from the gaps it leaves.
+        """
+        if map_length:
+            self.file.seek(map_offset)
+            raw = zlib.decompress(self.file.read(map_length))
+            self.entries = list(MAP_ENTRY.iter_unpack(raw))
+            self.map_extent = (map_offset, _slot_size(map_length))
+        used = sorted((offset, _slot_size(length)) for offset, length in self.entries if length)
+        if self.map_extent:
+            bisect.insort(used, self.map_extent)
+        position = self.data_start
+        for offset, size in used:
+            if offset > position:
+                self.free_extents.append([position, offset - position])
+            position = max(position, offset + size)
+        self.end = position
+        logger.info(f"Loaded page map: {len(self.entries)} pages, {self.end} bytes in use, "
+                    f"{sum(size for _, size in self.free_extents)} bytes free")
+
+    def locate(self, page_number: int):
+        """
+        Returns (offset, stored length) of a page, or None if it was never written.
+        """
+        if page_number > len(self.entries) or not self.entries[page_number - 1][1]:
+            return None
+        return self.entries[page_number - 1]
+
+    def decode(self, stored) -> bytes:
+        return stored if len(stored) == self.page_size else self.codec.decompress(stored)
+
+    def read_page(self, page_number: int) -> bytes:
+        extent = self.locate(page_number)
+        if extent is None:
+            return bytes(self.page_size)
+        offset, length = extent
+        self.file.seek(offset)
+        return self.decode(self.file.read(length))
+
+    def write_page(self, page_number: int, data: bytes):
+        stored = self.codec.compress(data)
+        if len(stored) >= self.page_size:
+            stored = bytes(data)
+        size = _slot_size(len(stored))
+        if page_number > len(self.entries):
+            self.entries.extend([(0, 0)] * (page_number - len(self.entries)))
+        offset, length = self.entries[page_number - 1]
+        old_size = _slot_size(length) if length else 0
+        if offset in self.unsaved and old_size >= size:
+            # Not in the map on disk yet, so it can be rewritten in place
+            if old_size > size:
+                self._release(offset + size, old_size - size)
+        else:
+            if offset in self.unsaved:
+                self.unsaved.discard(offset)
+                self._release(offset, old_size)
+            elif length:
+                self.retired.append((offset, old_size))
+            offset = self._allocate(size)
+            self.unsaved.add(offset)
+        self.file.seek(offset)
+        self.file.write(stored)
+        self.entries[page_number - 1] = (offset, len(stored))
+        self.map_dirty = True
+
+    def save_map(self, header) -> bool:
+        """
+        Writes the page map to a new slot and points the header at it. Returns
+        True if the header changed and has to be written; the slots the old map
+        used stay reserved until release_retired() is called after that.
+        """
+        if not self.map_dirty:
+            return False
+        blob = zlib.compress(b"".join(MAP_ENTRY.pack(offset, length) for offset, length in self.entries))
+        size = _slot_size(len(blob))
+        offset = self._allocate(size)
+        self.file.seek(offset)
+        self.file.write(blob)
+        if self.map_extent:
+            self.retired.append(self.map_extent)
+        self.map_extent = (offset, size)
+        self.unsaved.clear()
+        header.page_map_offset = offset
+        header.page_map_length = len(blob)
+        self.map_dirty = False
+        logger.debug(f"Saved page map: {len(self.entries)} entries, {len(blob)} bytes at offset {offset}")
+        return True
+
+    def release_retired(self):
+        """
+        Frees the slots only the previous map used, once the header pointing at
+        the new map has been written.
+        """
+        for offset, size in self.retired:
+            self._release(offset, size)
+        self.retired = []
+
+    def trim(self):
+        """
+        Cuts off free space at the end of the file.
+        """
+        self.file.flush()
+        self.file.truncate(self.end)
+
+    def _allocate(self, size: int) -> int:
+        for i, (offset, free_size) in enumerate(self.free_extents):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free_extents[i]
+                else:
+                    self.free_extents[i] = [offset + size, free_size - size]
+                return offset
+        offset = self.end
+        self.end += size
+        return offset
+
+    def _release(self, offset: int, size: int):
+        if offset + size == self.end:
+            self.end = offset
+            # Absorb a gap that now ends the file as well
+            if self.free_extents and sum(self.free_extents[-1]) == self.end:
+                self.end = self.free_extents.pop()[0]
+            return
+        i = bisect.bisect_left(self.free_extents, [offset, size])
+        self.free_extents.insert(i, [offset, size])
+        # Merge with the following and the preceding gap
+        if i + 1 < len(self.free_extents) and offset + size == self.free_extents[i + 1][0]:
+            self.free_extents[i][1] += self.free_extents.pop(i + 1)[1]
+        if i > 0 and sum(self.free_extents[i - 1]) == offset:
+            self.free_extents[i - 1][1] += self.free_extents.pop(i)[1]
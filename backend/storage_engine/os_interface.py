@@ -0,0 +1,107 @@
+"""
+Thin wrappers around OS-level file facilities used by the Pager.
+
+Anything platform dependent (memory mapping, preallocation, access hints) lives
+here so the Pager can fall back to plain file I/O when a facility is missing.
+"""
+import mmap
+import os
+import shutil
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def map_file_readonly(file):
+    """
+    Maps the whole of an open file read-only.
+
+    Returns:
+        mmap.mmap or None: The mapping, or None if the file is empty.
+    """
+    file.flush()
+    size = os.fstat(file.fileno()).st_size
+    if size == 0:
+        return None
+    mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    logger.debug(f"Mapped {size} bytes of {file.name}")
+    return mapping
+
+def unmap_file(mapping):
+    """
+    Closes a mapping. If memoryview slices of it are still alive the mapping is
+    left for the garbage collector, which closes it once the last view is released.
+    """
+    if mapping is None:
+        return
+    try:
+        mapping.close()
+    except BufferError:
+        logger.debug("Mapping still exported, deferring close to garbage collection")
+
+def advise_willneed(file, offset: int, length: int):
+    """
+    Tells the kernel a byte range will be read soon so it can start reading it
+    in the background. Does nothing where posix_fadvise is unavailable.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(file.fileno(), offset, length, os.POSIX_FADV_WILLNEED)
+    except OSError as e:
+        logger.debug(f"posix_fadvise failed on {file.name}: {e}")
+
+def read_at(file, offset: int, length: int) -> bytes:
+    """
+    Reads without moving the file position, so other threads may use the file.
+    Falls back to seek and read where pread is unavailable.
+    """
+    if hasattr(os, "pread"):
+        return os.pread(file.fileno(), length, offset)
+    file.seek(offset)
+    return file.read(length)
+
+def write_at(file, offset: int, data):
+    """
+    Writes straight to the OS without going through the file object's buffer.
+    Falls back to seek and write where pwrite is unavailable.
+    """
+    if hasattr(os, "pwrite"):
+        os.pwrite(file.fileno(), data, offset)
+        return
+    file.seek(offset)
+    file.write(data)
+
+def preallocate(file, offset: int, length: int) -> bool:
+    """
+    Reserves disk space for a byte range past the end of a file, extending the
+    file. Returns False, leaving the file alone, if the disk has less free space
+    than the range needs; the file then simply grows as it is written.
+    """
+    free = shutil.disk_usage(os.path.dirname(os.path.abspath(file.name))).free
+    if free < length:
+        logger.warning(f"Only {free} bytes free on disk, not preallocating {length} bytes for {file.name}")
+        return False
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(file.fileno(), offset, length)
+            return True
+        except OSError as e:
+            # Some file systems do not support it
+            logger.debug(f"posix_fallocate failed on {file.name}: {e}")
+    if os.fstat(file.fileno()).st_size < offset + length:
+        os.ftruncate(file.fileno(), offset + length)
+    return True
+
+def replace_file(source: str, target: str):
+    """
+    Atomically puts source in place of target and makes the rename durable by
+    syncing the directory, where the platform allows opening one.
+    """
+    os.replace(source, target)
+    if os.name != "posix":
+        return
+    directory = os.open(os.path.dirname(os.path.abspath(target)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
@@ -35,15 +35,99 @@ Byte_range      Meaning        Bytes                        Values
 
 Interpreted as:
 key=20,value="Bob"
+
+The example above is the original layout (page types 0x0D / 0x05). Pages are now
+written in the slotted layout (0x4D leaf / 0x65 internal):
+Byte_range          Meaning
+0 to 10             Page header as above; Free Start holds the offset of the cell content area
+11 to 14            Internal pages only: leftmost child page number
+next 2 * Num Keys   Cell pointer array, one 2-byte offset per cell in key order
+...                 Free space
+content to end      Cells, packed from the end of the page towards the pointer array
+Leaf cells are key (varint), value length * 2 + overflow flag (varint), value;
+internal cells are key (varint), right child (4). Keys are rowids of up to 64 bits,
+see varint.py. Format version 2 files wrote slotted pages with 2-byte keys and
+value lengths (0x2D / 0x25), format version 3 leaves (0x6D) had no overflow flag;
+those pages, like the original layout, are still read and are rewritten in the
+current layout the next time they are saved.
+
+Pages are 1 KiB to 64 KiB, a power of two chosen when a file is created and
+recorded in its header; files written before that use 4 KiB pages.
+
+Overflow: a value longer than the page size's maximum local payload (see
+payload_limits) keeps only its first local_payload_size(length, page_size)
+bytes in the leaf cell, followed by the 4-byte number
+of its first overflow page. Each overflow page holds the next overflow page
+number (0 for the last) in bytes 0 to 3 and the next part of the value after it.
 """
+import bisect
 import os
-import shutil
+import struct
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
+from storage_engine.compression import CompressedPageStore, get_codec, get_codec_by_id
+from storage_engine.os_interface import (map_file_readonly, unmap_file, advise_willneed, read_at, write_at,
+                                         preallocate)
+from storage_engine.read_ahead import ReadAhead
+from storage_engine.varint import encode_varint, decode_varint, varint_size
+from storage_engine.wal import WriteAheadLog, DEFAULT_CHECKPOINT_THRESHOLD
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-PAGE_SIZE = 4096  # Size of a B-Tree page in bytes
-ROOT_PAGE_HEADER_SIZE = 4  # 4 bytes for root page number at file start
+DEFAULT_PAGE_SIZE = 4096  # Page size of new files unless one is given, and of files without one in the header
+MIN_PAGE_SIZE = 1024
+MAX_PAGE_SIZE = 65536  # Cell pointers are 2 bytes, so every cell must start below 64 KiB
+PAGE_HEADER_SIZE = 11
+LEGACY_LEAF_PAGE = 0x0D  # Original layout: cells packed right after the header
+LEGACY_INTERNAL_PAGE = 0x05
+SHORT_KEY_LEAF_PAGE = 0x2D  # Slotted layout with 2-byte keys (format version 2)
+SHORT_KEY_INTERNAL_PAGE = 0x25
+NO_OVERFLOW_LEAF_PAGE = 0x6D  # Varint keys without overflow cells (format version 3)
+LEAF_PAGE = 0x4D  # Slotted layout with varint keys and overflow cells, see BTreePage.to_bytes
+INTERNAL_PAGE = 0x65
+CELL_POINTER_SIZE = 2
+CELL_POINTER = struct.Struct(">H")
+CELL_KEY = struct.Struct(">H")  # Keys and value lengths in pages written before varint keys
+PAGE_HEADER = struct.Struct(">BHII")  # page type, num keys, free start, right sibling
+CHILD_POINTER = struct.Struct(">I")
+LEAF_CELL_HEADER = struct.Struct(">HH")  # Short-key pages: key, value length
+INTERNAL_CELL = struct.Struct(">HI")  # Short-key pages: key, child page number
+FILE_HEADER_SIZE = 100  # File header at the start of every table file
+FILE_HEADER_MAGIC = b"SQPY"
+FILE_FORMAT_VERSION = 7  # 2: slotted pages, 3: varint row keys, 4: overflow pages, 5: page compression,
+                         # 6: page count in the header, 7: page size in the header
+LEGACY_HEADER_SIZE = 4  # Pre-header files start with just a 4-byte root page number
+DEFAULT_CACHE_SIZE = 256  # Number of pages kept in the Pager's LRU cache
+DEFAULT_EXTENT_PAGES = 64  # Pages reserved at once when an uncompressed file has to grow
+OVERFLOW_POINTER_SIZE = 4
+
+def check_page_size(page_size: int):
+    if not MIN_PAGE_SIZE <= page_size <= MAX_PAGE_SIZE or page_size & (page_size - 1):
+        logger.error(f"Invalid page size {page_size}")
+        raise ValueError(f"Page size must be a power of two from {MIN_PAGE_SIZE} to {MAX_PAGE_SIZE}, got {page_size}")
+
+@lru_cache(maxsize=None)
+def payload_limits(page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    Returns (max local payload, min local payload, value bytes per overflow
+    page) for a page size. Same bounds SQLite uses for index pages: at least
+    four cells always fit in a leaf.
+    """
+    usable = page_size - 12
+    return usable * 64 // 255 - 23, usable * 32 // 255 - 23, page_size - OVERFLOW_POINTER_SIZE
+
+def local_payload_size(size: int, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+    """
+    Number of bytes of a value of the given size that are kept in the leaf cell.
+    The split is chosen so the last overflow page is as full as possible.
+    """
+    max_local, min_local, overflow_capacity = payload_limits(page_size)
+    if size <= max_local:
+        return size
+    local = min_local + (size - min_local) % overflow_capacity
+    return local if local <= max_local else min_local
 
 class PageHeader:
     def __init__(self, page_type: int, num_keys: int = 0, free_start:int = 0, right_sibling: int=0):
@@ -77,56 +161,159 @@ class PageHeader:
         logger.debug(f"Deserialized PageHeader from bytes: {header.__dict__}")
         return header
             
+class CellList(list):
+    """
+    A list of page cells that keeps the total on-page size of its cells (slot
+    included) up to date on every mutation, so BTreePage.is_full never has to
+    serialize the page to find out how much room is left.
+    """
+    def __init__(self, cells=(), cell_size=None):
+        super().__init__(cells)
+        self.cell_size = cell_size
+        self.byte_size = sum(map(cell_size, self))
+
+    def append(self, cell):
+        super().append(cell)
+        self.byte_size += self.cell_size(cell)
+
+    def insert(self, index, cell):
+        super().insert(index, cell)
+        self.byte_size += self.cell_size(cell)
+
+    def extend(self, cells):
+        cells = list(cells)
+        super().extend(cells)
+        self.byte_size += sum(map(self.cell_size, cells))
+
+    def __iadd__(self, cells):
+        self.extend(cells)
+        return self
+
+    def pop(self, index=-1):
+        cell = super().pop(index)
+        self.byte_size -= self.cell_size(cell)
+        return cell
+
+    def remove(self, cell):
+        super().remove(cell)
+        self.byte_size -= self.cell_size(cell)
+
+    def clear(self):
+        super().clear()
+        self.byte_size = 0
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            removed = sum(map(self.cell_size, self[index]))
+            added = sum(map(self.cell_size, value))
+        else:
+            removed = self.cell_size(self[index])
+            added = self.cell_size(value)
+        super().__setitem__(index, value)
+        self.byte_size += added - removed
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            removed = sum(map(self.cell_size, self[index]))
+        else:
+            removed = self.cell_size(self[index])
+        super().__delitem__(index)
+        self.byte_size -= removed
+
+class OverflowPayload:
+    """
+    A leaf value whose tail lives in a chain of overflow pages. Only the local
+    part is read with the leaf; the chain is read when the value is converted
+    with bytes().
+    """
+    __slots__ = ("local", "size", "first_page", "pager")
+
+    def __init__(self, local, size: int, first_page: int, pager=None):
+        self.local = local
+        self.size = size
+        self.first_page = first_page
+        self.pager = pager
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bytes__(self) -> bytes:
+        if self.pager is None:
+            logger.error(f"Cannot read overflow chain at page {self.first_page} without a pager")
+            raise RuntimeError("Overflow payload has no pager to read its chain from")
+        return bytes(self.local) + self.pager.read_overflow(self.first_page, self.size - len(self.local))
+
+def _encode_leaf_cell(key: int, value) -> bytes:
+    if isinstance(value, OverflowPayload):
+        return (encode_varint(key) + encode_varint(value.size << 1 | 1) + bytes(value.local) +
+                CHILD_POINTER.pack(value.first_page))
+    return encode_varint(key) + encode_varint(len(value) << 1) + value
+
+def _leaf_cell_size(cell) -> int:
+    # slot + key + value length + value (+ first overflow page)
+    key, value = cell
+    if isinstance(value, OverflowPayload):
+        return CELL_POINTER_SIZE + varint_size(key) + varint_size(value.size << 1) + len(value.local) + OVERFLOW_POINTER_SIZE
+    return CELL_POINTER_SIZE + varint_size(key) + varint_size(len(value) << 1) + len(value)
+
+def _internal_cell_size(cell) -> int:
+    # slot + key + child page number
+    return CELL_POINTER_SIZE + varint_size(cell[0]) + 4
+
 class BTreePage:
-    def __init__(self, is_leaf: bool):
+    """
+    A B-Tree node. Cells are kept in key order in a CellList; internal pages
+    also keep the child page numbers in `children` (children[i + 1] is the
+    child to the right of cells[i]).
+
+    Pages are always written in the slotted layout with varint keys. Pages in
+    older layouts (types 0x0D/0x05 and 0x2D/0x25) are still read and are
+    converted the next time they are saved.
+    """
+    def __init__(self, is_leaf: bool, page_size: int = DEFAULT_PAGE_SIZE):
         self.is_leaf = is_leaf
-        self.header = PageHeader(page_type=0x0D if is_leaf else 0x05)
-        self.cells: list = []  # List of tuples (key, value) for leaf nodes or (key, child_page_number) for internal nodes
+        self.page_size = page_size
+        self.header = PageHeader(page_type=LEAF_PAGE if is_leaf else INTERNAL_PAGE)
+        self.cells = []  # List of tuples (key, value) for leaf nodes or (key, child_page_number) for internal nodes
         self.children: list = [] if not is_leaf else None
         logger.debug(f"Initialized BTreePage: is_leaf={is_leaf}")
 
+    @property
+    def cells(self) -> CellList:
+        return self._cells
+
+    @cells.setter
+    def cells(self, cells):
+        self._cells = CellList(cells, _leaf_cell_size if self.is_leaf else _internal_cell_size)
+
+    @property
+    def header_size(self) -> int:
+        # Internal pages keep their leftmost child pointer right after the header
+        return PAGE_HEADER_SIZE if self.is_leaf else PAGE_HEADER_SIZE + 4
+
+    def byte_size(self) -> int:
+        return self.header_size + self.cells.byte_size
+
     def is_full(self, next_key=None, next_value=None):
         # Calculate the size if we add another cell
-        if self.is_leaf:
-            content = b"".join(
-                key.to_bytes(2, 'big') +
-                len(value).to_bytes(2, 'big') +
-                value for key, value in self.cells
-            )
-            if next_key is not None and next_value is not None:
-                content += (
-                    next_key.to_bytes(2, 'big') +
-                    len(next_value).to_bytes(2, 'big') +
-                    next_value
-                )
-        else:
-            content = b""
-            # Internal: leftmost child, then (key, child_page_number) for each cell
-            if self.children and len(self.children) > 0:
-                content += self.children[0].to_bytes(4, 'big')
-            for i, (key, child_page_number) in enumerate(self.cells):
-                content += key.to_bytes(2, 'big') + child_page_number.to_bytes(4, 'big')
-            # If next_key/next_value is provided, simulate adding another cell/child
-            if next_key is not None and next_value is not None:
-                # next_value is expected to be a child_page_number for internal nodes
-                content += next_key.to_bytes(2, 'big') + next_value.to_bytes(4, 'big')
-        total_size = len(self.header.to_bytes()) + len(content)
+        total_size = self.byte_size()
+        if next_key is not None and next_value is not None:
+            total_size += self.cells.cell_size((next_key, next_value))
         logger.info(f"is_full: is_leaf={self.is_leaf}, num_cells={len(self.cells)}, total_size={total_size}")
-        return total_size > PAGE_SIZE
-    
+        return total_size > self.page_size
+
+    def _search(self, key: int) -> int:
+        return bisect.bisect_left(self.cells, key, key=itemgetter(0))
+
     def add_leaf_cell(self, key: int, value: bytes):
-        idx = 0
-        while idx < len(self.cells) and self.cells[idx][0] < key:
-            idx += 1
-        self.cells.insert(idx, (key, value))
+        self.cells.insert(self._search(key), (key, value))
         self.header.num_keys = len(self.cells)
-        
+
     def find_child_index(self, key: int) -> int:
-        for i, (k, _) in enumerate(self.cells):
-            if k >= key:
-                return i
-        return len(self.cells)
-    
+        # Keys equal to a separator live in the right-hand child
+        return bisect.bisect_right(self.cells, key, key=itemgetter(0))
+
     def insert_internal_cell(self, key: int, child_page_number: int):
         idx = self.find_child_index(key)
         self.cells.insert(idx, (key, child_page_number))
@@ -135,13 +322,14 @@ class BTreePage:
         if self.children is not None:
             self.children.insert(idx + 1, child_page_number)
         
-    def split_internal_page(self, pager):
-        mid = len(self.cells) // 2
+    def split_internal_page(self, pager, split_index: int = None):
+        # cells[split_index] moves up to the parent; the default splits in the middle
+        mid = len(self.cells) // 2 if split_index is None else split_index
         right_cells = self.cells[mid + 1:]
         left_cells = self.cells[:mid]
         median_key = self.cells[mid][0]
         
-        right_page = BTreePage(is_leaf=False)
+        right_page = BTreePage(is_leaf=False, page_size=self.page_size)
         right_page.cells = right_cells
         right_page.header.num_keys = len(right_cells)
         # Set children for right page
@@ -161,7 +349,7 @@ class BTreePage:
         return median_key, new_right_page_number
 
     def add_internal_cell(self, key: int, child_page_number: int):
-        if self.header.page_type != 0x05:
+        if self.is_leaf:
             logger.error("Cannot add internal cell to leaf page")
             raise ValueError("Cannot add internal cell to leaf page")
         self.cells.append((key, child_page_number))
@@ -171,33 +359,56 @@ class BTreePage:
         logger.debug(f"Added internal cell: key={key}, child_page_number={child_page_number}")
 
     def to_bytes(self) -> bytes:
+        """
+        Serializes the page in the slotted layout: header, cell pointer array
+        growing forwards, cell contents packed backwards from the end of the page.
+        """
+        if self.byte_size() > self.page_size:
+            logger.error(f"Serialized page exceeds the page size of {self.page_size}")
+            raise ValueError(f"Serialized page exceeds the page size of {self.page_size}")
+        buf = bytearray(self.page_size)
+        slot = self.header_size
+        content_start = self.page_size
         if self.is_leaf:
-            content = b"".join(
-                key.to_bytes(2, 'big') +
-                len(value).to_bytes(2, 'big') +
-                value for key, value in self.cells
-            )
+            for key, value in self.cells:
+                cell = _encode_leaf_cell(key, value)
+                content_start -= len(cell)
+                buf[content_start:content_start + len(cell)] = cell
+                CELL_POINTER.pack_into(buf, slot, content_start)
+                slot += CELL_POINTER_SIZE
         else:
-            content = b""
-            if self.children and len(self.children) > 0:
-                content += self.children[0].to_bytes(4, 'big')
-            for i, (key, child_page_number) in enumerate(self.cells):
-                content += key.to_bytes(2, 'big') + child_page_number.to_bytes(4, 'big')
-        self.header.free_start = 11 + len(content)
-        page_bytes = self.header.to_bytes() + content
-        if len(page_bytes) > PAGE_SIZE:
-            logger.error("Serialized page exceeds PAGE_SIZE")
-            raise ValueError("Serialized page exceeds PAGE_SIZE")
-        logger.debug(f"Serialized BTreePage to bytes: {len(page_bytes)} bytes")
-        return page_bytes
-
-    def split_leaf_page(self, pager):
-        logger.info(f"split_leaf_page called: num_cells={len(self.cells)}")
-        mid = len(self.cells) // 2
+            CHILD_POINTER.pack_into(buf, PAGE_HEADER_SIZE, self.children[0] if self.children else 0)
+            for key, child_page_number in self.cells:
+                cell = encode_varint(key) + CHILD_POINTER.pack(child_page_number)
+                content_start -= len(cell)
+                buf[content_start:content_start + len(cell)] = cell
+                CELL_POINTER.pack_into(buf, slot, content_start)
+                slot += CELL_POINTER_SIZE
+        self.header.page_type = LEAF_PAGE if self.is_leaf else INTERNAL_PAGE
+        self.header.num_keys = len(self.cells)
+        self.header.free_start = content_start
+        buf[0:PAGE_HEADER_SIZE] = self.header.to_bytes()
+        logger.debug(f"Serialized BTreePage to bytes: {self.byte_size()} bytes used")
+        return bytes(buf)
+
+    def _byte_midpoint(self) -> int:
+        # Cells vary in size, so halve the bytes rather than the cell count
+        half = self.cells.byte_size // 2
+        size = 0
+        for index, cell in enumerate(self.cells):
+            size += self.cells.cell_size(cell)
+            if size > half:
+                return min(max(index, 1), len(self.cells) - 1)
+        return len(self.cells) // 2
+
+    def split_leaf_page(self, pager, split_index: int = None):
+        # cells[split_index:] move to the new right page; the default splits in the middle
+        logger.info(f"split_leaf_page called: num_cells={len(self.cells)}, split_index={split_index}")
+        mid = self._byte_midpoint() if split_index is None else split_index
         right_cells = self.cells[mid:]
         left_cells = self.cells[:mid]
         
-        right_page = BTreePage(is_leaf=True)
+        right_page = BTreePage(is_leaf=True, page_size=self.page_size)
         right_page.cells = right_cells
         right_page.header.num_keys = len(right_cells)
         
@@ -205,6 +416,9 @@ class BTreePage:
         self.header.num_keys = len(left_cells)
         
         new_right_page_number = pager.allocate_page()
+        # Splice the new page into the leaf chain
+        right_page.header.right_sibling = self.header.right_sibling
+        self.header.right_sibling = new_right_page_number
         pager.write_page(new_right_page_number, right_page.to_bytes())
         
         median_key = right_cells[0][0] 
@@ -212,21 +426,91 @@ class BTreePage:
         return median_key, new_right_page_number
     
     @staticmethod
-    def from_bytes(data: bytes) -> 'BTreePage':
-        if all(b == 0 for b in data[:11]):
+    def from_bytes(data: bytes, pager=None) -> 'BTreePage':
+        """
+        Decodes a page. Overflow values are attached to pager so they can read
+        their chains later. The page size is the length of data.
+        """
+        if all(b == 0 for b in data[:PAGE_HEADER_SIZE]):
             logger.info("from_bytes called with empty page data, returning empty BTreePage")
-            return BTreePage(is_leaf=True)  # Return an empty leaf page if the header is all zeros
-        header = PageHeader.from_bytes(data[:11])
-        is_leaf = (header.page_type == 0x0D)
-        page = BTreePage(is_leaf=is_leaf)
+            return BTreePage(is_leaf=True, page_size=len(data))  # An all-zero header is an empty leaf
+        header = PageHeader.from_bytes(data[:PAGE_HEADER_SIZE])
+        if header.page_type in (LEGACY_LEAF_PAGE, LEGACY_INTERNAL_PAGE):
+            return BTreePage._from_legacy_bytes(header, data)
+        if header.page_type in (SHORT_KEY_LEAF_PAGE, SHORT_KEY_INTERNAL_PAGE):
+            return BTreePage._from_short_key_bytes(header, data)
+        if header.page_type not in (LEAF_PAGE, NO_OVERFLOW_LEAF_PAGE, INTERNAL_PAGE):
+            logger.error(f"Unknown page type {header.page_type}")
+            raise ValueError(f"Unknown page type {header.page_type}")
+        is_leaf = (header.page_type != INTERNAL_PAGE)
+        page = BTreePage(is_leaf=is_leaf, page_size=len(data))
         page.header = header
-        offset = 11
+        cells = []
+        if header.page_type == NO_OVERFLOW_LEAF_PAGE:
+            for (offset,) in BTreePage._slots(data, header.num_keys, is_leaf):
+                key, offset = decode_varint(data, offset)
+                value_length, offset = decode_varint(data, offset)
+                cells.append((key, bytes(data[offset:offset + value_length])))
+        elif is_leaf:
+            for (offset,) in BTreePage._slots(data, header.num_keys, is_leaf):
+                key, offset = decode_varint(data, offset)
+                value_length, offset = decode_varint(data, offset)
+                if value_length & 1:
+                    value_length >>= 1
+                    local_end = offset + local_payload_size(value_length, len(data))
+                    first_page = CHILD_POINTER.unpack_from(data, local_end)[0]
+                    cells.append((key, OverflowPayload(bytes(data[offset:local_end]), value_length, first_page, pager)))
+                else:
+                    value_length >>= 1
+                    cells.append((key, bytes(data[offset:offset + value_length])))
+        else:
+            page.children = [CHILD_POINTER.unpack_from(data, PAGE_HEADER_SIZE)[0]]
+            for (offset,) in BTreePage._slots(data, header.num_keys, is_leaf):
+                key, offset = decode_varint(data, offset)
+                child_page_number = CHILD_POINTER.unpack_from(data, offset)[0]
+                cells.append((key, child_page_number))
+                page.children.append(child_page_number)
+        page.cells = cells
+        logger.info(f"Loaded page with {len(page.cells)} cells")
+        return page
+
+    @staticmethod
+    def _slots(data, num_keys: int, is_leaf: bool):
+        slot_base = PAGE_HEADER_SIZE if is_leaf else PAGE_HEADER_SIZE + 4
+        return CELL_POINTER.iter_unpack(data[slot_base:slot_base + num_keys * CELL_POINTER_SIZE])
+
+    @staticmethod
+    def _from_short_key_bytes(header: PageHeader, data: bytes) -> 'BTreePage':
+        is_leaf = (header.page_type == SHORT_KEY_LEAF_PAGE)
+        page = BTreePage(is_leaf=is_leaf, page_size=len(data))
+        page.header = header
+        cells = []
+        if is_leaf:
+            for (offset,) in BTreePage._slots(data, header.num_keys, is_leaf):
+                key, value_length = LEAF_CELL_HEADER.unpack_from(data, offset)
+                cells.append((key, bytes(data[offset + 4:offset + 4 + value_length])))
+        else:
+            page.children = [CHILD_POINTER.unpack_from(data, PAGE_HEADER_SIZE)[0]]
+            for (offset,) in BTreePage._slots(data, header.num_keys, is_leaf):
+                cells.append(INTERNAL_CELL.unpack_from(data, offset))
+            page.children.extend(child for _, child in cells)
+        page.cells = cells
+        logger.info(f"Loaded short-key page with {len(page.cells)} cells")
+        return page
+
+    @staticmethod
+    def _from_legacy_bytes(header: PageHeader, data: bytes) -> 'BTreePage':
+        is_leaf = (header.page_type == LEGACY_LEAF_PAGE)
+        page = BTreePage(is_leaf=is_leaf, page_size=len(data))
+        page.header = header
+        cells = []
+        offset = PAGE_HEADER_SIZE
         if is_leaf:
             for _ in range(header.num_keys):
                 key = int.from_bytes(data[offset:offset + 2], 'big')
                 value_length = int.from_bytes(data[offset + 2:offset + 4], 'big')
-                value = data[offset + 4:offset + 4 + value_length]
-                page.cells.append((key, value))
+                value = bytes(data[offset + 4:offset + 4 + value_length])
+                cells.append((key, value))
                 offset += 4 + value_length
         else:
             page.children = []
@@ -236,102 +520,803 @@ class BTreePage:
             for _ in range(header.num_keys):
                 key = int.from_bytes(data[offset:offset + 2], 'big')
                 child_page_number = int.from_bytes(data[offset + 2:offset + 6], 'big')
-                page.cells.append((key, child_page_number))
+                cells.append((key, child_page_number))
                 page.children.append(child_page_number)
                 offset += 6
-        logger.info(f"Loaded page with {len(page.cells)} cells")
-        return page  
-    
+        page.cells = cells
+        logger.info(f"Loaded legacy-format page with {len(page.cells)} cells")
+        return page
+
     def update_leaf_cell(self, key, new_value):
-        for idx, (k, _) in enumerate(self.cells):
-            if k == key:
-                self.cells[idx] = (key, new_value)
-                logger.debug(f"Updated leaf cell: key={key}, new_value={new_value}")
-                return True
+        idx = self._search(key)
+        if idx < len(self.cells) and self.cells[idx][0] == key:
+            self.cells[idx] = (key, new_value)
+            logger.debug(f"Updated leaf cell: key={key}, new_value={new_value}")
+            return True
         raise KeyError(f"Key {key} not found in leaf page")
     
     def delete_leaf_cell(self, key):
-        for idx, (k, _) in enumerate(self.cells):
-            if k == key:
-                del self.cells[idx]
-                self.header.num_keys -= 1
-                logger.debug(f"Deleted leaf cell: key={key}")
-                return True
+        idx = self._search(key)
+        if idx < len(self.cells) and self.cells[idx][0] == key:
+            del self.cells[idx]
+            self.header.num_keys -= 1
+            logger.debug(f"Deleted leaf cell: key={key}")
+            return True
         raise KeyError(f"Key {key} not found in leaf page")
 
+class PageView:
+    """
+    Read-only, lazily decoded view of a serialized B-Tree page.
+
+    Only the page header is decoded up front. Keys, values and child pointers are
+    read straight from the buffer when asked for, values come back as memoryview
+    slices of the page, and key searches run on the buffer itself. Use it for
+    lookups and descents; call to_page() when the page needs to be modified.
+    """
+    __slots__ = ("data", "pager", "page_type", "num_keys", "free_start", "right_sibling", "is_leaf",
+                 "varint_keys", "overflow_cells", "_slot_base", "_offsets")
+
+    def __init__(self, data, pager=None):
+        self.data = data if isinstance(data, memoryview) else memoryview(data)
+        self.pager = pager
+        self.page_type, self.num_keys, self.free_start, self.right_sibling = PAGE_HEADER.unpack_from(self.data)
+        if self.page_type in (LEAF_PAGE, NO_OVERFLOW_LEAF_PAGE, SHORT_KEY_LEAF_PAGE, LEGACY_LEAF_PAGE, 0):
+            # An all-zero page has never been written and reads as an empty leaf
+            self.is_leaf = True
+        elif self.page_type in (INTERNAL_PAGE, SHORT_KEY_INTERNAL_PAGE, LEGACY_INTERNAL_PAGE):
+            self.is_leaf = False
+        else:
+            logger.error(f"Unknown page type {self.page_type}")
+            raise ValueError(f"Unknown page type {self.page_type}")
+        self.varint_keys = self.page_type in (LEAF_PAGE, NO_OVERFLOW_LEAF_PAGE, INTERNAL_PAGE)
+        self.overflow_cells = self.page_type == LEAF_PAGE
+        self._slot_base = PAGE_HEADER_SIZE if self.is_leaf else PAGE_HEADER_SIZE + 4
+        self._offsets = None
+        if self.page_type == LEGACY_INTERNAL_PAGE:
+            self._offsets = range(self._slot_base, self._slot_base + 6 * self.num_keys, 6)
+        elif self.page_type == LEGACY_LEAF_PAGE:
+            # Legacy leaf cells have no pointer array, so walk them once
+            self._offsets = []
+            offset = PAGE_HEADER_SIZE
+            for _ in range(self.num_keys):
+                self._offsets.append(offset)
+                offset += 4 + CELL_KEY.unpack_from(self.data, offset + 2)[0]
+
+    def __len__(self) -> int:
+        return self.num_keys
+
+    def _cell_offset(self, index: int) -> int:
+        if self._offsets is not None:
+            return self._offsets[index]
+        return CELL_POINTER.unpack_from(self.data, self._slot_base + index * CELL_POINTER_SIZE)[0]
+
+    def key_at(self, index: int) -> int:
+        if self.varint_keys:
+            return decode_varint(self.data, self._cell_offset(index))[0]
+        return CELL_KEY.unpack_from(self.data, self._cell_offset(index))[0]
+
+    def value_at(self, index: int):
+        """
+        Returns the value as a memoryview of the page, or an OverflowPayload whose
+        local part is a memoryview of the page.
+        """
+        offset = self._cell_offset(index)
+        if self.varint_keys:
+            offset = decode_varint(self.data, offset)[1]
+            value_length, offset = decode_varint(self.data, offset)
+            if self.overflow_cells:
+                has_overflow = value_length & 1
+                value_length >>= 1
+                if has_overflow:
+                    local_end = offset + local_payload_size(value_length, len(self.data))
+                    first_page = CHILD_POINTER.unpack_from(self.data, local_end)[0]
+                    return OverflowPayload(self.data[offset:local_end], value_length, first_page, self.pager)
+            return self.data[offset:offset + value_length]
+        value_length = CELL_KEY.unpack_from(self.data, offset + 2)[0]
+        return self.data[offset + 4:offset + 4 + value_length]
+
+    def child_at(self, index: int) -> int:
+        """
+        Returns children[index] of the page without building the children list.
+        """
+        if index == 0:
+            return CHILD_POINTER.unpack_from(self.data, PAGE_HEADER_SIZE)[0]
+        offset = self._cell_offset(index - 1)
+        if self.varint_keys:
+            return CHILD_POINTER.unpack_from(self.data, decode_varint(self.data, offset)[1])[0]
+        return INTERNAL_CELL.unpack_from(self.data, offset)[1]
+
+    def search(self, key: int) -> int:
+        # bisect_left over the keys in the buffer
+        lo, hi = 0, self.num_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find_child_index(self, key: int) -> int:
+        # bisect_right, matching BTreePage.find_child_index
+        lo, hi = 0, self.num_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key < self.key_at(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def find_child(self, key: int) -> int:
+        return self.child_at(self.find_child_index(key))
+
+    def get(self, key: int):
+        """
+        Returns the value stored under key in a leaf page, or None.
+        """
+        index = self.search(key)
+        if index < self.num_keys and self.key_at(index) == key:
+            return self.value_at(index)
+        return None
+
+    def cells(self):
+        """
+        Yields (key, value) for a leaf page or (key, child_page_number) for an internal page.
+        """
+        for index in range(self.num_keys):
+            if self.is_leaf:
+                yield self.key_at(index), self.value_at(index)
+            else:
+                yield self.key_at(index), self.child_at(index + 1)
+
+    def children(self):
+        for index in range(self.num_keys + 1):
+            yield self.child_at(index)
+
+    def used_bytes(self) -> int:
+        """
+        Bytes taken by the header, cell pointers and cells, as BTreePage.byte_size
+        counts them.
+        """
+        if self.page_type == 0:
+            return self._slot_base
+        if self._offsets is not None:
+            # Original layout, no content area to measure
+            return self.to_page().byte_size()
+        return self._slot_base + self.num_keys * CELL_POINTER_SIZE + len(self.data) - self.free_start
+
+    def insert_cell(self, key: int, value):
+        """
+        Returns a copy of a leaf page with (key, value) added in key order. The
+        cell goes into the free gap and only the pointers after it move, so no
+        other cell is decoded. Returns None if the page is in an older layout or
+        the cell does not fit; the caller then falls back to BTreePage.
+        """
+        if self.page_type != LEAF_PAGE:
+            return None
+        cell = _encode_leaf_cell(key, value)
+        slot_end = self._slot_base + self.num_keys * CELL_POINTER_SIZE
+        if self.free_start - slot_end < len(cell) + CELL_POINTER_SIZE:
+            return None
+        slot = self._slot_base + self.search(key) * CELL_POINTER_SIZE
+        content_start = self.free_start - len(cell)
+        buf = bytearray(self.data)
+        buf[content_start:self.free_start] = cell
+        buf[slot + CELL_POINTER_SIZE:slot_end + CELL_POINTER_SIZE] = buf[slot:slot_end]
+        CELL_POINTER.pack_into(buf, slot, content_start)
+        PAGE_HEADER.pack_into(buf, 0, self.page_type, self.num_keys + 1, content_start, self.right_sibling)
+        return bytes(buf)
+
+    def to_page(self) -> 'BTreePage':
+        return BTreePage.from_bytes(self.data, self.pager)
+
+class FileHeader:
+    """
+    The fixed-size header at the start of a table file.
+
+    Byte_range   Meaning
+    0 to 3       Magic "SQPY"
+    4 to 4       Format version
+    5 to 8       Root page number
+    9 to 12      First freelist trunk page (0 if the freelist is empty)
+    13 to 16     Total number of free pages (trunks and leaves)
+    17 to 17     Page codec id, 0 for an uncompressed file (see compression.py)
+    18 to 25     Compressed files: offset of the page map
+    26 to 29     Compressed files: stored length of the page map
+    30 to 33     Number of pages in use; 0 in older files, where the file size tells
+    34 to 37     Page size in bytes; 0 in older files, which use DEFAULT_PAGE_SIZE
+    38 to 99     Reserved, zero
+    """
+    def __init__(self, root_page: int = 1, freelist_trunk: int = 0, freelist_count: int = 0,
+                 version: int = FILE_FORMAT_VERSION, page_codec: int = 0, page_map_offset: int = 0,
+                 page_map_length: int = 0, page_count: int = 0, page_size: int = DEFAULT_PAGE_SIZE):
+        self.version = version
+        self.root_page = root_page
+        self.freelist_trunk = freelist_trunk
+        self.freelist_count = freelist_count
+        self.page_codec = page_codec
+        self.page_map_offset = page_map_offset
+        self.page_map_length = page_map_length
+        self.page_count = page_count
+        self.page_size = page_size
+
+    def to_bytes(self) -> bytes:
+        header_bytes = (
+                FILE_HEADER_MAGIC +
+                self.version.to_bytes(1, 'big') +
+                self.root_page.to_bytes(4, 'big') +
+                self.freelist_trunk.to_bytes(4, 'big') +
+                self.freelist_count.to_bytes(4, 'big') +
+                self.page_codec.to_bytes(1, 'big') +
+                self.page_map_offset.to_bytes(8, 'big') +
+                self.page_map_length.to_bytes(4, 'big') +
+                self.page_count.to_bytes(4, 'big') +
+                self.page_size.to_bytes(4, 'big')
+                )
+        return header_bytes.ljust(FILE_HEADER_SIZE, b'\x00')
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'FileHeader':
+        if len(data) < FILE_HEADER_SIZE or data[:4] != FILE_HEADER_MAGIC:
+            logger.error(f"Invalid file header: {bytes(data[:8])}")
+            raise ValueError("Invalid file header")
+        header = FileHeader(
+            version=data[4],
+            root_page=int.from_bytes(data[5:9], 'big'),
+            freelist_trunk=int.from_bytes(data[9:13], 'big'),
+            freelist_count=int.from_bytes(data[13:17], 'big'),
+            page_codec=data[17],
+            page_map_offset=int.from_bytes(data[18:26], 'big'),
+            page_map_length=int.from_bytes(data[26:30], 'big'),
+            page_count=int.from_bytes(data[30:34], 'big'),
+            page_size=int.from_bytes(data[34:38], 'big') or DEFAULT_PAGE_SIZE,
+            )
+        logger.debug(f"Deserialized FileHeader from bytes: {header.__dict__}")
+        return header
+
 class Pager:
-    def __init__(self, filename: str):
+    """
+    Page-level access to a table file with a bounded write-back LRU cache.
+
+    Pages are cached as raw bytes. Writes only touch the cache and mark the page
+    dirty; dirty pages reach the file when they are evicted, on commit() or on
+    close(). The file header (root page number, freelist) is kept in memory and
+    written back the same way.
+
+    Pages released with free_page() go on a freelist of trunk pages, each holding
+    the next trunk's number and a list of free leaf pages. allocate_page() reuses
+    free pages before growing the file. The file grows extent_pages at a time,
+    preallocated so later page writes never extend it; the header records how
+    many pages are in use and close() cuts off the unused rest of the last extent.
+
+    With use_mmap=True clean pages are not cached; read_page returns a zero-copy
+    memoryview slice of a read-only mapping of the file instead.
+
+    With use_wal=True the table file is never written in place outside of a
+    checkpoint. commit() appends the dirty pages and the header to <table>.wal
+    with one fsync, reads consult the log's index before the table file, and
+    dirty pages stay pinned in the cache until they are committed.
+
+    Between begin() and commit() dirty pages are pinned as well, so rollback() can
+    simply drop them together with the header changes made since begin().
+
+    compression="zlib" (or another registered codec) creates a new file whose
+    pages are compressed on disk through a page map, see compression.py. It only
+    applies when the file is created; an existing file keeps the mode recorded in
+    its header. Compressed pages are decompressed into the cache, so use_mmap is
+    ignored for them.
+
+    read_ahead() lets a scan name the pages it will visit next; a ReadAhead worker
+    reads them in the background and a later cache miss picks them up.
+
+    page_size, like compression, only applies when the file is created; an
+    existing file keeps the page size recorded in its header.
+    """
+    def __init__(self, filename: str, cache_size: int = DEFAULT_CACHE_SIZE, use_mmap: bool = False,
+                 use_wal: bool = False, checkpoint_threshold: int = DEFAULT_CHECKPOINT_THRESHOLD,
+                 compression: str = None, extent_pages: int = DEFAULT_EXTENT_PAGES, page_size: int = None):
+        if page_size is not None:
+            check_page_size(page_size)
         self.filename = filename
         file_exists = os.path.exists(filename)
         self.file = open(filename, 'r+b') if file_exists else open(filename, 'w+b')
         logger.info(f"Opened file for Pager: {filename}")
-        if not file_exists:
-            # Write initial root page number = 1
-            self.file.seek(0)
-            self.file.write((1).to_bytes(4, 'big'))
+        self.cache_size = max(0, cache_size)
+        self.cache = OrderedDict()  # page_number -> page bytes, least recently used first
+        self.dirty_pages = set()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self.page_writes = 0  # write_page calls, whether or not the page reached the file yet
+        self.file.seek(0, os.SEEK_END)
+        file_size = self.file.tell()
+        self.file.seek(0)
+        if file_size < LEGACY_HEADER_SIZE:
+            # New file: root page number = 1, empty freelist
+            self.header = FileHeader(page_codec=get_codec(compression).codec_id if compression else 0,
+                                     page_size=page_size or DEFAULT_PAGE_SIZE)
+            self.file.write(self.header.to_bytes())
             self.file.flush()
+            file_size = FILE_HEADER_SIZE
             logger.info(f"Initialized new file with root page number 1: {filename}")
+        elif self.file.read(4) != FILE_HEADER_MAGIC:
+            file_size = self._upgrade_legacy_file(file_size)
+        self.file.seek(0)
+        self.header = FileHeader.from_bytes(self.file.read(FILE_HEADER_SIZE))
+        self.header_dirty = False
+        if self.header.version > FILE_FORMAT_VERSION:
+            logger.error(f"{filename} uses file format {self.header.version}, newer than {FILE_FORMAT_VERSION}")
+            raise ValueError(f"Unsupported file format version {self.header.version} in {filename}")
+        check_page_size(self.header.page_size)
+        self.page_size = self.header.page_size
+        if page_size and page_size != self.page_size:
+            logger.warning(f"{filename} already uses {self.page_size}-byte pages, ignoring page_size={page_size}")
+        self.freelist_trunk_capacity = (self.page_size - 8) // 4  # Leaf page numbers a trunk page can hold
+        if self.header.version < FILE_FORMAT_VERSION:
+            # Older pages stay readable; anything saved from now on uses the current format
+            self.header.version = FILE_FORMAT_VERSION
+            self.header_dirty = True
+        self.in_transaction = False
+        self.saved_header = None
+        self.saved_num_pages = 0
+        # Pages written to the cache may not be on disk yet, so the page count is tracked here
+        self.num_pages = (file_size - FILE_HEADER_SIZE + self.page_size - 1) // self.page_size
+        self.file_pages = self.num_pages  # Pages the file has room for, including reserved ones
+        self.extent_pages = max(1, extent_pages)
+        if self.header.page_count:
+            # The file may end in a reserved, unused extent
+            self.num_pages = self.header.page_count
+        self.store = None
+        self.compression = None
+        if self.header.page_codec:
+            codec = get_codec_by_id(self.header.page_codec)
+            self.store = CompressedPageStore(self.file, codec, self.page_size, FILE_HEADER_SIZE)
+            self.store.load(self.header.page_map_offset, self.header.page_map_length)
+            self.num_pages = self.store.page_count
+            self.compression = codec.name
+            if use_mmap:
+                logger.warning(f"{filename} is compressed, reading pages through the cache instead of mmap")
+                use_mmap = False
+        elif compression and file_size > FILE_HEADER_SIZE:
+            logger.warning(f"{filename} already exists uncompressed, ignoring compression='{compression}'")
+        self.use_mmap = use_mmap
+        self.prefetcher = None  # ReadAhead, started by the first read_ahead() call
+        self.mapping = None
+        self.mapped_size = 0
+        self.wal = None
+        self.checkpoint_threshold = checkpoint_threshold
+        wal_filename = os.path.splitext(filename)[0] + ".wal"
+        if use_wal or os.path.exists(wal_filename):
+            self._open_wal(wal_filename, keep_open=use_wal)
+        if self.use_mmap:
+            self._remap()
 
-    def read_root_page_number(self) -> int:
+    def _upgrade_legacy_file(self, file_size: int) -> int:
+        """
+        Rewrites a file that only has the old 4-byte root page number in front of
+        its pages so that it starts with a full FileHeader. Returns the new size.
+        """
         self.file.seek(0)
-        data = self.file.read(4)
-        if len(data) < 4:
-            logger.warning(f"File too small for root page number, defaulting to 1")
-            return 1
-        root_page = int.from_bytes(data, 'big')
-        logger.info(f"READ_ROOT_PAGE_NUMBER: {root_page}")
-        return root_page
+        root_page = int.from_bytes(self.file.read(LEGACY_HEADER_SIZE), 'big')
+        upgraded_name = self.filename + ".upgrade"
+        with open(upgraded_name, 'wb') as upgraded:
+            upgraded.write(FileHeader(root_page=root_page).to_bytes())
+            while True:
+                chunk = self.file.read(DEFAULT_PAGE_SIZE * 64)  # Legacy files always have 4 KiB pages
+                if not chunk:
+                    break
+                upgraded.write(chunk)
+            upgraded.flush()
+            os.fsync(upgraded.fileno())
+        self.file.close()
+        os.replace(upgraded_name, self.filename)
+        self.file = open(self.filename, 'r+b')
+        logger.info(f"Upgraded legacy file {self.filename} to format version {FILE_FORMAT_VERSION}")
+        return file_size - LEGACY_HEADER_SIZE + FILE_HEADER_SIZE
+
+    def _open_wal(self, wal_filename: str, keep_open: bool):
+        self.wal = WriteAheadLog(wal_filename, self.page_size)
+        header_frame = self.wal.read_frame(0)
+        if header_frame is not None:
+            logged = FileHeader.from_bytes(header_frame)
+            # The page map location is only ever changed by checkpoints, the table file has the current one
+            logged.page_map_offset = self.header.page_map_offset
+            logged.page_map_length = self.header.page_map_length
+            self.header = logged
+        self.num_pages = max(self.num_pages, self.wal.db_size)
+        if not keep_open:
+            # A log left behind by a WAL-mode session: fold it into the table file
+            logger.info(f"Found WAL {wal_filename} while not in WAL mode, checkpointing it")
+            self.checkpoint()
+            self.wal.close(delete=True)
+            self.wal = None
+
+    def read_root_page_number(self) -> int:
+        logger.info(f"READ_ROOT_PAGE_NUMBER: {self.header.root_page}")
+        return self.header.root_page
 
     def write_root_page_number(self, page_number: int):
-        self.file.seek(0)
-        self.file.write(page_number.to_bytes(4, 'big'))
-        self.file.flush()
+        self.header.root_page = page_number
+        self.header_dirty = True
         logger.info(f"WRITE_ROOT_PAGE_NUMBER: {page_number}")
 
     def read_page(self, page_number: int) -> bytes:
         if page_number < 1:
             raise ValueError(f"Invalid page number: {page_number}")
-        offset = ROOT_PAGE_HEADER_SIZE + (page_number - 1) * PAGE_SIZE
-        self.file.seek(offset)
-        data = self.file.read(PAGE_SIZE)
-        if len(data) < PAGE_SIZE:
+        data = self.cache.get(page_number)
+        if data is not None:
+            self.cache.move_to_end(page_number)
+            self.cache_hits += 1
+            logger.debug(f"Read page {page_number}: cache hit")
+            return data
+        self.cache_misses += 1
+        if self.wal is not None:
+            data = self.wal.read_frame(page_number)
+            if data is not None:
+                self._cache_page(page_number, data)
+                return data
+        if self.use_mmap:
+            return self._read_page_from_mapping(page_number)
+        data = None
+        if self.prefetcher is not None and self.prefetcher.active:
+            data = self.prefetcher.take(page_number)
+        if data is None:
+            data = self._read_page_from_disk(page_number)
+        elif len(data) < self.page_size:
+            data = data.ljust(self.page_size, b'\x00')
+        self._cache_page(page_number, data)
+        return data
+
+    def read_ahead(self, page_numbers):
+        """
+        Starts reading pages that will be needed soon in the background. Pages
+        that are cached, in the WAL or not on disk yet are skipped, and nothing
+        is done with use_mmap, where the kernel already reads ahead.
+        """
+        if self.use_mmap or not hasattr(os, "pread"):
+            return
+        extents = []
+        for page_number in page_numbers:
+            if page_number in self.cache or page_number > self.num_pages:
+                continue
+            if self.wal is not None and page_number in self.wal.index:
+                continue
+            if self.store is not None:
+                extent = self.store.locate(page_number)
+                if extent is None:
+                    continue
+                extents.append((page_number, *extent))
+            else:
+                extents.append((page_number, FILE_HEADER_SIZE + (page_number - 1) * self.page_size, self.page_size))
+        if not extents:
+            return
+        if self.prefetcher is None:
+            self.prefetcher = ReadAhead(self.file, decode=self.store.decode if self.store else None,
+                                        capacity=max(self.cache_size, 64))
+        # Positional reads bypass the file object, so hand it everything buffered first
+        self.file.flush()
+        for _, offset, length in extents:
+            advise_willneed(self.file, offset, length)
+        self.prefetcher.request(extents)
+        logger.debug(f"Read-ahead requested for {len(extents)} pages")
+
+    def _remap(self):
+        unmap_file(self.mapping)
+        self.mapping = map_file_readonly(self.file)
+        self.mapped_size = len(self.mapping) if self.mapping is not None else 0
+        logger.debug(f"Remapped {self.filename}: {self.mapped_size} bytes")
+
+    def _read_page_from_mapping(self, page_number: int):
+        offset = FILE_HEADER_SIZE + (page_number - 1) * self.page_size
+        if offset + self.page_size > self.mapped_size:
+            # The file may have grown since it was mapped
+            self._remap()
+        if offset + self.page_size > self.mapped_size:
+            logger.debug(f"Read page {page_number}: beyond end of file, returning zeroed page")
+            return bytes(self.page_size)
+        return memoryview(self.mapping)[offset:offset + self.page_size]
+
+    def _read_page_from_disk(self, page_number: int) -> bytes:
+        if self.store is not None:
+            return self.store.read_page(page_number)
+        data = read_at(self.file, FILE_HEADER_SIZE + (page_number - 1) * self.page_size, self.page_size)
+        if len(data) < self.page_size:
             # Pad with zeros if page is not fully written yet
-            logger.debug(f"Read page {page_number}: padded with zeros to {PAGE_SIZE} bytes")
-            data = data + b'\x00' * (PAGE_SIZE - len(data))
+            logger.debug(f"Read page {page_number}: padded with zeros to {self.page_size} bytes")
+            data = data + b'\x00' * (self.page_size - len(data))
         else:
             logger.debug(f"Read page {page_number}: {len(data)} bytes")
         return data
 
     def write_page(self, page_number: int, data: bytes):
-        import shutil
-        dir_path = os.path.dirname(self.filename) or "."
-        total, used, free = shutil.disk_usage(dir_path)
-        logger.info(f"Before write: {free // (1024*1024)} MB free on {dir_path}")
-        if len(data) > PAGE_SIZE:
-            raise ValueError(f"Page data too large: {len(data)} > {PAGE_SIZE}")
-        offset = ROOT_PAGE_HEADER_SIZE + (page_number - 1) * PAGE_SIZE
-        self.file.seek(offset)
-        self.file.write(data.ljust(PAGE_SIZE, b'\x00'))  # Pad with zeros if necessary
-        self.file.flush()
-        logger.info(f"Wrote page {page_number}: {len(data)} bytes")
+        if page_number < 1:
+            raise ValueError(f"Invalid page number: {page_number}")
+        if len(data) > self.page_size:
+            raise ValueError(f"Page data too large: {len(data)} > {self.page_size}")
+        self.dirty_pages.add(page_number)
+        self.page_writes += 1
+        self._cache_page(page_number, bytes(data).ljust(self.page_size, b'\x00'))  # Pad with zeros if necessary
+        self.num_pages = max(self.num_pages, page_number)
+        logger.debug(f"Wrote page {page_number} to cache: {len(data)} bytes")
+
+    def _cache_page(self, page_number: int, data: bytes):
+        self.cache[page_number] = data
+        self.cache.move_to_end(page_number)
+        while len(self.cache) > self.cache_size:
+            spill = self._can_spill_dirty_pages()
+            evicted_number = next((n for n in self.cache if spill or n not in self.dirty_pages), None)
+            if evicted_number is None:
+                # Only pinned dirty pages are left, let the cache grow until commit
+                break
+            evicted_data = self.cache.pop(evicted_number)
+            self.cache_evictions += 1
+            if evicted_number in self.dirty_pages:
+                self._write_page_to_disk(evicted_number, evicted_data)
+                self.dirty_pages.discard(evicted_number)
+            logger.debug(f"Evicted page {evicted_number} from cache")
+
+    def _can_spill_dirty_pages(self) -> bool:
+        # In WAL mode the table file may only change during a checkpoint, and
+        # uncommitted pages of an explicit transaction must stay droppable
+        return self.wal is None and not self.in_transaction
+
+    def _write_page_to_disk(self, page_number: int, data: bytes):
+        if self.prefetcher is not None:
+            self.prefetcher.invalidate(page_number)
+        if self.store is not None:
+            self.store.write_page(page_number, data)
+            return
+        # Bypasses the file object's buffer, so the mapping sees the page right away
+        write_at(self.file, FILE_HEADER_SIZE + (page_number - 1) * self.page_size, data)
 
     def allocate_page(self):
-        self.file.seek(0, os.SEEK_END)
-        file_size = self.file.tell()
-        # Subtract 4 bytes for root page header
-        if file_size < ROOT_PAGE_HEADER_SIZE:
-            file_size = ROOT_PAGE_HEADER_SIZE
-        num_pages = (file_size - ROOT_PAGE_HEADER_SIZE) // PAGE_SIZE
-        new_page_number = num_pages + 1
-        if new_page_number == 0:
-            new_page_number = 1
+        if self.header.freelist_trunk:
+            return self._allocate_from_freelist()
+        self.num_pages += 1
+        new_page_number = self.num_pages
         assert new_page_number > 0, "Pager tried to allocate page 0!"
+        if self.store is None and new_page_number > self.file_pages:
+            self._reserve_extent()
         logger.info(f"Allocating new page: {new_page_number}")
         return new_page_number
 
+    def _reserve_extent(self):
+        # Compressed files place pages themselves, so only plain files get extents
+        count = max(self.extent_pages, self.num_pages - self.file_pages)
+        offset = FILE_HEADER_SIZE + self.file_pages * self.page_size
+        if preallocate(self.file, offset, count * self.page_size):
+            logger.info(f"Reserved pages {self.file_pages + 1} to {self.file_pages + count} in {self.filename}")
+        # Even without the reservation, check the disk again only after another extent
+        self.file_pages += count
+
+    def _sync_page_count(self):
+        if self.store is None and self.header.page_count != self.num_pages:
+            self.header.page_count = self.num_pages
+            self.header_dirty = True
+
+    def _read_trunk(self, page_number: int):
+        data = self.read_page(page_number)
+        next_trunk = int.from_bytes(data[0:4], 'big')
+        count = int.from_bytes(data[4:8], 'big')
+        leaves = [int.from_bytes(data[8 + i * 4:12 + i * 4], 'big') for i in range(count)]
+        return next_trunk, leaves
+
+    def _write_trunk(self, page_number: int, next_trunk: int, leaves: list):
+        data = (
+            next_trunk.to_bytes(4, 'big') +
+            len(leaves).to_bytes(4, 'big') +
+            b"".join(leaf.to_bytes(4, 'big') for leaf in leaves)
+        )
+        self.write_page(page_number, data)
+
+    def _allocate_from_freelist(self) -> int:
+        trunk = self.header.freelist_trunk
+        next_trunk, leaves = self._read_trunk(trunk)
+        if leaves:
+            page_number = leaves.pop()
+            self._write_trunk(trunk, next_trunk, leaves)
+        else:
+            # Trunk has no leaves left, hand out the trunk page itself
+            page_number = trunk
+            self.header.freelist_trunk = next_trunk
+        self.header.freelist_count -= 1
+        self.header_dirty = True
+        logger.info(f"Allocating page {page_number} from freelist ({self.header.freelist_count} free pages left)")
+        return page_number
+
+    def free_page(self, page_number: int):
+        """
+        Puts a page that is no longer referenced on the freelist for reuse.
+        """
+        if page_number < 1 or page_number > self.num_pages:
+            raise ValueError(f"Invalid page number: {page_number}")
+        trunk = self.header.freelist_trunk
+        if trunk:
+            next_trunk, leaves = self._read_trunk(trunk)
+            if len(leaves) < self.freelist_trunk_capacity:
+                leaves.append(page_number)
+                self._write_trunk(trunk, next_trunk, leaves)
+            else:
+                self._write_trunk(page_number, trunk, [])
+                self.header.freelist_trunk = page_number
+        else:
+            self._write_trunk(page_number, 0, [])
+            self.header.freelist_trunk = page_number
+        self.header.freelist_count += 1
+        self.header_dirty = True
+        logger.info(f"Freed page {page_number} ({self.header.freelist_count} free pages)")
+
+    def write_overflow(self, data) -> int:
+        """
+        Writes data to a new chain of overflow pages and returns the first page number.
+        """
+        capacity = self.page_size - OVERFLOW_POINTER_SIZE
+        page_numbers = [self.allocate_page() for _ in range(0, len(data), capacity)]
+        for i, page_number in enumerate(page_numbers):
+            next_page = page_numbers[i + 1] if i + 1 < len(page_numbers) else 0
+            chunk = data[i * capacity:(i + 1) * capacity]
+            self.write_page(page_number, CHILD_POINTER.pack(next_page) + bytes(chunk))
+        logger.debug(f"Wrote {len(data)} bytes to overflow chain starting at page {page_numbers[0]}")
+        return page_numbers[0]
+
+    def read_overflow(self, first_page: int, length: int) -> bytes:
+        """
+        Reads length bytes from the overflow chain starting at first_page.
+        """
+        parts = []
+        page_number = first_page
+        while length > 0:
+            if page_number < 1:
+                logger.error(f"Overflow chain starting at page {first_page} ends early")
+                raise ValueError(f"Overflow chain starting at page {first_page} is truncated")
+            data = self.read_page(page_number)
+            chunk = min(length, self.page_size - OVERFLOW_POINTER_SIZE)
+            parts.append(bytes(data[OVERFLOW_POINTER_SIZE:OVERFLOW_POINTER_SIZE + chunk]))
+            length -= chunk
+            page_number = CHILD_POINTER.unpack_from(data)[0]
+        return b"".join(parts)
+
+    def free_overflow(self, first_page: int):
+        """
+        Returns every page of an overflow chain to the freelist.
+        """
+        page_number = first_page
+        while page_number:
+            next_page = CHILD_POINTER.unpack_from(self.read_page(page_number))[0]
+            self.free_page(page_number)
+            page_number = next_page
+        logger.debug(f"Freed overflow chain starting at page {first_page}")
+
+    def begin(self):
+        """
+        Starts an explicit transaction. Pages written from here on are held in
+        the cache until commit() and discarded by rollback().
+        """
+        if self.in_transaction:
+            raise RuntimeError(f"Transaction already active on {self.filename}")
+        self.commit()
+        self.saved_header = FileHeader.from_bytes(self.header.to_bytes())
+        self.saved_num_pages = self.num_pages
+        self.in_transaction = True
+        logger.info(f"BEGIN transaction on {self.filename}")
+
+    def rollback(self):
+        """
+        Drops every page written since begin() and restores the file header.
+        """
+        if not self.in_transaction:
+            raise RuntimeError(f"No transaction active on {self.filename}")
+        for page_number in self.dirty_pages:
+            self.cache.pop(page_number, None)
+        discarded = len(self.dirty_pages)
+        self.dirty_pages.clear()
+        self.header = self.saved_header
+        self.header_dirty = False
+        self.num_pages = self.saved_num_pages
+        self.in_transaction = False
+        logger.info(f"ROLLBACK on {self.filename}: discarded {discarded} dirty pages")
+
+    def commit(self):
+        """
+        Writes every dirty page and the file header back to the file, or appends
+        them to the write-ahead log as one transaction in WAL mode. Ends an
+        explicit transaction started with begin().
+        """
+        self.in_transaction = False
+        self._sync_page_count()
+        if self.wal is not None:
+            self._commit_to_wal()
+            return
+        written = 0
+        for page_number in sorted(self.dirty_pages):
+            self._write_page_to_disk(page_number, self.cache[page_number])
+            written += 1
+        self.dirty_pages.clear()
+        self._write_header()
+        self.file.flush()
+        logger.info(f"Committed {written} dirty pages to {self.filename}")
+
+    def _write_header(self):
+        # The page map of a compressed file moves whenever it changes, so save it first
+        if self.store is not None and self.store.save_map(self.header):
+            self.header_dirty = True
+        if self.header_dirty:
+            self.file.seek(0)
+            self.file.write(self.header.to_bytes())
+            self.header_dirty = False
+        if self.store is not None and self.store.retired:
+            # The new map is in place, so the slots only the old one used can be reused
+            self.file.flush()
+            self.store.release_retired()
+
+    def _commit_to_wal(self):
+        pages = {page_number: self.cache[page_number] for page_number in self.dirty_pages}
+        if self.header_dirty:
+            pages[0] = self.header.to_bytes().ljust(self.page_size, b'\x00')
+        self.wal.append_transaction(pages, self.num_pages)
+        self.dirty_pages.clear()
+        self.header_dirty = False
+        if self.wal.frame_count >= self.checkpoint_threshold:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Copies the newest committed image of every page in the log back into the
+        table file, syncs it and empties the log.
+        """
+        if self.wal is None:
+            return
+        copied = 0
+        for page_number, data in self.wal.committed_pages():
+            if page_number == 0:
+                # The logged header image is the committed self.header, written below
+                self.header_dirty = True
+            else:
+                self._write_page_to_disk(page_number, data)
+            copied += 1
+        self._write_header()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.wal.reset()
+        logger.info(f"Checkpointed {copied} pages from WAL into {self.filename}")
+
+    def _trim_extent(self):
+        # Gives back the reserved pages that were never used
+        size = FILE_HEADER_SIZE + self.num_pages * self.page_size
+        if os.fstat(self.file.fileno()).st_size > size:
+            self.file.truncate(size)
+            logger.debug(f"Trimmed {self.filename} to {self.num_pages} pages")
+        self.file_pages = self.num_pages
+
+    def cache_stats(self) -> dict:
+        return {
+            "capacity": self.cache_size,
+            "size": len(self.cache),
+            "dirty": len(self.dirty_pages),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "evictions": self.cache_evictions,
+            "writes": self.page_writes,
+            "read_ahead_hits": self.prefetcher.hits if self.prefetcher else 0,
+        }
+
     def close(self):
         if self.file and not self.file.closed:
-            self.file.flush()
+            if self.prefetcher is not None:
+                self.prefetcher.close()
+                self.prefetcher = None
+            self.commit()
+            if self.wal is not None:
+                self.checkpoint()
+                self.wal.close(delete=True)
+                self.wal = None
+            unmap_file(self.mapping)
+            self.mapping = None
+            if self.store is not None:
+                self.store.trim()
+            else:
+                self._trim_extent()
             os.fsync(self.file.fileno())  # Ensure all data is written to disk
             self.file.close()
-            logger.info(f"Closed file: {self.filename}")
\ No newline at end of file
+            logger.info(f"Closed file: {self.filename} (cache stats: {self.cache_stats()})")
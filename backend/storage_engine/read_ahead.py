@@ -0,0 +1,100 @@
+"""
+Background read-ahead for a Pager.
+
+A scan that knows which pages it will visit next hands their file extents to a
+ReadAhead. A worker thread reads them with positional reads (the Pager's file
+position is never touched) and keeps the images until the Pager asks for them
+on a cache miss. The Pager stays single-threaded: only the worker's queue and
+the pending/ready maps are shared, and they are guarded by one lock.
+
+A page written to the file after it was requested is invalidated, so the worker
+never hands out an image older than the file.
+"""
+import queue
+import threading
+from storage_engine.os_interface import read_at
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class ReadAhead:
+    def __init__(self, file, decode=None, capacity: int = 1024):
+        self.file = file
+        self.decode = decode  # Turns the stored bytes into a page image, for compressed files
+        self.capacity = capacity  # Most page images kept before unclaimed ones are dropped
+        self.lock = threading.Lock()
+        self.pending = set()  # Requested, not read yet
+        self.ready = {}  # page_number -> page image, read but not claimed
+        self.requests = queue.Queue()
+        self.worker = None
+        self.hits = 0
+
+    def request(self, extents):
+        """
+        Queues [(page_number, offset, length)] for the worker.
+        """
+        with self.lock:
+            extents = [extent for extent in extents
+                       if extent[0] not in self.pending and extent[0] not in self.ready]
+            if not extents:
+                return
+            if len(self.ready) + len(extents) > self.capacity:
+                # Nobody is claiming them, most likely an abandoned scan
+                self.ready.clear()
+            self.pending.update(page_number for page_number, _, _ in extents)
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, name=f"read-ahead {self.file.name}", daemon=True)
+            self.worker.start()
+        self.requests.put(extents)
+
+    def take(self, page_number: int):
+        """
+        Returns the prefetched image of a page, or None. Either way the page is
+        no longer tracked, so the caller reads it itself if needed.
+        """
+        with self.lock:
+            self.pending.discard(page_number)
+            data = self.ready.pop(page_number, None)
+        if data is not None:
+            self.hits += 1
+        return data
+
+    def invalidate(self, page_number: int):
+        with self.lock:
+            self.pending.discard(page_number)
+            self.ready.pop(page_number, None)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.pending or self.ready)
+
+    def _run(self):
+        while True:
+            extents = self.requests.get()
+            if extents is None:
+                return
+            for page_number, offset, length in extents:
+                if page_number not in self.pending:
+                    continue
+                try:
+                    data = read_at(self.file, offset, length)
+                    if self.decode is not None:
+                        data = self.decode(data)
+                except Exception as e:
+                    logger.warning(f"Read-ahead of page {page_number} failed: {e}")
+                    self.invalidate(page_number)
+                    continue
+                with self.lock:
+                    # Dropped if the page was taken or written while it was being read
+                    if page_number in self.pending:
+                        self.pending.discard(page_number)
+                        self.ready[page_number] = data
+
+    def close(self):
+        if self.worker is not None:
+            self.requests.put(None)
+            self.worker.join()
+            self.worker = None
+        self.pending.clear()
+        self.ready.clear()
+        logger.debug(f"Read-ahead for {self.file.name} stopped after {self.hits} hits")
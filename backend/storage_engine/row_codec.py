@@ -1,31 +1,269 @@
+"""
+Row encoding.
+
+Rows of a table with a known schema are stored as binary records:
+
+    format byte (RECORD_FORMAT) | one serial type byte per column | packed values | text bytes
+
+The columns are the schema's, in order, so column names are not repeated in
+every row. A column's serial type says how its value is packed: NULL, true and
+false take no space, integers take the smallest of 1, 2, 4 or 8 bytes, floats
+8 bytes, and text a 2 or 4 byte length with the UTF-8 bytes at the end of the
+record. Values keep the Python type they were written with, so a TEXT column
+holding an int reads back an int just as it did in JSON.
+
+The packed part of every distinct header is read and written with one
+precompiled struct.Struct. Rows without a schema, rows holding values that have
+no serial type (such as ints beyond 64 bits) and rows written before this
+format are JSON, which starts with '{' and is still read.
+"""
 import json
+import struct
+from functools import lru_cache
+from storage_engine.pager import OverflowPayload
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-def encode_row(row: dict) -> bytes:
-    logger.debug(f"Encoding row: {row}")
+RECORD_FORMAT = 0x01  # First byte of a binary record
+
+# Serial types
+NULL = 0
+INT8 = 1
+INT16 = 2
+INT32 = 3
+INT64 = 4
+DOUBLE = 5
+FALSE = 6
+TRUE = 7
+TEXT = 8  # Up to 64 KiB of UTF-8, 2 byte length
+LONG_TEXT = 9  # 4 byte length
+
+# struct codes of the packed part; text types pack their length
+_PACKED = {INT8: "b", INT16: "h", INT32: "i", INT64: "q", DOUBLE: "d", TEXT: "H", LONG_TEXT: "I"}
+_CONSTANTS = {NULL: None, FALSE: False, TRUE: True}
+_TEXT_TYPES = (TEXT, LONG_TEXT)
+
+def _int_type(value: int) -> int:
+    # The smallest integer serial type holding the value, None beyond 64 bits
+    if -0x80 <= value < 0x80:
+        return INT8
+    if -0x8000 <= value < 0x8000:
+        return INT16
+    if -0x80000000 <= value < 0x80000000:
+        return INT32
+    if -0x8000000000000000 <= value < 0x8000000000000000:
+        return INT64
+    return None
+
+class RowCodec:
+    """
+    Encodes and decodes the rows of one schema, a list of (name, type) pairs.
+    The Struct and field plan of each header seen are cached on the codec.
+    """
+    def __init__(self, schema):
+        self.columns = tuple(name for name, _ in schema)
+        self._layouts = {}  # header bytes -> (Struct, text fields, constant fields)
+        self._projections = {}  # (header bytes, columns) -> (Struct, text offset, fields, constant fields)
+
+    def _layout(self, header: bytes):
+        layout = self._layouts.get(header)
+        if layout is None:
+            if len(header) != len(self.columns):
+                raise ValueError(f"Record header has {len(header)} columns, the schema has {len(self.columns)}")
+            texts = []  # Index of each text length in the unpacked values
+            constants = []  # (column position, value), in column order
+            codes = []
+            for position, serial_type in enumerate(header):
+                if serial_type in _CONSTANTS:
+                    constants.append((position, _CONSTANTS[serial_type]))
+                    continue
+                if serial_type not in _PACKED:
+                    raise ValueError(f"Unknown serial type {serial_type} in record header")
+                if serial_type in _TEXT_TYPES:
+                    texts.append(len(codes))
+                codes.append(_PACKED[serial_type])
+            layout = self._layouts[header] = (struct.Struct("<" + "".join(codes)), texts, constants)
+        return layout
+
+    def encode(self, row: dict) -> bytes:
+        """
+        Packs the schema's columns of a row; keys outside the schema, such as
+        rowid, are not stored and missing columns are NULL. Returns None if a
+        value has no serial type.
+        """
+        header = bytearray((RECORD_FORMAT,))
+        packed = []
+        texts = []
+        for name in self.columns:
+            value = row.get(name)
+            kind = type(value)
+            if kind is str:
+                value = value.encode("utf-8")
+                header.append(TEXT if len(value) <= 0xFFFF else LONG_TEXT)
+                packed.append(len(value))
+                texts.append(value)
+            elif kind is int:
+                serial_type = _int_type(value)
+                if serial_type is None:
+                    return None
+                header.append(serial_type)
+                packed.append(value)
+            elif kind is float:
+                header.append(DOUBLE)
+                packed.append(value)
+            elif value is None:
+                header.append(NULL)
+            elif kind is bool:
+                header.append(TRUE if value else FALSE)
+            else:
+                return None
+        header = bytes(header)
+        packer = (self._layouts.get(header[1:]) or self._layout(header[1:]))[0]
+        return b"".join((header, packer.pack(*packed), *texts))
+
+    def decode(self, blob) -> dict:
+        if not isinstance(blob, bytes):
+            # Values with an overflow chain are only read in full here
+            blob = bytes(blob)
+        if not blob or blob[0] != RECORD_FORMAT:
+            return _decode_json(blob)
+        start = len(self.columns) + 1
+        try:
+            packer, texts, constants = self._layouts.get(blob[1:start]) or self._layout(blob[1:start])
+            values = list(packer.unpack_from(blob, start))
+            offset = start + packer.size
+            # The text of each text field follows the packed part, in column order
+            for index in texts:
+                end = offset + values[index]
+                values[index] = blob[offset:end].decode("utf-8")
+                offset = end
+            if offset != len(blob):
+                raise ValueError(f"{len(blob) - offset} bytes of text missing or left over")
+        except (struct.error, UnicodeDecodeError, ValueError) as e:
+            logger.error(f"Failed to decode record {blob}: {e}")
+            raise ValueError(f"Corrupt record: {e}") from e
+        for position, value in constants:
+            values.insert(position, value)
+        return dict(zip(self.columns, values))
+
+    def _projection(self, header: bytes, columns: tuple):
+        projection = self._projections.get((header, columns))
+        if projection is None:
+            packer = self._layout(header)[0]
+            wanted = set(columns)
+            # Text is found by adding up the lengths before it, so those are read up to the last wanted text
+            last_text = max((position for position, (name, serial_type) in enumerate(zip(self.columns, header))
+                             if name in wanted and serial_type in _TEXT_TYPES), default=-1)
+            codes = []
+            fields = []  # (name, or None for a skipped text, is text) of each unpacked value
+            constants = []
+            for position, (name, serial_type) in enumerate(zip(self.columns, header)):
+                if serial_type in _CONSTANTS:
+                    if name in wanted:
+                        constants.append((name, _CONSTANTS[serial_type]))
+                    continue
+                code = _PACKED[serial_type]
+                if serial_type in _TEXT_TYPES and position <= last_text:
+                    codes.append(code)
+                    fields.append((name if name in wanted else None, True))
+                elif serial_type not in _TEXT_TYPES and name in wanted:
+                    codes.append(code)
+                    fields.append((name, False))
+                else:
+                    codes.append(f"{struct.calcsize(code)}x")
+            while codes and codes[-1].endswith("x"):
+                codes.pop()
+            projection = self._projections[(header, columns)] = (
+                struct.Struct("<" + "".join(codes)), len(header) + 1 + packer.size, fields, constants)
+        return projection
+
+    def decode_columns(self, blob, columns: tuple) -> dict:
+        """
+        Decodes only the given columns of a row, a tuple of names; the values
+        of the others are skipped by their offsets. Names outside the schema
+        are left out. JSON rows are decoded in full. Of a row with an overflow
+        chain, the chain is only read if the columns reach past the local part.
+        """
+        if isinstance(blob, OverflowPayload):
+            row = self._decode_columns(bytes(blob.local), columns, partial=True)
+            if row is not None:
+                return row
+        if not isinstance(blob, bytes):
+            blob = bytes(blob)
+        return self._decode_columns(blob, columns)
+
+    def _decode_columns(self, blob: bytes, columns: tuple, partial: bool = False):
+        # With partial, blob is the start of a row and None is returned if the columns do not all lie in it
+        if not blob or blob[0] != RECORD_FORMAT:
+            return None if partial else _decode_json(blob)
+        start = len(self.columns) + 1
+        if partial and len(blob) < start:
+            return None
+        try:
+            packer, offset, fields, constants = self._projection(blob[1:start], columns)
+            if partial and start + packer.size > len(blob):
+                return None
+            row = {}
+            for (name, is_text), value in zip(fields, packer.unpack_from(blob, start)):
+                if is_text:
+                    end = offset + value
+                    if end > len(blob):
+                        if partial:
+                            return None
+                        raise ValueError(f"{end - len(blob)} bytes of text missing")
+                    if name is not None:
+                        row[name] = blob[offset:end].decode("utf-8")
+                    offset = end
+                else:
+                    row[name] = value
+        except (struct.error, UnicodeDecodeError, ValueError) as e:
+            logger.error(f"Failed to decode record {blob}: {e}")
+            raise ValueError(f"Corrupt record: {e}") from e
+        row.update(constants)
+        return row
+
+@lru_cache(maxsize=256)
+def _codec(schema: tuple) -> RowCodec:
+    return RowCodec(schema)
+
+def get_codec(schema) -> RowCodec:
+    """
+    The shared codec of a schema, which may be a list of [name, type] lists as
+    stored in the catalog. Callers decoding many rows should keep it.
+    """
+    return _codec(tuple(map(tuple, schema)))
+
+def encode_row(row: dict, schema=None) -> bytes:
+    if schema is not None:
+        encoded = get_codec(schema).encode(row)
+        if encoded is not None:
+            return encoded
+        logger.debug("Row holds a value without a serial type, storing it as JSON")
     try:
-        encoded = json.dumps(row).encode("utf-8")
-        logger.debug(f"Encoded bytes: {encoded}")
-        logger.info("Row successfully encoded.")
-        return encoded
+        return json.dumps(row).encode("utf-8")
     except (TypeError, ValueError) as e:
         logger.error(f"Failed to encode row {row}: {e}")
         raise
 
-def decode_row(blob: bytes) -> dict:
+def decode_row(blob: bytes, schema=None, columns=None) -> dict:
+    if schema is not None:
+        if columns is not None:
+            return get_codec(schema).decode_columns(blob, tuple(columns))
+        return get_codec(schema).decode(blob)
+    if not isinstance(blob, bytes):
+        blob = bytes(blob)
+    if blob and blob[0] == RECORD_FORMAT:
+        logger.error("Cannot decode a binary record without the table's schema")
+        raise ValueError("Cannot decode a binary record without the table's schema")
+    return _decode_json(blob)
+
+def _decode_json(blob: bytes) -> dict:
     if not blob or blob.strip() == b'':
         logger.warning("Cannot decode an empty or whitespace-only blob.")
         raise ValueError("Cannot decode an empty or whitespace-only blob.")
-    
     try:
-        decoded_str = blob.decode("utf-8")
-        logger.debug(f"Decoding blob: {blob} -> '{decoded_str}'")
-        row = json.loads(decoded_str)
-        logger.debug(f"Decoded row dict: {row}")
-        logger.info("Blob successfully decoded to row.")
-        return row
+        return json.loads(blob)
     except (UnicodeDecodeError, json.JSONDecodeError) as e:
         logger.error(f"Failed to decode blob {blob}: {e}")
         raise
@@ -1,29 +1,77 @@
-from storage_engine.pager import Pager, BTreePage, PageHeader
+from storage_engine.os_interface import replace_file
+from storage_engine.pager import (Pager, BTreePage, PageHeader, PageView, OverflowPayload, DEFAULT_CACHE_SIZE,
+                                  payload_limits, local_payload_size)
 from utils.logger import get_logger
 import os
+from collections import deque
+from itertools import islice
+from operator import itemgetter
+import bisect
 
 logger = get_logger(__name__)
 
-MAX_KEYS = 32  # Simulate a page size limit (adjust as needed)
-MIN_KEYS = MAX_KEYS // 2
+MIN_FILL_FACTOR = 0.25  # Share of a page below which a page borrows from or merges with a sibling after a delete
+DEFAULT_FILL_FACTOR = 0.9  # Share of a page the left half keeps when an append splits the rightmost page
+DEFAULT_READ_AHEAD = 32  # Leaf pages a scan asks the pager to prefetch ahead of its position
 
 class Table:
-    def __init__(self, table_name: str, schema=None, db_path=None):
+    """
+    A B-Tree of (rowid, row bytes) cells.
+
+    By default a table owns its own <table>.tbl file and finds its root page in
+    the file header. Passing a shared pager instead stores the tree inside that
+    pager's file, rooted at root_page_num (a fresh root page is allocated when it
+    is None). Either way the root page number never changes once created: a root
+    split moves the old root's cells to a new page, so the catalog entry stays valid.
+
+    Inserts past the largest key split the rightmost pages unevenly, leaving the
+    left page fill_factor full instead of half empty, and go straight to the
+    rightmost leaf without descending while that leaf has room. next_rowid()
+    reads the largest key from the same rightmost edge and keeps it cached.
+    insert_many() applies a whole batch with one rewrite per page it touches.
+
+    scan() keeps the next read_ahead leaves (0 disables it) prefetching in the
+    background, see BTreeCursor.
+
+    page_size picks the page size of a new table file (see Pager); pages are
+    rebalanced after deletes once they are less than MIN_FILL_FACTOR full.
+    """
+    def __init__(self, table_name: str, schema=None, db_path=None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 use_mmap: bool = False, use_wal: bool = False, pager: Pager = None, root_page_num: int = None,
+                 fill_factor: float = DEFAULT_FILL_FACTOR, compression: str = None,
+                 read_ahead: int = DEFAULT_READ_AHEAD, page_size: int = None):
+        if not 0 < fill_factor <= 1:
+            raise ValueError(f"fill_factor must be in (0, 1], got {fill_factor}")
         self.table_name = table_name
+        self.fill_factor = fill_factor
+        self.read_ahead = max(0, read_ahead)
+        self.rightmost_leaf = None  # Page number of the rightmost leaf, while known to be current
+        self.last_key = None  # Largest key in the table, while known to be current
         if db_path is None:
             db_path = os.getcwd()
         self.db_path = db_path
-        self.filename = os.path.join(self.db_path, f"{table_name}.tbl")
         self.schema = schema
-        logger.info(f"Initializing Table for '{self.table_name}', file: {self.filename}")
-        try:
-            self.pager = Pager(self.filename)
-            logger.debug(f"Pager created for file: {self.filename}")
-        except Exception as e:
-            logger.error(f"Failed to initialize Pager for {self.filename}: {e}")
-            raise
-        # Always get root page number from Pager
-        self.root_page_num = self.pager.read_root_page_number()
+        self.owns_pager = pager is None
+        if self.owns_pager:
+            self.filename = os.path.join(self.db_path, f"{table_name}.tbl")
+            logger.info(f"Initializing Table for '{self.table_name}', file: {self.filename}")
+            try:
+                self.pager = Pager(self.filename, cache_size=cache_size, use_mmap=use_mmap, use_wal=use_wal,
+                                   compression=compression, page_size=page_size)
+                logger.debug(f"Pager created for file: {self.filename}")
+            except Exception as e:
+                logger.error(f"Failed to initialize Pager for {self.filename}: {e}")
+                raise
+            # Always get root page number from Pager
+            self.root_page_num = self.pager.read_root_page_number()
+        else:
+            self.pager = pager
+            self.filename = pager.filename
+            logger.info(f"Initializing Table for '{self.table_name}' in shared file {self.filename}, root page {root_page_num}")
+            if root_page_num is None:
+                root_page_num = self.pager.allocate_page()
+                self.pager.write_page(root_page_num, self._new_page(is_leaf=True).to_bytes())
+            self.root_page_num = root_page_num
         logger.info(f"Root page number initialized to {self.root_page_num} for table '{self.table_name}'")
         # --- FIX: Ensure root page is initialized and never 0 ---
         if self.root_page_num == 0:
@@ -35,233 +83,598 @@ class Table:
             raw = self.pager.read_page(self.root_page_num)
             if all(b == 0 for b in raw[:11]):
                 logger.info(f"Root page {self.root_page_num} is empty, initializing as empty leaf page.")
-                empty_page = BTreePage(is_leaf=True)
+                empty_page = self._new_page(is_leaf=True)
                 self.pager.write_page(self.root_page_num, empty_page.to_bytes())
         except Exception as e:
             logger.error(f"Error initializing root page for table '{self.table_name}': {e}")
             raise
 
     def insert(self, key, value):
-        split = self._insert_recursive(self.root_page_num, key, value)
+        value = self._make_payload(value)
+        if self._append_to_rightmost_leaf(key, value):
+            self._note_key(key)
+            return
+        split = self._insert_recursive(self.root_page_num, key, value, rightmost=True)
         if split is not None:
             median_key, right_page_number = split
-            new_root = BTreePage(is_leaf=False)
+            # Move the left half out of the root so the root keeps its page number
+            left_page_number = self.pager.allocate_page()
+            self.pager.write_page(left_page_number, self.pager.read_page(self.root_page_num))
+            new_root = self._new_page(is_leaf=False)
             new_root.cells = [(median_key, right_page_number)]
             new_root.header.num_keys = 1
-            new_root.children = [self.root_page_num, right_page_number]
-            new_root_page_num = self.pager.allocate_page()
-            self.pager.write_page(new_root_page_num, new_root.to_bytes())
-            logger.info(f"About to write new root page number: {new_root_page_num}")
-            self.root_page_num = new_root_page_num
-            self.pager.write_root_page_number(new_root_page_num)
-            logger.info(f"Root page split, new root page created: {new_root_page_num}")
-
-    def _insert_recursive(self, page_number: int, key, value):
-        page = self.load_page(page_number)
-        logger.info(f"_insert_recursive: page_number={page_number}, is_leaf={page.is_leaf}, num_cells={len(page.cells)} BEFORE")
-        if page.is_leaf:
+            new_root.children = [left_page_number, right_page_number]
+            self.save_page(self.root_page_num, new_root)
+            logger.info(f"Root page split, left half moved to page {left_page_number}")
+        self._note_key(key)
+
+    def _note_key(self, key):
+        if self.last_key is not None and key > self.last_key:
+            self.last_key = key
+
+    def max_key(self):
+        """
+        Returns the largest key in the table, or None if it is empty. The first
+        call walks down the rightmost edge of the tree, which also pins the
+        rightmost leaf for appends; after that inserts keep the answer current.
+        """
+        if self.last_key is not None:
+            return self.last_key
+        page_number = self.root_page_num
+        view = self.load_page_view(page_number)
+        while not view.is_leaf:
+            page_number = view.child_at(len(view))
+            view = self.load_page_view(page_number)
+        if len(view) or page_number == self.root_page_num:
+            self.rightmost_leaf = page_number
+        if len(view):
+            self.last_key = view.key_at(len(view) - 1)
+        elif page_number != self.root_page_num:
+            # Deletes left the rightmost leaf empty; its left neighbours still have rows.
+            # It is not pinned, as without a last key nothing bounds the keys appended to it
+            logger.warning(f"Rightmost leaf {page_number} of '{self.table_name}' is empty, scanning for the largest key")
+            self.last_key = max((key for key, _, _ in self.scan()), default=None)
+        return self.last_key
+
+    def next_rowid(self) -> int:
+        """
+        The rowid after the largest one in use, 1 for an empty table.
+        """
+        last_key = self.max_key()
+        return 1 if last_key is None else last_key + 1
+
+    def _append_to_rightmost_leaf(self, key, value) -> bool:
+        """
+        Fast path for appends: adds the cell to the pinned rightmost leaf without
+        descending. Returns False when the key or a split needs the full insert.
+        """
+        if self.rightmost_leaf is None:
+            return False
+        view = self.load_page_view(self.rightmost_leaf)
+        if not len(view) and self.rightmost_leaf != self.root_page_num:
+            # Only the parent's separator bounds the keys of an empty leaf
+            return False
+        if len(view) and key <= view.key_at(len(view) - 1):
+            return False
+        data = view.insert_cell(key, value)
+        if data is None:
+            return False
+        self.pager.write_page(self.rightmost_leaf, data)
+        return True
+
+    def _append_split_index(self, page: BTreePage) -> int:
+        # Keeps as many leading cells as fit in fill_factor of a page, moving at least one
+        limit = int(self.pager.page_size * self.fill_factor)
+        index = len(page.cells)
+        size = page.byte_size()
+        while index > 1 and size > limit:
+            index -= 1
+            size -= page.cells.cell_size(page.cells[index])
+        return min(index, len(page.cells) - 1)
+
+    def _insert_recursive(self, page_number: int, key, value, rightmost: bool = False):
+        view = self.load_page_view(page_number)
+        logger.info(f"_insert_recursive: page_number={page_number}, is_leaf={view.is_leaf}, num_cells={len(view)} BEFORE")
+        if view.is_leaf:
+            data = view.insert_cell(key, value)
+            if data is not None:
+                self.pager.write_page(page_number, data)
+                if rightmost:
+                    self.rightmost_leaf = page_number
+                return None
+            # Older page layout or no room: decode the page
+            page = view.to_page()
             if not page.is_full(key, value):
                 page.add_leaf_cell(key, value)
                 logger.info(f"_insert_recursive: page_number={page_number}, is_leaf={page.is_leaf}, num_cells={len(page.cells)} AFTER add_leaf_cell")
                 self.save_page(page_number, page)
+                if rightmost:
+                    self.rightmost_leaf = page_number
                 return None
             else:
                 logger.debug(f"Leaf page {page_number} is full, splitting")
+                appending = rightmost and page._search(key) == len(page.cells)
                 page.add_leaf_cell(key, value)
                 logger.info(f"_insert_recursive: page_number={page_number}, is_leaf={page.is_leaf}, num_cells={len(page.cells)} AFTER add_leaf_cell (split)")
-                median_key, right_page_number = page.split_leaf_page(self.pager)
+                split_index = self._append_split_index(page) if appending else None
+                median_key, right_page_number = page.split_leaf_page(self.pager, split_index)
                 self.save_page(page_number, page)
+                if rightmost:
+                    # A root split moves the left half, so the right page stays the rightmost leaf
+                    self.rightmost_leaf = right_page_number
                 return median_key, right_page_number
         else:
-            idx = page.find_child_index(key)
-            if idx >= len(page.children):
-                logger.error(f"Child index {idx} out of range for children {page.children}")
-                raise IndexError(f"Child index {idx} out of range for children {page.children}")
-            child_page_number = page.children[idx]
+            # Descend on the raw page; it is only decoded if a child split lands here
+            idx = view.find_child_index(key)
+            child_page_number = view.child_at(idx)
+            child_rightmost = rightmost and idx == len(view)
             if child_page_number < 1:
                 logger.error(f"Attempted to descend to invalid child page {child_page_number} for key={key} in page {page_number}")
                 raise ValueError(f"Invalid child page number: {child_page_number}")
             logger.debug(f"Descending to child page {child_page_number} for key={key}")
-            split = self._insert_recursive(child_page_number, key, value)
+            split = self._insert_recursive(child_page_number, key, value, child_rightmost)
             if split is not None:
                 median_key, right_page_number = split
+                page = self.load_page(page_number)
                 page.insert_internal_cell(median_key, right_page_number)
                 if page.is_full():
                     logger.debug(f"Internal page {page_number} is full, splitting")
-                    median_key, right_page_number = page.split_internal_page(self.pager)
+                    # On an append keep the right page to a single separator and its two children
+                    split_index = min(self._append_split_index(page), len(page.cells) - 2) if child_rightmost else None
+                    median_key, right_page_number = page.split_internal_page(self.pager, split_index)
                     self.save_page(page_number, page)
                     return (median_key, right_page_number)
                 self.save_page(page_number, page)
             return None
 
-    def delete(self, key):
+    def bulk_load(self, rows, fill_factor: float = 0.9) -> int:
         """
-        Delete a key from the B-Tree, handling underflow/merge if needed.
+        Builds the tree of an empty table from (key, value) pairs sorted by key.
+
+        Leaves are packed left to right up to fill_factor of a page and the
+        internal levels are built bottom-up as leaves complete, so every page is
+        written exactly once and no page is ever split. Returns the row count.
         """
-        self._delete_recursive(self.root_page_num, key, parent_page_num=None, parent_index=None)
+        if not 0 < fill_factor <= 1:
+            raise ValueError(f"fill_factor must be in (0, 1], got {fill_factor}")
+        root = self.load_page_view(self.root_page_num)
+        if not root.is_leaf or len(root):
+            logger.error(f"bulk_load called on non-empty table '{self.table_name}'")
+            raise ValueError(f"bulk_load requires an empty table, '{self.table_name}' has rows")
+        limit = int(self.pager.page_size * fill_factor)
+        levels = []  # Per internal level: [page being filled, smallest key below it]
+        leaf = self._new_page(is_leaf=True)
+        leaf_number = None  # Allocated once we know the leaf is not the root
+        previous_key = None
+        count = 0
+        for key, value in rows:
+            if previous_key is not None and key <= previous_key:
+                raise ValueError(f"bulk_load rows must be sorted by unique key: {key} after {previous_key}")
+            previous_key = key
+            value = self._make_payload(value)
+            if leaf.cells and leaf.byte_size() + leaf.cells.cell_size((key, value)) > limit:
+                if leaf_number is None:
+                    leaf_number = self.pager.allocate_page()
+                next_leaf_number = self.pager.allocate_page()
+                leaf.header.right_sibling = next_leaf_number
+                self.save_page(leaf_number, leaf)
+                self._bulk_add_child(levels, 0, leaf.cells[0][0], leaf_number, limit)
+                leaf = self._new_page(is_leaf=True)
+                leaf_number = next_leaf_number
+            leaf.cells.append((key, value))
+            count += 1
+        if leaf_number is None:
+            # Everything fit in one leaf
+            self.save_page(self.root_page_num, leaf)
+            self.rightmost_leaf = self.root_page_num
+            self.last_key = previous_key
+        else:
+            self.save_page(leaf_number, leaf)
+            self.rightmost_leaf = leaf_number
+            self.last_key = previous_key
+            self._bulk_add_child(levels, 0, leaf.cells[0][0], leaf_number, limit)
+            for level, (page, min_key) in enumerate(levels):
+                if level == len(levels) - 1:
+                    self.save_page(self.root_page_num, page)
+                else:
+                    page_number = self.pager.allocate_page()
+                    self.save_page(page_number, page)
+                    self._bulk_add_child(levels, level + 1, min_key, page_number, limit)
+        logger.info(f"Bulk loaded {count} rows into table '{self.table_name}' ({len(levels) + 1} levels)")
+        return count
 
-    def _delete_recursive(self, page_number, key, parent_page_num, parent_index):
-        page = self.load_page(page_number)
-        if page.is_leaf:
-            # Delete the key from the leaf
-            deleted = page.delete_leaf_cell(key)
+    def _bulk_add_child(self, levels, level, min_key, page_number, limit):
+        # Appends a finished child to the internal page being filled at this level
+        if level == len(levels):
+            levels.append(None)
+        if levels[level] is None:
+            page = self._new_page(is_leaf=False)
+            page.children = [page_number]
+            levels[level] = [page, min_key]
+            return
+        page, page_min_key = levels[level]
+        if page.byte_size() + page.cells.cell_size((min_key, page_number)) > limit:
+            full_page_number = self.pager.allocate_page()
+            self.save_page(full_page_number, page)
+            self._bulk_add_child(levels, level + 1, page_min_key, full_page_number, limit)
+            page = self._new_page(is_leaf=False)
+            page.children = [page_number]
+            levels[level] = [page, min_key]
+            return
+        page.add_internal_cell(min_key, page_number)
+
+    def insert_many(self, rows) -> int:
+        """
+        Inserts a batch of (key, value) pairs in any order. Returns the row count.
+
+        The batch is sorted and split up by the separators on the way down, so
+        every leaf it touches is decoded, merged with its share of the rows and
+        rewritten once, and every internal page at most once, for all the splits
+        of its children together. Overfull pages are cut into as many pieces as
+        needed at fill_factor of a page. Keys must be unique and not already in
+        the table; every key is checked before the first page is written, so a
+        clash raises ValueError and leaves the table as it was.
+        """
+        rows = sorted(rows, key=itemgetter(0))
+        if not rows:
+            return 0
+        for (previous_key, _), (key, _) in zip(rows, islice(rows, 1, None)):
+            if key == previous_key:
+                raise ValueError(f"insert_many rows must have unique keys, {key} appears twice")
+        clash = self._find_clash(self.root_page_num, [key for key, _ in rows])
+        if clash is not None:
+            raise ValueError(f"Key {clash} is already in table '{self.table_name}'")
+        # Leaves are rewritten and split below the pinned one
+        self.rightmost_leaf = None
+        splits = self._insert_sorted(self.root_page_num, rows)
+        while splits:
+            # Move the root's cells out so the root keeps its page number
+            left_page_number = self.pager.allocate_page()
+            self.pager.write_page(left_page_number, self.pager.read_page(self.root_page_num))
+            new_root = self._new_page(is_leaf=False)
+            new_root.children = [left_page_number]
+            for separator, page_number in splits:
+                new_root.add_internal_cell(separator, page_number)
+            logger.info(f"Root page split into {len(splits) + 1} pages, left part moved to page {left_page_number}")
+            splits = self._save_split(self.root_page_num, new_root)
+        self._note_key(rows[-1][0])
+        logger.info(f"Inserted a batch of {len(rows)} rows into table '{self.table_name}'")
+        return len(rows)
+
+    def _find_clash(self, page_number: int, keys):
+        # Returns a key of the sorted batch already in the subtree, reading the pages _insert_sorted will
+        view = self.load_page_view(page_number)
+        if view.is_leaf:
+            existing = {view.key_at(index) for index in range(len(view))}
+            return next((key for key in keys if key in existing), None)
+        start = 0
+        for index in range(len(view) + 1):
+            end = bisect.bisect_left(keys, view.key_at(index), start) if index < len(view) else len(keys)
+            if end > start:
+                clash = self._find_clash(view.child_at(index), keys[start:end])
+                if clash is not None:
+                    return clash
+            start = end
+        return None
+
+    def _insert_sorted(self, page_number: int, rows):
+        # Returns the (separator, page number) of every page the subtree's top page was cut into
+        view = self.load_page_view(page_number)
+        if view.is_leaf:
+            page = view.to_page()
+            page.cells = self._merge_cells(page.cells, rows)
+            return self._save_split(page_number, page)
+        separators = [view.key_at(index) for index in range(len(view))]
+        keys = [key for key, _ in rows]
+        splits = []
+        start = 0
+        for index in range(len(view) + 1):
+            # Keys equal to a separator belong to the child on its right
+            end = bisect.bisect_left(keys, separators[index], start) if index < len(view) else len(rows)
+            if end > start:
+                splits.extend(self._insert_sorted(view.child_at(index), rows[start:end]))
+            start = end
+        if not splits:
+            return []
+        page = view.to_page()
+        for separator, child_page_number in splits:
+            page.insert_internal_cell(separator, child_page_number)
+        return self._save_split(page_number, page)
+
+    def _merge_cells(self, cells, rows) -> list:
+        # insert_many has checked the keys, so no overflow chain is written for a batch that fails
+        rows = [(key, self._make_payload(value)) for key, value in rows]
+        merged = []
+        index = 0
+        for cell in cells:
+            while index < len(rows) and rows[index][0] < cell[0]:
+                merged.append(rows[index])
+                index += 1
+            merged.append(cell)
+        merged.extend(rows[index:])
+        return merged
+
+    def _save_split(self, page_number: int, page: BTreePage):
+        """
+        Saves a page, first cutting it into evenly filled pieces of at most
+        fill_factor of a page if it no longer fits. Leaves are cut by size,
+        internal pages by key count with at least one key in every piece. The
+        first piece keeps the page number; returns the (separator, page number)
+        of the others.
+        """
+        if page.byte_size() <= page.page_size:
             self.save_page(page_number, page)
-            # Underflow check
-            if len(page.cells) < MIN_KEYS and parent_page_num is not None:
-                self._handle_leaf_underflow(page_number, parent_page_num, parent_index)
-            # If root is empty and not a leaf, shrink tree
-            if parent_page_num is None and len(page.cells) == 0 and not page.is_leaf:
-                # Promote only child as new root
-                new_root_num = page.children[0]
-                self.root_page_num = new_root_num
-                self.pager.write_root_page_number(new_root_num)
-                logger.info(f"Root shrunk, new root page number: {new_root_num}")
-            return deleted
+            return []
+        limit = int(page.page_size * self.fill_factor)
+        count = -(-page.byte_size() // limit)
+        cells = page.cells
+        if page.is_leaf:
+            # Cut before a cell once the piece is target full, or would pass limit with it
+            target = page.byte_size() / count
+            cuts = [0]
+            size = page.header_size
+            for index, cell_size in enumerate(map(cells.cell_size, cells)):
+                if index > cuts[-1] and (size >= target or size + cell_size > limit):
+                    cuts.append(index)
+                    size = page.header_size
+                size += cell_size
         else:
-            # Find child to descend
-            idx = page.find_child_index(key)
-            child_page_num = page.children[idx]
-            self._delete_recursive(child_page_num, key, page_number, idx)
-            # After recursion, check for underflow in child
-            child_page = self.load_page(child_page_num)
-            if len(child_page.cells) < MIN_KEYS:
-                self._handle_internal_underflow(child_page_num, page_number, idx)
-            self.save_page(page_number, page)
-            # If root is empty and not a leaf, shrink tree
-            if parent_page_num is None and len(page.cells) == 0 and not page.is_leaf:
-                new_root_num = page.children[0]
-                self.root_page_num = new_root_num
-                self.pager.write_root_page_number(new_root_num)
-                logger.info(f"Root shrunk, new root page number: {new_root_num}")
+            # One cell moves up between pieces, so count pieces need 2 * count - 1 cells
+            count = max(2, min(count, (len(cells) + 1) // 2))
+            keys = len(cells) - (count - 1)  # Kept in the pieces
+            cuts = [0] + [keys * piece // count + piece - 1 for piece in range(1, count)]
+        cuts.append(len(cells))
+        pieces = []  # (separator, page)
+        for start, end in zip(cuts, cuts[1:]):
+            piece = self._new_page(page.is_leaf)
+            separator = cells[start][0] if start else None
+            if page.is_leaf:
+                piece.cells = cells[start:end]
+            elif start:
+                # The first cell of a later internal piece moves up, its child goes first
+                piece.children = [cells[start][1]] + [child for _, child in cells[start + 1:end]]
+                piece.cells = cells[start + 1:end]
+            else:
+                piece.children = page.children[:end + 1]
+                piece.cells = cells[:end]
+            pieces.append((separator, piece))
+        page_numbers = [page_number] + [self.pager.allocate_page() for _ in pieces[1:]]
+        if page.is_leaf:
+            for (_, piece), next_page_number in zip(pieces, page_numbers[1:]):
+                piece.header.right_sibling = next_page_number
+            pieces[-1][1].header.right_sibling = page.header.right_sibling
+        for (_, piece), number in zip(pieces, page_numbers):
+            self.save_page(number, piece)
+        logger.debug(f"Page {page_number} split into {len(pieces)} pieces")
+        return [(separator, number) for (separator, _), number in zip(pieces[1:], page_numbers[1:])]
+
+    def _new_page(self, is_leaf: bool) -> BTreePage:
+        return BTreePage(is_leaf=is_leaf, page_size=self.pager.page_size)
+
+    def _make_payload(self, value):
+        """
+        Moves the tail of a value too large for a leaf cell to an overflow chain.
+        """
+        if isinstance(value, OverflowPayload):
+            value = bytes(value)
+        page_size = self.pager.page_size
+        if len(value) <= payload_limits(page_size)[0]:
+            return value
+        local_size = local_payload_size(len(value), page_size)
+        first_page = self.pager.write_overflow(memoryview(value)[local_size:])
+        logger.debug(f"Value of {len(value)} bytes spilled to overflow chain at page {first_page}")
+        return OverflowPayload(value[:local_size], len(value), first_page, self.pager)
 
-    def _handle_leaf_underflow(self, page_number, parent_page_num, parent_index):
+    def _free_payload(self, value):
+        if isinstance(value, OverflowPayload):
+            self.pager.free_overflow(value.first_page)
+
+    def update(self, key, value):
         """
-        Handle underflow in a leaf node by borrowing from or merging with a sibling.
+        Replaces the value stored under key, releasing the old overflow chain.
+        """
+        page_number = self.root_page_num
+        view = self.load_page_view(page_number)
+        while not view.is_leaf:
+            page_number = view.find_child(key)
+            view = self.load_page_view(page_number)
+        old_value = view.get(key)
+        if old_value is None:
+            raise KeyError(f"Key {key} not found in table '{self.table_name}'")
+        page = view.to_page()
+        payload = self._make_payload(value)
+        page.update_leaf_cell(key, payload)
+        if page.byte_size() > page.page_size:
+            # The larger row no longer fits; let delete and insert rebalance the tree
+            self._free_payload(payload)
+            self.delete(key)
+            self.insert(key, value)
+            return
+        self._free_payload(old_value)
+        self.save_page(page_number, page)
+
+    def delete(self, key):
+        """
+        Deletes a key in one pass down the tree. The internal pages on the way
+        are remembered, and underflow is then repaired bottom-up on decoded
+        copies of them: an underfull page borrows a cell from a sibling or
+        merges with one, and the repair climbs only while the parent it changed
+        underflows in turn. Every page that changed is written once at the end,
+        and nothing else is. Raises KeyError if the key is not in the table.
+        """
+        self.rightmost_leaf = None  # Merges may free or move it
+        if key == self.last_key:
+            self.last_key = None
+        path = []  # (page_number, view, child index) of every internal page above the leaf
+        page_number = self.root_page_num
+        view = self.load_page_view(page_number)
+        while not view.is_leaf:
+            index = view.find_child_index(key)
+            path.append((page_number, view, index))
+            page_number = view.child_at(index)
+            view = self.load_page_view(page_number)
+        page = view.to_page()
+        value = view.get(key)
+        deleted = page.delete_leaf_cell(key)
+        self._free_payload(value)
+        dirty = {page_number: page}  # page_number -> BTreePage to write
+        freed = []
+        for parent_number, parent_view, index in reversed(path):
+            if page.byte_size() >= self._min_page_bytes():
+                break
+            parent = parent_view.to_page()
+            if page.is_leaf:
+                changed = self._handle_leaf_underflow(parent, index, page, page_number, dirty, freed)
+            else:
+                changed = self._handle_internal_underflow(parent, index, page, page_number, dirty, freed)
+            if not changed:
+                break
+            dirty[parent_number] = parent
+            page_number, page = parent_number, parent
+        root = dirty.get(self.root_page_num)
+        if root is not None and not root.is_leaf and not root.cells:
+            # Pull the only child up into the root page
+            only_child = root.children[0]
+            child = dirty.pop(only_child, None)
+            dirty[self.root_page_num] = child if child is not None else self.load_page(only_child)
+            freed.append(only_child)
+            logger.info(f"Root shrunk, page {only_child} merged into root page {self.root_page_num}")
+        for number, changed_page in dirty.items():
+            self.save_page(number, changed_page)
+        for number in freed:
+            self.pager.free_page(number)
+        logger.debug(f"Deleted key {key}: {len(path) + 1} pages on the path, {len(dirty)} written, {len(freed)} freed")
+        return deleted
+
+    def _sibling(self, number, dirty) -> BTreePage:
+        # A sibling changed earlier in this delete is taken from dirty, not reread
+        if number is None:
+            return None
+        page = dirty.get(number)
+        return page if page is not None else self.load_page(number)
+
+    def _handle_leaf_underflow(self, parent, parent_index, page, page_number, dirty, freed) -> bool:
+        """
+        Fixes an underfull leaf, parent.children[parent_index], by borrowing from
+        or merging with a sibling. Changed pages go into dirty, released ones
+        into freed. Returns False if it changed nothing.
         """
-        page = self.load_page(page_number)
-        parent = self.load_page(parent_page_num)
-        # Try left sibling
         left_sibling_num = parent.children[parent_index - 1] if parent_index > 0 else None
         right_sibling_num = parent.children[parent_index + 1] if parent_index + 1 < len(parent.children) else None
-        if left_sibling_num is not None:
-            left_sibling = self.load_page(left_sibling_num)
-            if len(left_sibling.cells) > MIN_KEYS:
-                # Borrow from left
-                borrowed = left_sibling.cells.pop(-1)
-                page.cells.insert(0, borrowed)
-                left_sibling.header.num_keys = len(left_sibling.cells)
-                page.header.num_keys = len(page.cells)
-                # Update parent separator key
-                parent.cells[parent_index - 1] = (page.cells[0][0], parent.cells[parent_index - 1][1])
-                self.save_page(left_sibling_num, left_sibling)
-                self.save_page(page_number, page)
-                self.save_page(parent_page_num, parent)
-                return
-        if right_sibling_num is not None:
-            right_sibling = self.load_page(right_sibling_num)
-            if len(right_sibling.cells) > MIN_KEYS:
-                # Borrow from right
-                borrowed = right_sibling.cells.pop(0)
-                page.cells.append(borrowed)
-                right_sibling.header.num_keys = len(right_sibling.cells)
-                page.header.num_keys = len(page.cells)
-                # Update parent separator key
-                parent.cells[parent_index] = (right_sibling.cells[0][0], parent.cells[parent_index][1])
-                self.save_page(right_sibling_num, right_sibling)
-                self.save_page(page_number, page)
-                self.save_page(parent_page_num, parent)
-                return
-        # Merge with sibling if can't borrow
-        if left_sibling_num is not None:
-            left_sibling = self.load_page(left_sibling_num)
+        left_sibling = self._sibling(left_sibling_num, dirty)
+        if left_sibling is not None and self._can_lend(left_sibling, -1) and not page.is_full(*left_sibling.cells[-1]):
+            # Borrow from left
+            page.cells.insert(0, left_sibling.cells.pop(-1))
+            # Update parent separator key
+            parent.cells[parent_index - 1] = (page.cells[0][0], parent.cells[parent_index - 1][1])
+            dirty[left_sibling_num] = left_sibling
+            dirty[page_number] = page
+            return True
+        right_sibling = self._sibling(right_sibling_num, dirty)
+        if right_sibling is not None and self._can_lend(right_sibling, 0) and not page.is_full(*right_sibling.cells[0]):
+            # Borrow from right
+            page.cells.append(right_sibling.cells.pop(0))
+            # Update parent separator key
+            parent.cells[parent_index] = (right_sibling.cells[0][0], parent.cells[parent_index][1])
+            dirty[right_sibling_num] = right_sibling
+            dirty[page_number] = page
+            return True
+        # Merge with sibling if can't borrow and the cells fit in one page
+        if left_sibling is not None and self._fits(left_sibling, page.cells.byte_size):
             left_sibling.cells.extend(page.cells)
-            left_sibling.header.num_keys = len(left_sibling.cells)
+            left_sibling.header.right_sibling = page.header.right_sibling
             # Remove pointer and separator from parent
             del parent.children[parent_index]
             del parent.cells[parent_index - 1]
-            self.save_page(left_sibling_num, left_sibling)
-            self.save_page(parent_page_num, parent)
-            # Optionally, deallocate page_number
-        elif right_sibling_num is not None:
-            right_sibling = self.load_page(right_sibling_num)
+            dirty[left_sibling_num] = left_sibling
+            dirty.pop(page_number, None)
+            freed.append(page_number)
+            return True
+        if right_sibling is not None and self._fits(page, right_sibling.cells.byte_size):
             page.cells.extend(right_sibling.cells)
-            page.header.num_keys = len(page.cells)
+            page.header.right_sibling = right_sibling.header.right_sibling
             # Remove pointer and separator from parent
             del parent.children[parent_index + 1]
             del parent.cells[parent_index]
-            self.save_page(page_number, page)
-            self.save_page(parent_page_num, parent)
-            # Optionally, deallocate right_sibling_num
-        # If parent underflows, will be handled recursively
+            dirty[page_number] = page
+            dirty.pop(right_sibling_num, None)
+            freed.append(right_sibling_num)
+            return True
+        return False
+
+    @staticmethod
+    def _fits(page: BTreePage, extra_size: int) -> bool:
+        return page.byte_size() + extra_size <= page.page_size
+
+    def _min_page_bytes(self) -> int:
+        return int(self.pager.page_size * MIN_FILL_FACTOR)
+
+    def _can_lend(self, sibling: BTreePage, index: int) -> bool:
+        # The sibling must not underflow itself once the cell is gone
+        return bool(sibling.cells) and \
+            sibling.byte_size() - sibling.cells.cell_size(sibling.cells[index]) >= self._min_page_bytes()
 
-    def _handle_internal_underflow(self, page_number, parent_page_num, parent_index):
+    def _handle_internal_underflow(self, parent, parent_index, page, page_number, dirty, freed) -> bool:
         """
-        Handle underflow in an internal node by borrowing from or merging with a sibling.
+        Fixes an underfull internal page like _handle_leaf_underflow, rotating
+        keys through the parent's separator.
         """
-        page = self.load_page(page_number)
-        parent = self.load_page(parent_page_num)
         left_sibling_num = parent.children[parent_index - 1] if parent_index > 0 else None
         right_sibling_num = parent.children[parent_index + 1] if parent_index + 1 < len(parent.children) else None
-        if left_sibling_num is not None:
-            left_sibling = self.load_page(left_sibling_num)
-            if len(left_sibling.cells) > MIN_KEYS:
+        left_sibling = self._sibling(left_sibling_num, dirty)
+        if left_sibling is not None:
+            sep_key, _ = parent.cells[parent_index - 1]
+            if self._can_lend(left_sibling, -1) and self._fits(page, page.cells.cell_size((sep_key, page.children[0]))):
                 # Borrow from left: move parent's separator down, move left's last child up
-                sep_key, _ = parent.cells[parent_index - 1]
                 borrowed_cell = left_sibling.cells.pop(-1)
                 borrowed_child = left_sibling.children.pop(-1)
                 page.cells.insert(0, (sep_key, page.children[0]))
                 page.children.insert(0, borrowed_child)
                 parent.cells[parent_index - 1] = (borrowed_cell[0], parent.cells[parent_index - 1][1])
-                left_sibling.header.num_keys = len(left_sibling.cells)
-                page.header.num_keys = len(page.cells)
-                self.save_page(left_sibling_num, left_sibling)
-                self.save_page(page_number, page)
-                self.save_page(parent_page_num, parent)
-                return
-        if right_sibling_num is not None:
-            right_sibling = self.load_page(right_sibling_num)
-            if len(right_sibling.cells) > MIN_KEYS:
+                dirty[left_sibling_num] = left_sibling
+                dirty[page_number] = page
+                return True
+        right_sibling = self._sibling(right_sibling_num, dirty)
+        if right_sibling is not None:
+            sep_key, _ = parent.cells[parent_index]
+            if self._can_lend(right_sibling, 0) and self._fits(page, page.cells.cell_size((sep_key, right_sibling.children[0]))):
                 # Borrow from right: move parent's separator down, move right's first child up
-                sep_key, _ = parent.cells[parent_index]
                 borrowed_cell = right_sibling.cells.pop(0)
                 borrowed_child = right_sibling.children.pop(0)
-                page.cells.append((sep_key, right_sibling.children[0]))
+                page.cells.append((sep_key, borrowed_child))
                 page.children.append(borrowed_child)
                 parent.cells[parent_index] = (borrowed_cell[0], parent.cells[parent_index][1])
-                right_sibling.header.num_keys = len(right_sibling.cells)
-                page.header.num_keys = len(page.cells)
-                self.save_page(right_sibling_num, right_sibling)
-                self.save_page(page_number, page)
-                self.save_page(parent_page_num, parent)
-                return
-        # Merge with sibling if can't borrow
-        if left_sibling_num is not None:
-            left_sibling = self.load_page(left_sibling_num)
+                dirty[right_sibling_num] = right_sibling
+                dirty[page_number] = page
+                return True
+        # Merge with sibling if can't borrow and the separator and cells fit in one page
+        if left_sibling is not None:
             sep_key, _ = parent.cells[parent_index - 1]
-            # Merge separator and page into left sibling
-            left_sibling.cells.append((sep_key, page.children[0]))
-            left_sibling.cells.extend(page.cells)
-            left_sibling.children.extend(page.children[1:])
-            left_sibling.header.num_keys = len(left_sibling.cells)
-            del parent.children[parent_index]
-            del parent.cells[parent_index - 1]
-            self.save_page(left_sibling_num, left_sibling)
-            self.save_page(parent_page_num, parent)
-            # Optionally, deallocate page_number
-        elif right_sibling_num is not None:
-            right_sibling = self.load_page(right_sibling_num)
+            if self._fits(left_sibling, page.cells.byte_size + page.cells.cell_size((sep_key, page.children[0]))):
+                # Merge separator and page into left sibling
+                left_sibling.cells.append((sep_key, page.children[0]))
+                left_sibling.cells.extend(page.cells)
+                left_sibling.children.extend(page.children[1:])
+                del parent.children[parent_index]
+                del parent.cells[parent_index - 1]
+                dirty[left_sibling_num] = left_sibling
+                dirty.pop(page_number, None)
+                freed.append(page_number)
+                return True
+        if right_sibling is not None:
             sep_key, _ = parent.cells[parent_index]
-            # Merge separator and right sibling into page
-            page.cells.append((sep_key, right_sibling.children[0]))
-            page.cells.extend(right_sibling.cells)
-            page.children.extend(right_sibling.children[1:])
-            page.header.num_keys = len(page.cells)
-            del parent.children[parent_index + 1]
-            del parent.cells[parent_index]
-            self.save_page(page_number, page)
-            self.save_page(parent_page_num, parent)
-            # Optionally, deallocate right_sibling_num
-        # If parent underflows, will be handled recursively
+            if self._fits(page, right_sibling.cells.byte_size + page.cells.cell_size((sep_key, right_sibling.children[0]))):
+                # Merge separator and right sibling into page
+                page.cells.append((sep_key, right_sibling.children[0]))
+                page.cells.extend(right_sibling.cells)
+                page.children.extend(right_sibling.children[1:])
+                del parent.children[parent_index + 1]
+                del parent.cells[parent_index]
+                dirty[page_number] = page
+                dirty.pop(right_sibling_num, None)
+                freed.append(right_sibling_num)
+                return True
+        return False
 
     def save_root_page(self, page: BTreePage):
         logger.debug(f"Saving root page with {len(page.cells)} cells")
@@ -278,7 +691,7 @@ class Table:
             logger.debug(f"Loading root page {self.root_page_num}, first 11 bytes: {list(raw[:11])}")
             if all(b == 0 for b in raw[:11]):
                 logger.info("Page is empty, returning new leaf page")
-                return BTreePage(is_leaf=True)
+                return self._new_page(is_leaf=True)
             logger.debug("Page is not empty, parsing from bytes")
             return BTreePage.from_bytes(raw)
         except Exception as e:
@@ -287,31 +700,303 @@ class Table:
 
     def load_page(self, page_number: int) -> BTreePage:
         raw = self.pager.read_page(page_number)
-        return BTreePage.from_bytes(raw)
+        return BTreePage.from_bytes(raw, self.pager)
+
+    def load_page_view(self, page_number: int) -> PageView:
+        return PageView(self.pager.read_page(page_number), self.pager)
+
+    def find(self, key):
+        """
+        Point lookup: returns the value stored under key, or None.
+        Internal pages are searched in place without being decoded.
+        """
+        view = self.load_page_view(self.root_page_num)
+        while not view.is_leaf:
+            view = self.load_page_view(view.find_child(key))
+        value = view.get(key)
+        return bytes(value) if value is not None else None
 
     def save_page(self, page_number: int, page: BTreePage):
         self.pager.write_page(page_number, page.to_bytes())
 
+    def cursor(self, read_ahead: int = 0) -> 'BTreeCursor':
+        return BTreeCursor(self, read_ahead)
+
+    def scan(self, start_key=None):
+        """
+        Streams (key, value, page_number) in key order, starting at start_key if
+        given, by following the leaf chain instead of recursing through the tree.
+        """
+        cursor = self.cursor(self.read_ahead)
+        found = cursor.first() if start_key is None else cursor.seek(start_key)
+        while found:
+            value = cursor.value()
+            # Overflow chains are left unread until the row is decoded
+            if not isinstance(value, OverflowPayload):
+                value = bytes(value)
+            yield cursor.key(), value, cursor.page_number
+            found = cursor.next()
+
+    def _leaf_run(self, key, depth: int):
+        """
+        Returns the leaves of the bottom internal page covering key, starting at
+        the one that holds key, and the separator where that page's range ends
+        (None at the end of the tree). Only internal pages are read.
+        """
+        view = self.load_page_view(self.root_page_num)
+        upper_bound = None
+        for _ in range(depth - 1):
+            index = view.find_child_index(key)
+            if index < len(view):
+                upper_bound = view.key_at(index)
+            view = self.load_page_view(view.child_at(index))
+        index = view.find_child_index(key)
+        return [view.child_at(i) for i in range(index, len(view) + 1)], upper_bound
+
     def scan_page(self, page_number: int):
-        page = self.load_page(page_number)
-        logger.info(f"SCAN_PAGE: page_number={page_number}, is_leaf={page.is_leaf}, num_cells={len(page.cells)}, children={getattr(page, 'children', None)}")
-        if page.is_leaf:
-            for key, value in page.cells:
+        view = self.load_page_view(page_number)
+        logger.info(f"SCAN_PAGE: page_number={page_number}, is_leaf={view.is_leaf}, num_cells={len(view)}")
+        if view.is_leaf:
+            for key, value in view.cells():
+                # Overflow chains are left unread until the row is decoded
+                if not isinstance(value, OverflowPayload):
+                    value = bytes(value)
                 yield (key, value, page_number)  # Yield page_number for each row
         else:
-            n = len(page.cells)
-            if not page.children or len(page.children) != n + 1:
-                logger.error(f"Internal page {page_number} children/cells mismatch: children={page.children}, cells={page.cells}")
-                raise ValueError(f"Internal page {page_number} children/cells mismatch")
-            for i in range(n):
-                yield from self.scan_page(page.children[i])
-            yield from self.scan_page(page.children[-1])
+            for child_page_number in list(view.children()):
+                yield from self.scan_page(child_page_number)
+
+    def copy_to(self, target: 'Table') -> int:
+        """
+        Bulk loads every row into the empty target table, packing its pages to
+        this table's fill factor. Returns the row count.
+        """
+        rows = ((key, bytes(value)) for key, value, _ in self.scan())
+        return target.bulk_load(rows, fill_factor=self.fill_factor)
+
+    def vacuum(self) -> dict:
+        """
+        Rebuilds a table that owns its file into a fresh, densely packed copy
+        next to it, then atomically renames the copy over the original and
+        reopens it with the same pager options. Tables inside a single-file
+        database are rebuilt with the whole file by Catalog.vacuum instead.
+        """
+        if not self.owns_pager:
+            raise RuntimeError(f"Table '{self.table_name}' shares its file, vacuum the whole database instead")
+        pager = self.pager
+        options = dict(cache_size=pager.cache_size, use_mmap=pager.use_mmap, use_wal=pager.wal is not None,
+                       compression=pager.compression, extent_pages=pager.extent_pages, page_size=pager.page_size)
+        temp_filename = self.filename + ".vacuum"
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)  # Left behind by an interrupted VACUUM
+        temp_pager = Pager(temp_filename, cache_size=pager.cache_size, compression=pager.compression,
+                           page_size=pager.page_size)
+        # The first page of the new file, which its header already names as the root
+        target = Table(self.table_name, pager=temp_pager, root_page_num=None)
+        rows = self.copy_to(target)
+        pages_before, pages_after = pager.num_pages, temp_pager.num_pages
+        temp_pager.close()
+        pager.close()
+        bytes_before = os.path.getsize(self.filename)
+        bytes_after = os.path.getsize(temp_filename)
+        replace_file(temp_filename, self.filename)
+        self.pager = Pager(self.filename, **options)
+        self.root_page_num = self.pager.read_root_page_number()
+        self.rightmost_leaf = None
+        self.last_key = None
+        logger.info(f"Vacuumed table '{self.table_name}': {rows} rows, {pages_before} -> {pages_after} pages, "
+                    f"{bytes_before} -> {bytes_after} bytes")
+        return {"pages_before": pages_before, "pages_after": pages_after,
+                "bytes_before": bytes_before, "bytes_after": bytes_after}
+
+    def free_pages(self):
+        """
+        Returns every page of the tree, root included, to the pager's freelist.
+        """
+        self.rightmost_leaf = None
+        self.last_key = None
+        pending = [self.root_page_num]
+        while pending:
+            page_number = pending.pop()
+            view = self.load_page_view(page_number)
+            if not view.is_leaf:
+                pending.extend(view.children())
+            else:
+                for _, value in view.cells():
+                    self._free_payload(value)
+            self.pager.free_page(page_number)
+        logger.info(f"Freed all pages of table '{self.table_name}'")
 
     def close(self):
         logger.info(f"Closing table '{self.table_name}'")
+        if not self.owns_pager:
+            # The shared pager is closed by whoever opened it
+            return
         try:
             self.pager.close()
             logger.debug(f"Pager closed for file: {self.filename}")
         except Exception as e:
             logger.error(f"Error closing pager for table '{self.table_name}': {e}")
-            raise
\ No newline at end of file
+            raise
+
+class BTreeCursor:
+    """
+    A position in the leaf level of a Table's B-Tree.
+
+    The cursor moves forwards along the leaves' right-sibling links, so a scan
+    reads each leaf once and never goes back through the parents. Moving
+    backwards across a leaf boundary, and forwards past a leaf with no link
+    (files written before the links were maintained), re-descends from the root.
+    Reposition the cursor with first(), last() or seek() after modifying the table.
+
+    With read_ahead > 0 a forward-moving cursor keeps that many of the leaves
+    after its own prefetching through Pager.read_ahead(). Sibling links only name
+    the next leaf, so the upcoming leaves come from the children of the bottom
+    internal pages, which are walked ahead of the cursor one parent at a time.
+    """
+    def __init__(self, table: Table, read_ahead: int = 0):
+        self.table = table
+        self.page_number = None
+        self.view = None
+        self.index = 0
+        self.depth = 0  # Internal levels above the leaves, as of the last descent
+        self.read_ahead = read_ahead
+        self.upcoming = deque()  # Leaves known to follow the current one, in order
+        self.requested = 0  # How many of self.upcoming were handed to the pager
+        self.run_end = None  # Separator where the leaves in self.upcoming end, None at the end of the tree
+        # Separator keys around the current leaf, known after a descent: the
+        # leaf holds keys in [lower_bound, upper_bound), None meaning unbounded
+        self.lower_bound = None
+        self.upper_bound = None
+
+    @property
+    def valid(self) -> bool:
+        return self.view is not None and 0 <= self.index < len(self.view)
+
+    def key(self):
+        return self.view.key_at(self.index)
+
+    def value(self):
+        """
+        Returns the value as a memoryview of the page, or an OverflowPayload.
+        """
+        return self.view.value_at(self.index)
+
+    def _descend(self, key=None, rightmost: bool = False):
+        # Walks from the root to the leaf that holds key (or the leftmost/rightmost leaf)
+        page_number = self.table.root_page_num
+        view = self.table.load_page_view(page_number)
+        self.lower_bound = self.upper_bound = None
+        self.depth = 0
+        while not view.is_leaf:
+            self.depth += 1
+            if key is not None:
+                index = view.find_child_index(key)
+            else:
+                index = len(view) if rightmost else 0
+            if index > 0:
+                self.lower_bound = view.key_at(index - 1)
+            if index < len(view):
+                self.upper_bound = view.key_at(index)
+            page_number = view.child_at(index)
+            view = self.table.load_page_view(page_number)
+        self.page_number = page_number
+        self.view = view
+
+    def first(self) -> bool:
+        self._descend()
+        self.index = 0
+        self._schedule_read_ahead()
+        return self.valid or self._next_leaf()
+
+    def last(self) -> bool:
+        self._descend(rightmost=True)
+        self.index = len(self.view) - 1
+        return self.valid or self._prev_leaf()
+
+    def seek(self, key) -> bool:
+        """
+        Moves to the first cell with a key >= key. Returns False if there is none.
+        """
+        self._descend(key)
+        self.index = self.view.search(key)
+        self._schedule_read_ahead()
+        return self.valid or self._next_leaf()
+
+    def next(self) -> bool:
+        if self.view is None:
+            return False
+        self.index += 1
+        return self.valid or self._next_leaf()
+
+    def prev(self) -> bool:
+        if self.view is None:
+            return False
+        self.index -= 1
+        return self.valid or self._prev_leaf()
+
+    def _next_leaf(self) -> bool:
+        while True:
+            right_sibling = self.view.right_sibling
+            if right_sibling:
+                self.page_number = right_sibling
+                self.view = self.table.load_page_view(right_sibling)
+            else:
+                # No link: either this is the last leaf or the link was never written
+                if len(self.view):
+                    self._descend(self.view.key_at(0))
+                if self.upper_bound is None:
+                    return self._invalidate()
+                self._descend(self.upper_bound)
+            self.index = 0
+            self._schedule_read_ahead()
+            if len(self.view):
+                return True
+
+    def _schedule_read_ahead(self):
+        # Called on arriving at a leaf while moving forwards
+        if not self.read_ahead or not self.depth:
+            return
+        if self.upcoming and self.upcoming[0] == self.page_number:
+            self.upcoming.popleft()
+            self.requested = max(0, self.requested - 1)
+        elif len(self.view):
+            # Jumped somewhere new: start over from the parent of this leaf
+            leaves, self.run_end = self.table._leaf_run(self.view.key_at(0), self.depth)
+            self.upcoming = deque(leaves[1:])
+            self.requested = 0
+        else:
+            return
+        while len(self.upcoming) < self.read_ahead and self.run_end is not None:
+            leaves, self.run_end = self.table._leaf_run(self.run_end, self.depth)
+            self.upcoming.extend(leaves)
+        # Top the window up in batches rather than one page per leaf
+        if self.requested <= self.read_ahead // 2:
+            window = list(islice(self.upcoming, self.requested, self.read_ahead))
+            self.table.pager.read_ahead(window)
+            self.requested += len(window)
+
+    def _prev_leaf(self) -> bool:
+        while True:
+            if len(self.view):
+                # Leaves have no left links; find this leaf's bounds, then the leaf before them
+                self._descend(self.view.key_at(0))
+            if self.lower_bound is None:
+                return self._invalidate()
+            self._descend(self.lower_bound - 1)
+            self.index = len(self.view) - 1
+            if len(self.view):
+                return True
+
+    def _invalidate(self) -> bool:
+        self.view = None
+        self.page_number = None
+        return False
+
+    def __iter__(self):
+        """
+        Yields (key, value) from the current position to the end.
+        """
+        while self.valid:
+            yield self.key(), self.value()
+            self.next()
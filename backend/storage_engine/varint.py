@@ -0,0 +1,80 @@
+"""
+SQLite-style variable-length integers.
+
+A varint holds an unsigned 64-bit integer in 1 to 9 bytes, most significant
+group first. Each of the first eight bytes carries 7 bits and sets its high bit
+when more bytes follow; a ninth byte, if present, carries a full 8 bits.
+
+Value range                 Bytes
+0 to 127                    1
+128 to 16383                2
+...
+2**56 to 2**64 - 1          9
+"""
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_VARINT = (1 << 64) - 1
+MAX_VARINT_SIZE = 9
+
+def varint_size(value: int) -> int:
+    if value < 0x80:
+        return 1
+    if value < 0x4000:
+        return 2
+    if value > MAX_VARINT:
+        raise ValueError(f"Varint out of range: {value}")
+    size = 1
+    while value >= 0x80 and size < MAX_VARINT_SIZE - 1:
+        value >>= 7
+        size += 1
+    return MAX_VARINT_SIZE if value >= 0x80 else size
+
+def encode_varint(value: int) -> bytes:
+    if value < 0x80:
+        if value < 0:
+            logger.error(f"Cannot encode negative varint {value}")
+            raise ValueError(f"Varint out of range: {value}")
+        return bytes((value,))
+    if value > MAX_VARINT:
+        logger.error(f"Cannot encode varint {value}, larger than 64 bits")
+        raise ValueError(f"Varint out of range: {value}")
+    if value >> 56:
+        # Nine bytes: eight 7-bit groups followed by a full final byte
+        out = bytearray(MAX_VARINT_SIZE)
+        out[8] = value & 0xFF
+        value >>= 8
+        for i in range(7, -1, -1):
+            out[i] = (value & 0x7F) | 0x80
+            value >>= 7
+        return bytes(out)
+    groups = []
+    while value:
+        groups.append((value & 0x7F) | 0x80)
+        value >>= 7
+    groups[0] &= 0x7F  # Least significant group ends the varint
+    return bytes(reversed(groups))
+
+def decode_varint(data, offset: int = 0):
+    """
+    Returns (value, offset just past the varint).
+    """
+    byte = data[offset]
+    if byte < 0x80:
+        return byte, offset + 1
+    value = byte & 0x7F
+    for i in range(1, MAX_VARINT_SIZE - 1):
+        byte = data[offset + i]
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, offset + i + 1
+    return (value << 8) | data[offset + 8], offset + MAX_VARINT_SIZE
+
+def write_varint(buf, offset: int, value: int) -> int:
+    """
+    Writes a varint into buf at offset and returns the offset just past it.
+    """
+    encoded = encode_varint(value)
+    buf[offset:offset + len(encoded)] = encoded
+    return offset + len(encoded)
@@ -0,0 +1,174 @@
+"""
+Write-ahead log for a table file.
+
+Instead of overwriting pages in place, a committing Pager appends the images of
+every page it changed to <table>.wal and syncs the log once. A checkpoint later
+copies the newest image of each page back into the table file and empties the log.
+
+WAL header (16 bytes):
+Byte_range   Meaning
+0 to 3       Magic "SQPW"
+4 to 4       WAL format version
+5 to 7       Reserved
+8 to 11      Page size
+12 to 15     Salt, changed on every reset so stale frames never checksum correctly
+
+Frame (12-byte header followed by one page image):
+Byte_range   Meaning
+0 to 3       Page number (0 is the table file header)
+4 to 7       For the last frame of a transaction: page count after the commit, else 0
+8 to 11      CRC32 of bytes 0 to 7 and the page image, seeded with the salt
+
+Only frames up to the last commit frame are visible; a torn or uncommitted tail
+left by a crash is discarded when the log is opened.
+"""
+import os
+import random
+import zlib
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WAL_MAGIC = b"SQPW"
+WAL_VERSION = 1
+WAL_HEADER_SIZE = 16
+WAL_FRAME_HEADER_SIZE = 12
+DEFAULT_CHECKPOINT_THRESHOLD = 1000  # Checkpoint once the log holds this many frames
+
+class WriteAheadLog:
+    def __init__(self, filename: str, page_size: int):
+        self.filename = filename
+        self.page_size = page_size
+        self.frame_size = WAL_FRAME_HEADER_SIZE + page_size
+        self.index = {}  # page_number -> offset of the newest committed frame
+        self.db_size = 0  # Page count recorded by the last commit frame
+        self.frame_count = 0
+        file_exists = os.path.exists(filename)
+        self.file = open(filename, 'r+b') if file_exists else open(filename, 'w+b')
+        if file_exists and self._read_header():
+            self._recover()
+        else:
+            self._write_header()
+        logger.info(f"Opened WAL {filename}: {self.frame_count} committed frames, {len(self.index)} pages")
+
+    def _write_header(self):
+        self.salt = random.getrandbits(32)
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(
+            WAL_MAGIC +
+            WAL_VERSION.to_bytes(1, 'big') +
+            b'\x00' * 3 +
+            self.page_size.to_bytes(4, 'big') +
+            self.salt.to_bytes(4, 'big')
+        )
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _read_header(self) -> bool:
+        self.file.seek(0)
+        data = self.file.read(WAL_HEADER_SIZE)
+        if len(data) < WAL_HEADER_SIZE or data[:4] != WAL_MAGIC:
+            logger.warning(f"WAL {self.filename} has no valid header, starting a new log")
+            return False
+        if int.from_bytes(data[8:12], 'big') != self.page_size:
+            logger.error(f"WAL {self.filename} page size does not match the table file")
+            raise ValueError(f"WAL page size mismatch in {self.filename}")
+        self.salt = int.from_bytes(data[12:16], 'big')
+        return True
+
+    def _checksum(self, frame_header: bytes, data: bytes) -> int:
+        return zlib.crc32(data, zlib.crc32(frame_header, self.salt))
+
+    def _recover(self):
+        """
+        Rebuilds the index from the committed frames and cuts off anything after them.
+        """
+        offset = WAL_HEADER_SIZE
+        committed_end = offset
+        pending = {}
+        frames = 0
+        self.file.seek(offset)
+        while True:
+            frame = self.file.read(self.frame_size)
+            if len(frame) < self.frame_size:
+                break
+            page_number = int.from_bytes(frame[0:4], 'big')
+            commit_size = int.from_bytes(frame[4:8], 'big')
+            checksum = int.from_bytes(frame[8:12], 'big')
+            if checksum != self._checksum(frame[0:8], frame[WAL_FRAME_HEADER_SIZE:]):
+                logger.warning(f"WAL {self.filename}: checksum mismatch at offset {offset}, ignoring the rest")
+                break
+            pending[page_number] = offset
+            frames += 1
+            offset += self.frame_size
+            if commit_size:
+                self.index.update(pending)
+                pending = {}
+                self.db_size = commit_size
+                self.frame_count = frames
+                committed_end = offset
+        if pending or committed_end != os.fstat(self.file.fileno()).st_size:
+            logger.warning(f"WAL {self.filename}: discarding uncommitted frames after offset {committed_end}")
+            self.file.truncate(committed_end)
+            self.file.flush()
+
+    def read_frame(self, page_number: int):
+        """
+        Returns the newest committed image of a page, or None if the log has none.
+        """
+        offset = self.index.get(page_number)
+        if offset is None:
+            return None
+        self.file.seek(offset + WAL_FRAME_HEADER_SIZE)
+        return self.file.read(self.page_size)
+
+    def append_transaction(self, pages: dict, db_size: int):
+        """
+        Appends one frame per page and marks the last one as the commit frame.
+        The whole transaction is written with a single write and a single fsync.
+        """
+        if not pages:
+            return
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        frames = []
+        new_offsets = {}
+        page_numbers = sorted(pages)
+        for i, page_number in enumerate(page_numbers):
+            data = pages[page_number]
+            commit_size = db_size if i == len(page_numbers) - 1 else 0
+            frame_header = page_number.to_bytes(4, 'big') + commit_size.to_bytes(4, 'big')
+            frames.append(frame_header + self._checksum(frame_header, data).to_bytes(4, 'big') + data)
+            new_offsets[page_number] = offset
+            offset += self.frame_size
+        self.file.write(b"".join(frames))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.index.update(new_offsets)
+        self.db_size = db_size
+        self.frame_count += len(frames)
+        logger.info(f"WAL commit: {len(frames)} frames appended to {self.filename}")
+
+    def committed_pages(self):
+        """
+        Yields (page_number, data) for the newest committed image of every page.
+        """
+        for page_number in sorted(self.index):
+            yield page_number, self.read_frame(page_number)
+
+    def reset(self):
+        """
+        Empties the log after a checkpoint.
+        """
+        self.index = {}
+        self.frame_count = 0
+        self._write_header()
+        logger.info(f"WAL {self.filename} reset")
+
+    def close(self, delete: bool = False):
+        if self.file and not self.file.closed:
+            self.file.close()
+            if delete:
+                os.remove(self.filename)
+            logger.info(f"Closed WAL {self.filename}")
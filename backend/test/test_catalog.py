@@ -0,0 +1,65 @@
+"""
+Catalog tests.
+
+Usage (from the backend directory):
+    python -m unittest discover -s test
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.code_generator import generate
+from compiler.parser import Parser
+from compiler.parser.statements import parse_statement
+from compiler.tokenizer import Tokenizer
+from core.session import close_all_sessions
+from core.virtual_machine import VirtualMachine
+from meta.catalog import Catalog, SINGLE_FILE_NAME
+from storage_engine.pager import Pager
+
+TOKENIZER = Tokenizer()
+TABLE_COUNT = 120  # Enough catalog rows to make its root an internal page
+
+def run(db_path: str, sql: str):
+    vm = VirtualMachine(generate(parse_statement(Parser(TOKENIZER.tokenize(sql)))), db_path=db_path)
+    vm.run()
+    return vm.output
+
+class DropTableTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.db_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        close_all_sessions()
+        logging.disable(logging.NOTSET)
+
+    def drop_from_large_catalog(self):
+        for i in range(TABLE_COUNT):
+            run(self.db_path, f"CREATE TABLE table_{i} (name TEXT, description TEXT, amount INT);")
+        run(self.db_path, "INSERT INTO table_7 VALUES ('kept', 'row', 1);")
+        for i in range(0, TABLE_COUNT, 3):
+            run(self.db_path, f"DROP TABLE table_{i};")
+        close_all_sessions()
+        catalog = Catalog(self.db_path)
+        self.assertEqual(sorted(catalog.list_tables()),
+                         sorted(f"table_{i}" for i in range(TABLE_COUNT) if i % 3))
+        catalog.close()
+        self.assertEqual(run(self.db_path, "SELECT name FROM table_7;"), [{"name": "'kept'"}])
+        run(self.db_path, "CREATE TABLE table_0 (name TEXT);")
+        self.assertEqual(run(self.db_path, "SELECT * FROM table_0;"), [])
+
+    def test_drop_from_multi_page_catalog(self):
+        self.drop_from_large_catalog()
+        self.assertFalse(os.path.exists(os.path.join(self.db_path, "table_3.tbl")))
+
+    def test_drop_from_multi_page_catalog_single_file(self):
+        Pager(os.path.join(self.db_path, SINGLE_FILE_NAME)).close()
+        self.drop_from_large_catalog()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Table tests.
+
+Usage (from the backend directory):
+    python -m unittest discover -s test
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_engine.table import Table
+
+ROW = b'{"name": "test", "value": 12345}'
+
+def tree_keys(table: Table, page_number: int) -> list:
+    # Keys reachable from page_number through the child pointers, not the leaf chain
+    view = table.load_page_view(page_number)
+    if view.is_leaf:
+        return [view.key_at(index) for index in range(len(view))]
+    return [key for index in range(len(view) + 1) for key in tree_keys(table, view.child_at(index))]
+
+class InsertManyTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.db_path = tempfile.mkdtemp()
+        self.table = Table("batch", db_path=self.db_path)
+        self.table.insert_many((key, ROW) for key in range(0, 2000, 2))
+
+    def tearDown(self):
+        self.table.close()
+        logging.disable(logging.NOTSET)
+
+    def pages(self) -> list:
+        return [bytes(self.table.pager.read_page(number)) for number in range(1, self.table.pager.num_pages)]
+
+    def test_failed_batch_leaves_tree_unchanged(self):
+        pages = self.pages()
+        # Odd keys fill and split many leaves before the batch reaches the clashing key
+        batch = [(key, ROW * 3) for key in range(1, 1900, 2)] + [(1998, ROW)]
+        with self.assertRaises(ValueError):
+            self.table.insert_many(batch)
+        self.assertEqual(self.pages(), pages)
+        self.assertEqual([key for key, _, _ in self.table.scan()], list(range(0, 2000, 2)))
+        self.assertEqual(tree_keys(self.table, self.table.root_page_num), list(range(0, 2000, 2)))
+
+    def test_batch_reaches_every_row_through_the_tree(self):
+        self.table.insert_many((key, ROW * 3) for key in range(1, 2000, 2))
+        self.assertEqual([key for key, _, _ in self.table.scan()], list(range(2000)))
+        self.assertEqual(tree_keys(self.table, self.table.root_page_num), list(range(2000)))
+        self.assertEqual(bytes(self.table.find(1001)), ROW * 3)
+
+if __name__ == "__main__":
+    unittest.main()